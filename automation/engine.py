@@ -1,6 +1,6 @@
 import logging
 import sqlite3
-from db.database import get_connection
+from db.database import get_connection, transaction
 from db.records import update_field_value
 from db.edit_history import append_edit_log
 from db.automation import get_rules, increment_run_count
@@ -45,16 +45,17 @@ def run_rule(rule_id: int) -> int:
     count = 0
     for rec_id, old_val in rows:
         try:
-            if update_field_value(table, rec_id, action_field, action_value):
-                append_edit_log(
-                    table,
-                    rec_id,
-                    action_field,
-                    old_val,
-                    action_value,
-                    actor=f"rule:{rule_id}",
-                )
-                count += 1
+            with transaction():
+                if update_field_value(table, rec_id, action_field, action_value):
+                    append_edit_log(
+                        table,
+                        rec_id,
+                        action_field,
+                        old_val,
+                        action_value,
+                        actor=f"rule:{rule_id}",
+                    )
+                    count += 1
         except (sqlite3.DatabaseError, ValueError):
             logger.exception(
                 "Failed to apply rule %s to record %s",
@@ -0,0 +1,344 @@
+import logging
+import sqlite3
+import threading
+
+from db import database
+from db.catalog import get_table_meta
+from db.database import get_connection, transaction
+from db.schema import get_field_schema, get_schema_generation
+from db.table_stats import get_row_count
+
+logger = logging.getLogger(__name__)
+
+# Opt-in per-field aggregates for dashboard widgets. A field is materialized
+# once it has a row in field_aggregates; triggers on its base table then keep
+# the non-null count, sum (number fields) and the per-value counts (select
+# fields) current on every write path, so reads are O(1) and never write.
+AGGREGATES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS field_aggregates (
+        table_name TEXT NOT NULL,
+        field_name TEXT NOT NULL,
+        nonnull_count INTEGER NOT NULL DEFAULT 0,
+        total_sum REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (table_name, field_name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS field_value_counts (
+        table_name TEXT NOT NULL,
+        field_name TEXT NOT NULL,
+        value TEXT NOT NULL,
+        n INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (table_name, field_name, value)
+    )
+    """,
+)
+
+_TRIGGER_SUFFIXES = ("ai", "au", "ad")
+
+# Live materialized fields per table for (DB_PATH, schema generation).
+_live_lock = threading.Lock()
+_live: dict = {"key": None, "tables": {}}
+
+
+def _trigger_name(table: str, field: str, suffix: str) -> str:
+    return f"agg__{table}__{field}__{suffix}"
+
+
+def _add_sql(table: str, field: str, kind: str, ref: str) -> list[str]:
+    """Statements folding the ``ref`` ('new') row's value into the aggregates."""
+    col = f"{ref}.{field}"
+    where = f"WHERE table_name = '{table}' AND field_name = '{field}'"
+    sets = [f"nonnull_count = nonnull_count + ({col} IS NOT NULL)"]
+    if kind == "number":
+        sets.append(f"total_sum = total_sum + COALESCE({col}, 0)")
+    stmts = [f"UPDATE field_aggregates SET {', '.join(sets)} {where}"]
+    if kind == "select":
+        stmts.append(
+            "INSERT INTO field_value_counts (table_name, field_name, value, n) "
+            f"SELECT '{table}', '{field}', {col}, 1 "
+            f"WHERE {col} IS NOT NULL AND {col} <> '' "
+            "ON CONFLICT(table_name, field_name, value) DO UPDATE SET n = n + 1"
+        )
+    return stmts
+
+
+def _remove_sql(table: str, field: str, kind: str, ref: str) -> list[str]:
+    """Statements taking the ``ref`` ('old') row's value out of the aggregates."""
+    col = f"{ref}.{field}"
+    where = f"WHERE table_name = '{table}' AND field_name = '{field}'"
+    sets = [f"nonnull_count = nonnull_count - ({col} IS NOT NULL)"]
+    if kind == "number":
+        sets.append(f"total_sum = total_sum - COALESCE({col}, 0)")
+    stmts = [f"UPDATE field_aggregates SET {', '.join(sets)} {where}"]
+    if kind == "select":
+        stmts += [
+            f"UPDATE field_value_counts SET n = n - 1 {where} AND value = {col}",
+            f"DELETE FROM field_value_counts {where} AND value = {col} AND n <= 0",
+        ]
+    return stmts
+
+
+def _field_kind(table: str, field: str) -> str:
+    ftype = get_field_schema().get(table, {}).get(field, {}).get("type")
+    return ftype if ftype in ("number", "select") else "other"
+
+
+def _drop_triggers(conn: sqlite3.Connection, table: str, field: str) -> None:
+    for suffix in _TRIGGER_SUFFIXES:
+        conn.execute(f'DROP TRIGGER IF EXISTS "{_trigger_name(table, field, suffix)}"')
+
+
+def _install_field(conn: sqlite3.Connection, table: str, field: str) -> None:
+    """(Re)create the triggers for ``table.field`` and recompute its aggregates.
+
+    The triggers are specialised for the field's current type, so they have
+    to be reinstalled when the type changes.
+    """
+    kind = _field_kind(table, field)
+    _drop_triggers(conn, table, field)
+    ai, au, ad = (_trigger_name(table, field, s) for s in _TRIGGER_SUFFIXES)
+    add_new = "; ".join(_add_sql(table, field, kind, "new"))
+    remove_old = "; ".join(_remove_sql(table, field, kind, "old"))
+    conn.execute(f'CREATE TRIGGER "{ai}" AFTER INSERT ON "{table}" BEGIN {add_new}; END')
+    conn.execute(
+        f'CREATE TRIGGER "{au}" AFTER UPDATE OF {field} ON "{table}" BEGIN '
+        f"{remove_old}; {add_new}; END"
+    )
+    conn.execute(f'CREATE TRIGGER "{ad}" AFTER DELETE ON "{table}" BEGIN {remove_old}; END')
+
+    conn.execute(
+        "INSERT OR REPLACE INTO field_aggregates "
+        "(table_name, field_name, nonnull_count, total_sum) "
+        f'SELECT ?, ?, COUNT("{field}"), COALESCE(SUM("{field}"), 0) FROM "{table}"',
+        (table, field),
+    )
+    conn.execute(
+        "DELETE FROM field_value_counts WHERE table_name = ? AND field_name = ?",
+        (table, field),
+    )
+    if kind == "select":
+        conn.execute(
+            "INSERT INTO field_value_counts (table_name, field_name, value, n) "
+            f'SELECT ?, ?, "{field}", COUNT(*) FROM "{table}" '
+            f'WHERE "{field}" IS NOT NULL AND "{field}" <> \'\' GROUP BY "{field}"',
+            (table, field),
+        )
+
+
+def _remove_field(conn: sqlite3.Connection, table: str, field: str) -> None:
+    _drop_triggers(conn, table, field)
+    for side in ("field_aggregates", "field_value_counts"):
+        conn.execute(
+            f"DELETE FROM {side} WHERE table_name = ? AND field_name = ?",
+            (table, field),
+        )
+
+
+def _materialized_fields(conn: sqlite3.Connection, table: str) -> set[str]:
+    if not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'field_aggregates'"
+    ).fetchone():
+        return set()
+    return {
+        r[0]
+        for r in conn.execute(
+            "SELECT field_name FROM field_aggregates WHERE table_name = ?", (table,)
+        ).fetchall()
+    }
+
+
+def _trigger_names(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {
+        r[0]
+        for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+            (table,),
+        ).fetchall()
+    }
+
+
+def _forget_live(table: str) -> None:
+    with _live_lock:
+        _live["tables"].pop(table, None)
+
+
+def live_fields(table: str) -> frozenset[str]:
+    """Return the fields of ``table`` whose aggregates are being maintained.
+
+    Read-only: a field whose triggers went missing (the table was recreated)
+    is left out until :func:`enable_materialized` repairs it.
+    """
+    key = (database.DB_PATH, get_schema_generation())
+    with _live_lock:
+        if _live["key"] != key:
+            _live["key"] = key
+            _live["tables"] = {}
+        cached = _live["tables"].get(table)
+    if cached is not None:
+        return cached
+    with get_connection() as conn:
+        fields = _materialized_fields(conn, table)
+        triggers = _trigger_names(conn, table) if fields else set()
+    live = frozenset(
+        f
+        for f in fields
+        if {_trigger_name(table, f, s) for s in _TRIGGER_SUFFIXES} <= triggers
+    )
+    with _live_lock:
+        if _live["key"] == key:
+            _live["tables"][table] = live
+    return live
+
+
+def list_materialized() -> list[tuple[str, str]]:
+    """Return every ``(table, field)`` with a field_aggregates row."""
+    with get_connection() as conn:
+        if not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'field_aggregates'"
+        ).fetchone():
+            return []
+        return [
+            (r[0], r[1])
+            for r in conn.execute(
+                "SELECT table_name, field_name FROM field_aggregates ORDER BY 1, 2"
+            ).fetchall()
+        ]
+
+
+def ensure_aggregates(table: str) -> set[str]:
+    """Check the aggregate triggers for ``table`` against its schema.
+
+    Returns the materialized fields. Fields whose triggers went missing (the
+    table was recreated) are rebuilt; fields that no longer exist are removed.
+    """
+    with get_connection() as conn:
+        fields = _materialized_fields(conn, table)
+        if not fields:
+            return fields
+        triggers = _trigger_names(conn, table)
+
+    meta = get_table_meta(table)
+    columns = meta.column_set if meta is not None else frozenset()
+    to_drop = {f for f in fields if f not in columns}
+    to_install = {
+        f
+        for f in fields - to_drop
+        if not {_trigger_name(table, f, s) for s in _TRIGGER_SUFFIXES} <= triggers
+    }
+    if to_drop or to_install:
+        with transaction() as conn:
+            for field in sorted(to_drop):
+                _remove_field(conn, table, field)
+            for field in sorted(to_install):
+                _install_field(conn, table, field)
+        _forget_live(table)
+        logger.info(
+            "Synced materialized aggregates for %s",
+            table,
+            extra={
+                "table": table,
+                "installed": sorted(to_install),
+                "dropped": sorted(to_drop),
+            },
+        )
+    return fields - to_drop
+
+
+def enable_materialized(table: str, field: str) -> bool:
+    """Start maintaining aggregates for ``table.field``.
+
+    Backfills with one scan; afterwards the triggers keep it current. This
+    writes to the schema, so it runs from admin actions, never from reads.
+    """
+    meta = get_table_meta(table)
+    if meta is None or field not in meta.column_set or field == "id":
+        raise ValueError(f"Invalid field: {field}")
+    if field in ensure_aggregates(table):
+        return False
+    try:
+        with transaction() as conn:
+            for stmt in AGGREGATES_SQL:
+                conn.execute(stmt)
+            _install_field(conn, table, field)
+        _forget_live(table)
+    except sqlite3.DatabaseError as exc:
+        logger.exception(
+            "Failed to materialize %s.%s",
+            table,
+            field,
+            extra={"table": table, "field": field, "error": str(exc)},
+        )
+        return False
+    logger.info(
+        "Materialized aggregates for %s.%s",
+        table,
+        field,
+        extra={"table": table, "field": field},
+    )
+    return True
+
+
+def reinstall_materialized(table: str, field: str) -> bool:
+    """Rebuild the triggers and aggregates of ``table.field`` after its type
+    changed. Returns False if the field is not materialized."""
+    with transaction() as conn:
+        if field not in _materialized_fields(conn, table):
+            return False
+        _install_field(conn, table, field)
+    _forget_live(table)
+    logger.info(
+        "Reinstalled materialized aggregates for %s.%s",
+        table,
+        field,
+        extra={"table": table, "field": field},
+    )
+    return True
+
+
+def disable_materialized(table: str, field: str) -> None:
+    """Stop maintaining aggregates for ``table.field`` and drop its rows."""
+    with transaction() as conn:
+        if field in _materialized_fields(conn, table):
+            _remove_field(conn, table, field)
+    _forget_live(table)
+    logger.info(
+        "Stopped materializing %s.%s",
+        table,
+        field,
+        extra={"table": table, "field": field},
+    )
+
+
+def get_materialized(table: str, field: str) -> dict | None:
+    """Return ``row_count``, ``nonnull_count`` and ``sum`` for ``table.field``,
+    or None if the field is not materialized."""
+    if field not in live_fields(table):
+        return None
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT nonnull_count, total_sum "
+            "FROM field_aggregates WHERE table_name = ? AND field_name = ?",
+            (table, field),
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        "row_count": get_row_count(table),
+        "nonnull_count": row[0],
+        "sum": row[1],
+    }
+
+
+def materialized_value_counts(table: str, field: str) -> list[tuple[str, int]] | None:
+    """Return ``(value, count)`` pairs for a select field, most common first,
+    or None if the field is not materialized."""
+    if field not in live_fields(table):
+        return None
+    with get_connection() as conn:
+        return conn.execute(
+            "SELECT value, n FROM field_value_counts "
+            "WHERE table_name = ? AND field_name = ? ORDER BY n DESC, value",
+            (table, field),
+        ).fetchall()
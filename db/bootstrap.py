@@ -34,6 +34,46 @@ DEFAULT_CONFIGS = [
     ("filename", "logs/crossbook.log", "general", "string", 0),
     ("heading", "", "home", "string", 1),
     ("relationship_visibility", "{}", "general", "json", 0),
+    ("list_page_size", 500, "general", "integer", 0),
+    (
+        "list_count_mode",
+        "exact",
+        "general",
+        "select",
+        ["exact", "approximate"],
+        0,
+    ),
+    ("count_approx_threshold", 100000, "general", "integer", 0),
+    ("dashboard_cache_ttl", 0, "general", "integer", 0),
+    ("import_chunk_size", 1000, "general", "integer", 0),
+    ("import_stale_after", 300, "general", "integer", 0),
+    (
+        "db_journal_mode",
+        "WAL",
+        "database",
+        "select",
+        ["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"],
+        0,
+    ),
+    (
+        "db_synchronous",
+        "NORMAL",
+        "database",
+        "select",
+        ["OFF", "NORMAL", "FULL", "EXTRA"],
+        0,
+    ),
+    ("db_cache_size", -20000, "database", "integer", 0),
+    ("db_mmap_size", 268435456, "database", "integer", 0),
+    (
+        "db_temp_store",
+        "MEMORY",
+        "database",
+        "select",
+        ["DEFAULT", "FILE", "MEMORY"],
+        0,
+    ),
+    ("db_busy_timeout", 5000, "database", "integer", 0),
 ]
 
 
@@ -107,6 +147,44 @@ def ensure_relationships_table(path: str) -> None:
             conn.commit()
 
 
+SCHEMA_VERSION_TRIGGERS = {
+    "field_schema": "schema_version_fs",
+    "config_base_tables": "schema_version_cbt",
+}
+
+
+def ensure_schema_version(path: str) -> None:
+    """Ensure the shared schema generation counter and its triggers exist.
+
+    Every write to ``field_schema`` or ``config_base_tables`` bumps the
+    counter in the same transaction, so each process can tell from one
+    SELECT whether its cached schema is still current.
+    """
+    with sqlite3.connect(path) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                generation INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        cur.execute("INSERT OR IGNORE INTO schema_version (id, generation) VALUES (1, 0)")
+        for table, prefix in SCHEMA_VERSION_TRIGGERS.items():
+            for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+                cur.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS {prefix}_{suffix}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE schema_version SET generation = generation + 1 WHERE id = 1;
+                    END
+                    """
+                )
+        conn.commit()
+
+
 def _create_core_tables(cur: sqlite3.Cursor) -> None:
     cur.execute(
         """
@@ -187,6 +265,56 @@ def _create_core_tables(cur: sqlite3.Cursor) -> None:
         """
     )
 
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS table_stats (
+            table_name TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            write_version INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS field_values (
+            table_name TEXT NOT NULL,
+            field_name TEXT NOT NULL,
+            record_id INTEGER NOT NULL,
+            value TEXT NOT NULL COLLATE NOCASE
+        )
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_field_values_lookup ON field_values(table_name, field_name, value)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_field_values_record ON field_values(table_name, record_id)"
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS field_aggregates (
+            table_name TEXT NOT NULL,
+            field_name TEXT NOT NULL,
+            nonnull_count INTEGER NOT NULL DEFAULT 0,
+            total_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (table_name, field_name)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS field_value_counts (
+            table_name TEXT NOT NULL,
+            field_name TEXT NOT NULL,
+            value TEXT NOT NULL,
+            n INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (table_name, field_name, value)
+        )
+        """
+    )
+
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS automation_rules (
@@ -237,6 +365,7 @@ def ensure_default_configs(path: str) -> None:
 
         _copy_config_metadata(cur, path)
         ensure_relationships_table(path)
+    ensure_schema_version(path)
 
 
 def initialize_database(path: str) -> None:
@@ -247,3 +376,4 @@ def initialize_database(path: str) -> None:
         _create_core_tables(cur)
         conn.commit()
     ensure_relationships_table(path)
+    ensure_schema_version(path)
@@ -0,0 +1,143 @@
+import logging
+import sqlite3
+import threading
+
+from db import database
+from db.database import get_connection
+from db.schema import get_field_schema, get_schema_generation
+
+logger = logging.getLogger(__name__)
+
+# Per-table metadata derived from PRAGMA table_info and field_schema. Entries
+# are built lazily and dropped wholesale when the schema generation changes.
+_catalog_lock = threading.Lock()
+_catalog: dict = {"key": None, "tables": {}}
+
+
+def fts_table_name(table: str) -> str:
+    """Return the name of the optional FTS5 index for ``table``."""
+    return f"{table}_fts"
+
+
+class TableMeta:
+    """Derived facts about a base table shared by the record helpers."""
+
+    __slots__ = (
+        "table",
+        "columns",
+        "column_set",
+        "title_field",
+        "label_field",
+        "searchable_fields",
+        "textarea_fields",
+        "multi_value_fields",
+        "has_last_edited",
+        "has_date_created",
+        "fts_columns",
+    )
+
+    def __init__(
+        self,
+        table: str,
+        columns: list[str],
+        table_schema: dict,
+        fts_columns: list[str] | None = None,
+    ):
+        from utils.field_registry import FIELD_TYPES
+
+        self.table = table
+        self.columns = tuple(columns)
+        self.column_set = frozenset(columns)
+
+        title_field = None
+        for field, meta in table_schema.items():
+            if meta.get("title"):
+                title_field = field
+                break
+        self.title_field = title_field
+        self.label_field = _pick_label_field(table, self.columns, title_field)
+
+        self.searchable_fields = tuple(
+            f
+            for f, m in table_schema.items()
+            if f in self.column_set
+            and m["type"] in FIELD_TYPES
+            and FIELD_TYPES[m["type"]].searchable
+        )
+        self.textarea_fields = tuple(
+            f for f, m in table_schema.items() if m.get("type") == "textarea"
+        )
+        # Comma-joined multi_select/foreign_key columns indexed in field_values.
+        self.multi_value_fields = tuple(
+            f
+            for f, m in table_schema.items()
+            if f in self.column_set
+            and m["type"] in FIELD_TYPES
+            and FIELD_TYPES[m["type"]].allows_multiple
+        )
+        self.has_last_edited = "last_edited" in self.column_set
+        self.has_date_created = "date_created" in self.column_set
+        # Columns covered by the table's FTS5 index, or None without one.
+        self.fts_columns = tuple(fts_columns) if fts_columns else None
+
+    def __repr__(self) -> str:
+        return f"TableMeta({self.table!r}, label={self.label_field!r})"
+
+
+def _pick_label_field(table: str, columns: tuple, title_field: str | None) -> str:
+    """Return the column used as a record's display label."""
+    if title_field and title_field in columns:
+        return title_field
+    if table in columns:
+        return table
+    if len(columns) > 1:
+        return columns[1]
+    return columns[0]
+
+
+def build_table_meta(conn: sqlite3.Connection, table: str) -> TableMeta | None:
+    """Build metadata for ``table`` using an open connection."""
+    cols = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")').fetchall()]
+    if not cols:
+        return None
+    fts_cols = None
+    fts_name = fts_table_name(table)
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_name,)
+    ).fetchone():
+        fts_cols = [
+            r[1] for r in conn.execute(f'PRAGMA table_info("{fts_name}")').fetchall()
+        ]
+    return TableMeta(table, cols, get_field_schema().get(table, {}), fts_cols)
+
+
+def get_table_meta(table: str) -> TableMeta | None:
+    """Return cached metadata for ``table`` for the current schema generation.
+
+    Callers are expected to have validated ``table`` already. Returns ``None``
+    when the table has no columns (i.e. does not exist).
+    """
+    key = (database.DB_PATH, get_schema_generation())
+    if _catalog["key"] == key:
+        tables = _catalog["tables"]
+        if table in tables:
+            return tables[table]
+
+    try:
+        with get_connection() as conn:
+            meta = build_table_meta(conn, table)
+    except sqlite3.DatabaseError as exc:
+        logger.exception(
+            "Failed to build table metadata for %s",
+            table,
+            extra={"table": table, "error": str(exc)},
+        )
+        return None
+
+    with _catalog_lock:
+        if key == (database.DB_PATH, get_schema_generation()):
+            if _catalog["key"] != key:
+                _catalog["key"] = key
+                _catalog["tables"] = {}
+            _catalog["tables"][table] = meta
+    return meta
@@ -106,6 +106,69 @@ def get_relationship_visibility() -> dict:
         return {}
 
 
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def _get_config_value(key: str):
+    """Return the raw value stored for ``key`` or None."""
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT value FROM config WHERE key = ?", (key,))
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _get_int_config(key: str, default: int) -> int:
+    """Return ``key`` as an integer, falling back to ``default``."""
+    value = _get_config_value(key)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        logger.warning(
+            "Invalid %s config value %r",
+            key,
+            value,
+            extra={"key": key},
+        )
+        return default
+
+
+def get_list_page_size() -> int:
+    """Return the configured list view page size."""
+    size = _get_int_config("list_page_size", DEFAULT_PAGE_SIZE)
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def get_count_settings() -> tuple[bool, int]:
+    """Return ``(approximate, threshold)`` for list view record counts."""
+    approximate = (_get_config_value("list_count_mode") or "exact") == "approximate"
+    return approximate, _get_int_config("count_approx_threshold", 100_000)
+
+
+DEFAULT_IMPORT_CHUNK_SIZE = 1000
+
+
+def get_import_chunk_size() -> int:
+    """Return the number of rows written per import transaction."""
+    return max(1, _get_int_config("import_chunk_size", DEFAULT_IMPORT_CHUNK_SIZE))
+
+
+DEFAULT_IMPORT_STALE_AFTER = 300
+
+
+def get_import_stale_after() -> int:
+    """Return the seconds without a heartbeat after which a running import is stale."""
+    return max(1, _get_int_config("import_stale_after", DEFAULT_IMPORT_STALE_AFTER))
+
+
+def get_dashboard_cache_ttl() -> int:
+    """Return the dashboard result cache TTL in seconds (0 disables expiry)."""
+    return max(0, _get_int_config("dashboard_cache_ttl", 0))
+
+
 def update_relationship_visibility(table: str, visibility: dict) -> None:
     """Update visibility settings for a specific base table."""
     current = get_relationship_visibility()
@@ -137,6 +200,12 @@ def update_config(key: str, value: str) -> int:
         from db.database import init_db_path
 
         init_db_path(value)
+    elif key.startswith("db_"):
+        # PRAGMA settings are applied when a connection is opened, so drop
+        # pooled connections to pick up the new value.
+        from db.database import reset_connection_pool
+
+        reset_connection_pool()
 
     return affected
 
@@ -1,36 +1,69 @@
 import logging
 import json
-from flask import current_app
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, has_request_context
+from db import database
+from db.config import get_dashboard_cache_ttl
 from db.database import get_connection
-from db.schema import get_field_schema
+from db.schema import get_field_schema, get_schema_generation
 from db.validation import validate_table
-from db.records import count_records, get_all_records
+from db.aggregates import (
+    disable_materialized,
+    enable_materialized,
+    get_materialized,
+    list_materialized,
+    materialized_value_counts,
+)
+from db.records import (
+    _count_nonnull_query,
+    _field_distribution_query,
+    _with_other,
+    get_all_records,
+)
+from db.table_stats import get_table_stats, get_write_version
 import sqlite3
 
 logger = logging.getLogger(__name__)
 
+# Default top-N for distribution charts, matching the field-distribution route.
+DISTRIBUTION_LIMIT = 25
+
+# Aggregate results keyed by (db, kind, table, field, params). Each entry holds
+# the table's write version when it was computed, so any write to the table
+# invalidates it; dashboard_cache_ttl optionally expires entries sooner.
+RESULT_CACHE_SIZE = 256
+_result_cache_lock = threading.Lock()
+_result_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_result_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
 
 def sum_field(table: str, field: str) -> float:
+    try:
+        return _sum_field_query(table, field)
+    except sqlite3.DatabaseError as e:
+        logger.exception(
+            "[sum_field] SQL error for %s.%s: %s",
+            table,
+            field,
+            e,
+            extra={"table": table, "field": field},
+        )
+        return 0
+
+
+def _sum_field_query(table: str, field: str) -> float:
+    """Sum ``field``; database errors propagate."""
     validate_table(table)
     fmeta = get_field_schema().get(table, {}).get(field)
     if fmeta is None or fmeta.get("type") != "number":
         raise ValueError(f"Invalid numeric field: {field}")
     with get_connection() as conn:
         cursor = conn.cursor()
-        try:
-            sql = f'SELECT SUM("{field}") FROM "{table}"'
-            cursor.execute(sql)
-            result = cursor.fetchone()[0]
-            return result or 0
-        except sqlite3.DatabaseError as e:
-            logger.exception(
-                "[sum_field] SQL error for %s.%s: %s",
-                table,
-                field,
-                e,
-                extra={"table": table, "field": field},
-            )
-            return 0
+        sql = f'SELECT SUM("{field}") FROM "{table}"'
+        cursor.execute(sql)
+        return cursor.fetchone()[0] or 0
 
 # Return all dashboard widgets ordered by id.
 def get_dashboard_widgets() -> list[dict]:
@@ -211,22 +244,21 @@ def delete_widget(widget_id: int) -> bool:
 
 
 def get_base_table_counts() -> list[dict]:
-    """Return record counts for each base table."""
+    """Return record counts for each base table from the maintained counters."""
     base_tables = current_app.config.get("BASE_TABLES", [])
-    results: list[dict] = []
-    for table in base_tables:
-        try:
-            cnt = count_records(table)
-        except sqlite3.DatabaseError as exc:
-            logger.exception(
-                "[get_base_table_counts] error for %s: %s",
-                table,
-                exc,
-                extra={"table": table, "error": str(exc)},
-            )
-            cnt = 0
-        results.append({"table": table, "count": cnt})
-    return results
+    try:
+        stats = get_table_stats(base_tables)
+    except sqlite3.DatabaseError as exc:
+        logger.exception(
+            "[get_base_table_counts] error: %s",
+            exc,
+            extra={"tables": base_tables, "error": str(exc)},
+        )
+        stats = {}
+    return [
+        {"table": table, "count": stats.get(table, (0, 0))[0]}
+        for table in base_tables
+    ]
 
 
 def get_top_numeric_values(
@@ -235,6 +267,21 @@ def get_top_numeric_values(
     limit: int = 10,
     ascending: bool = False,
 ) -> list[dict]:
+    try:
+        return _top_numeric_query(table, field, limit, ascending)
+    except sqlite3.DatabaseError as exc:
+        logger.exception(
+            "[get_top_numeric_values] SQL error for %s.%s: %s",
+            table,
+            field,
+            exc,
+            extra={"table": table, "field": field, "error": str(exc)},
+        )
+        return []
+
+
+def _top_numeric_query(table: str, field: str, limit: int, ascending: bool) -> list[dict]:
+    """Return the top ``limit`` values of ``field``; database errors propagate."""
     validate_table(table)
     fmeta = get_field_schema().get(table, {}).get(field)
     if fmeta is None or fmeta.get("type") != "number":
@@ -242,24 +289,14 @@ def get_top_numeric_values(
     direction = "ASC" if ascending else "DESC"
     with get_connection() as conn:
         cur = conn.cursor()
-        try:
-            sql = (
-                f'SELECT id, "{field}" FROM "{table}" '
-                f'WHERE "{field}" IS NOT NULL '
-                f'ORDER BY "{field}" {direction} LIMIT ?'
-            )
-            cur.execute(sql, (int(limit),))
-            rows = cur.fetchall()
-            return [{"id": r[0], "value": r[1]} for r in rows]
-        except sqlite3.DatabaseError as exc:
-            logger.exception(
-                "[get_top_numeric_values] SQL error for %s.%s: %s",
-                table,
-                field,
-                exc,
-                extra={"table": table, "field": field, "error": str(exc)},
-            )
-            return []
+        sql = (
+            f'SELECT id, "{field}" FROM "{table}" '
+            f'WHERE "{field}" IS NOT NULL '
+            f'ORDER BY "{field}" {direction} LIMIT ?'
+        )
+        cur.execute(sql, (int(limit),))
+        rows = cur.fetchall()
+        return [{"id": r[0], "value": r[1]} for r in rows]
 
 
 def get_filtered_records(
@@ -285,3 +322,322 @@ def get_filtered_records(
             extra={"table": table, "error": str(exc)},
         )
         return []
+
+
+def _cache_ttl() -> int:
+    """Return the dashboard cache TTL, read from config once per request."""
+    if not has_request_context():
+        return get_dashboard_cache_ttl()
+    if "dashboard_cache_ttl" not in g:
+        g.dashboard_cache_ttl = get_dashboard_cache_ttl()
+    return g.dashboard_cache_ttl
+
+
+def _cached(kind: str, table: str, field: str, params: tuple, compute, fallback):
+    """Return ``compute()`` for the query, reusing a still-valid cached result.
+
+    A database error is logged and answered with ``fallback`` without being
+    cached, so the next lookup retries the query.
+    """
+    validate_table(table)
+    key = (database.DB_PATH, kind, table, field, params)
+    version = (get_schema_generation(), get_write_version(table))
+    ttl = _cache_ttl()
+    now = time.monotonic()
+    with _result_cache_lock:
+        entry = _result_cache.get(key)
+        if entry is not None and entry[0] == version and (not ttl or now - entry[1] < ttl):
+            _result_cache.move_to_end(key)
+            _result_cache_stats["hits"] += 1
+            return entry[2]
+        _result_cache_stats["misses"] += 1
+
+    try:
+        result = compute()
+    except sqlite3.DatabaseError as exc:
+        logger.exception(
+            "[dashboard] %s query failed for %s.%s: %s",
+            kind,
+            table,
+            field,
+            exc,
+            extra={"table": table, "field": field, "error": str(exc)},
+        )
+        return fallback
+    with _result_cache_lock:
+        _result_cache[key] = (version, now, result)
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+            _result_cache_stats["evictions"] += 1
+    return result
+
+
+def cached_sum_field(table: str, field: str) -> float:
+    return _cached("sum", table, field, (), lambda: _sum_field_query(table, field), 0)
+
+
+def cached_count_nonnull(table: str, field: str) -> int:
+    return _cached("count", table, field, (), lambda: _count_nonnull_query(table, field), 0)
+
+
+def cached_field_distribution(
+    table: str,
+    field: str,
+    limit: int | None = None,
+    bucket: str | None = None,
+    bins: int = 10,
+) -> dict:
+    return _cached(
+        "distribution",
+        table,
+        field,
+        (limit, bucket, bins),
+        lambda: _field_distribution_query(table, field, limit=limit, bucket=bucket, bins=bins),
+        {},
+    )
+
+
+def cached_top_numeric_values(
+    table: str,
+    field: str,
+    limit: int = 10,
+    ascending: bool = False,
+) -> list[dict]:
+    return _cached(
+        "top_numeric",
+        table,
+        field,
+        (int(limit), bool(ascending)),
+        lambda: _top_numeric_query(table, field, limit, ascending),
+        [],
+    )
+
+
+def get_result_cache_stats() -> dict:
+    """Return dashboard result cache counters."""
+    with _result_cache_lock:
+        stats = dict(_result_cache_stats)
+        stats["size"] = len(_result_cache)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def clear_result_cache() -> None:
+    """Drop every cached dashboard result."""
+    with _result_cache_lock:
+        _result_cache.clear()
+
+
+def get_widgets_by_ids(widget_ids: list[int]) -> list[dict]:
+    """Return the dashboard widgets with the given ids, ordered by id."""
+    if not widget_ids:
+        return []
+    placeholders = ", ".join("?" for _ in widget_ids)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT id, title, content, widget_type, \"group\" FROM dashboard_widget "
+                f"WHERE id IN ({placeholders}) ORDER BY id",
+                list(widget_ids),
+            )
+            cols = [d[0] for d in cursor.description]
+            return [dict(zip(cols, r)) for r in cursor.fetchall()]
+        except sqlite3.DatabaseError as e:
+            logger.exception(
+                "[get_widgets_by_ids] SQL error: %s",
+                e,
+                extra={"widget_ids": widget_ids, "error": str(e)},
+            )
+            return []
+
+
+def _split_spec(spec: str | None) -> tuple[str, str] | None:
+    """Split a ``table:field`` widget spec."""
+    if not spec or ":" not in spec:
+        return None
+    table, field = spec.split(":", 1)
+    return table, field
+
+
+def _widget_queries(widget: dict) -> list[tuple]:
+    """Return the aggregate query keys a value or chart widget needs."""
+    try:
+        cfg = json.loads(widget.get("content") or "{}")
+    except json.JSONDecodeError:
+        logger.warning(
+            "Invalid widget content",
+            extra={"widget_id": widget.get("id")},
+        )
+        return []
+    if not isinstance(cfg, dict):
+        return []
+    keys: list[tuple] = []
+    if widget.get("widget_type") == "value":
+        op = cfg.get("operation")
+        if op in ("sum", "count") and cfg.get("table") and cfg.get("field"):
+            keys.append((op, cfg["table"], cfg["field"]))
+        elif op == "math":
+            math_op = cfg.get("math_operation")
+            first = _split_spec(cfg.get("field1"))
+            second = _split_spec(cfg.get("field2"))
+            if first and math_op == "average":
+                keys += [("sum", *first), ("count", *first)]
+            elif first and second:
+                keys += [
+                    (cfg.get("agg1", "sum"), *first),
+                    (cfg.get("agg2", "sum"), *second),
+                ]
+    elif widget.get("widget_type") == "chart":
+        chart_type = cfg.get("chart_type", "bar")
+        spec = _split_spec(cfg.get("x_field") if chart_type == "pie" else cfg.get("field"))
+        if chart_type in ("pie", "bar", "line") and spec:
+            try:
+                limit = int(cfg.get("limit", DISTRIBUTION_LIMIT))
+            except (TypeError, ValueError):
+                limit = DISTRIBUTION_LIMIT
+            keys.append(("distribution", *spec, limit, cfg.get("bucket")))
+        else:
+            agg = cfg.get("aggregation")
+            x_spec = _split_spec(cfg.get("x_field"))
+            y_spec = _split_spec(cfg.get("y_field"))
+            if agg in ("sum", "count") and x_spec and y_spec:
+                keys += [(agg, *x_spec), (agg, *y_spec)]
+    materialized = bool(cfg.get("materialized"))
+    return [(k[0], k[1], k[2], materialized, *k[3:]) for k in keys]
+
+
+def _materialized_query(key: tuple):
+    """Answer ``key`` from materialized aggregates, or None if unsupported."""
+    kind, table, field = key[:3]
+    validate_table(table)
+    fmeta = get_field_schema().get(table, {}).get(field)
+    if fmeta is None or fmeta.get("type") == "hidden" or field == "id":
+        raise ValueError(f"Invalid field: {field}")
+    if kind in ("sum", "count"):
+        if kind == "sum" and fmeta.get("type") != "number":
+            raise ValueError(f"Invalid numeric field: {field}")
+        agg = get_materialized(table, field)
+        if agg is None:
+            return None
+        return agg["sum"] if kind == "sum" else agg["nonnull_count"]
+    limit, bucket = key[4:]
+    if fmeta.get("type") != "select" or bucket:
+        return None
+    pairs = materialized_value_counts(table, field)
+    if pairs is None:
+        return None
+    return _with_other(pairs, sum(n for _, n in pairs), limit or None)
+
+
+def sync_materialized_widgets() -> dict[str, list]:
+    """Materialize the fields used by materialized widgets and stop
+    maintaining fields no widget needs any more.
+
+    Called from the widget create/delete admin actions, so triggers are only
+    installed or dropped by an explicit change to the dashboard.
+    """
+    wanted = set()
+    for widget in get_dashboard_widgets():
+        for key in _widget_queries(widget):
+            if key[3]:
+                wanted.add((key[1], key[2]))
+    current = set(list_materialized())
+    enabled, disabled = [], []
+    for table, field in sorted(wanted):
+        try:
+            validate_table(table)
+            if enable_materialized(table, field):
+                enabled.append(f"{table}:{field}")
+        except ValueError:
+            logger.warning(
+                "Cannot materialize %s.%s",
+                table,
+                field,
+                extra={"table": table, "field": field},
+            )
+    for table, field in sorted(current - wanted):
+        disable_materialized(table, field)
+        disabled.append(f"{table}:{field}")
+    return {"enabled": enabled, "disabled": disabled}
+
+
+def _run_query(key: tuple):
+    """Run one aggregate query described by ``key``."""
+    kind, table, field, materialized = key[:4]
+    if materialized:
+        result = _materialized_query(key)
+        if result is not None:
+            return result
+    if kind == "sum":
+        return cached_sum_field(table, field)
+    if kind == "count":
+        return cached_count_nonnull(table, field)
+    limit, bucket = key[4:]
+    return cached_field_distribution(table, field, limit=limit, bucket=bucket)
+
+
+def _math_result(cfg: dict, v1, v2):
+    op = cfg.get("math_operation")
+    if op == "add":
+        return v1 + v2
+    if op == "subtract":
+        return v1 - v2
+    if op == "multiply":
+        return v1 * v2
+    if op == "divide":
+        return v1 / (v2 or 1)
+    return 0
+
+
+def get_widget_data(widget_ids: list[int]) -> dict[int, dict]:
+    """Return computed data for value and chart widgets in one pass.
+
+    Identical aggregates (same kind, table, field and options) are computed
+    once, and every query runs on the same pooled connection.
+    """
+    widgets = get_widgets_by_ids(widget_ids)
+    plans = {w["id"]: (w, _widget_queries(w)) for w in widgets}
+    unique = list(dict.fromkeys(k for _, keys in plans.values() for k in keys))
+
+    results: dict[tuple, object] = {}
+    with get_connection():
+        for key in unique:
+            try:
+                results[key] = _run_query(key)
+            except (ValueError, sqlite3.DatabaseError) as exc:
+                logger.warning(
+                    "Dashboard query failed: %s",
+                    key,
+                    extra={"query": list(key), "error": str(exc)},
+                )
+                results[key] = None
+    logger.debug(
+        "Computed %d dashboard queries for %d widgets",
+        len(unique),
+        len(widgets),
+        extra={"queries": len(unique), "widgets": len(widgets)},
+    )
+
+    data: dict[int, dict] = {}
+    for widget_id, (widget, keys) in plans.items():
+        values = [results.get(k) for k in keys]
+        if not keys:
+            data[widget_id] = {}
+        elif keys[0][0] == "distribution":
+            data[widget_id] = {"distribution": values[0] or {}}
+        elif widget["widget_type"] == "chart":
+            data[widget_id] = {"values": [v or 0 for v in values]}
+        else:
+            cfg = json.loads(widget.get("content") or "{}")
+            nums = [v or 0 for v in values]
+            if cfg.get("operation") != "math":
+                value = nums[0]
+            elif cfg.get("math_operation") == "average":
+                value = nums[0] / nums[1] if nums[1] else 0
+            else:
+                value = _math_result(cfg, nums[0], nums[1])
+            data[widget_id] = {"value": value}
+    return data
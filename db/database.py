@@ -1,7 +1,9 @@
+import html
 import sqlite3
 import re
 import os
 import logging
+import threading
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, "data", "crossbook.db")
@@ -25,6 +27,68 @@ except sqlite3.Error as exc:
 
 DB_PATH = os.path.abspath(DEFAULT_DB_PATH)
 
+# PRAGMAs applied once to every pooled connection. Values can be overridden
+# through ``db_<pragma>`` keys in the config table (database section).
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+PRAGMA_CHOICES = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+}
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool_generation = 0
+_pool_stats = {"hits": 0, "misses": 0, "discarded": 0}
+
+
+class _PooledConnection:
+    """Thread-owned connection plus the bookkeeping needed to reuse it."""
+
+    __slots__ = ("conn", "path", "pid", "generation", "depth", "tx_depth")
+
+    def __init__(self, conn: sqlite3.Connection, path: str, generation: int):
+        self.conn = conn
+        self.path = path
+        self.pid = os.getpid()
+        self.generation = generation
+        self.depth = 0
+        self.tx_depth = 0
+
+    def is_stale(self) -> bool:
+        return (
+            self.path != DB_PATH
+            or self.pid != os.getpid()
+            or self.generation != _pool_generation
+        )
+
+
+def _regexp(pattern, value):
+    return 1 if value is not None and re.search(pattern, str(value)) else 0
+
+
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def _strip_tags(value):
+    """SQL ``strip_tags()``: textarea HTML reduced to its text for indexing."""
+    if not isinstance(value, str):
+        return value
+    return html.unescape(_TAG_RE.sub(" ", value))
+
+
+def _bump_stat(name: str) -> None:
+    with _pool_lock:
+        _pool_stats[name] += 1
+
 
 def init_db_path(path: str | None = None) -> None:
     """Set DB_PATH from an argument or the DB config table."""
@@ -50,8 +114,9 @@ def init_db_path(path: str | None = None) -> None:
         )
 
     try:
-        from db.bootstrap import ensure_relationships_table
+        from db.bootstrap import ensure_relationships_table, ensure_schema_version
         ensure_relationships_table(DB_PATH)
+        ensure_schema_version(DB_PATH)
     except sqlite3.DatabaseError as exc:
         logger.exception(
             "Failed to ensure relationships table",
@@ -59,26 +124,220 @@ def init_db_path(path: str | None = None) -> None:
         )
 
 
-@contextmanager
-def get_connection():
-    """Yield a SQLite connection that is automatically closed."""
-    conn = sqlite3.connect(DB_PATH)
-    if SUPPORTS_REGEX:
+def _load_pragma_settings(conn: sqlite3.Connection) -> dict:
+    """Return DEFAULT_PRAGMAS merged with ``db_<pragma>`` config overrides."""
+    settings = dict(DEFAULT_PRAGMAS)
+    keys = [f"db_{name}" for name in DEFAULT_PRAGMAS]
+    placeholders = ", ".join("?" for _ in keys)
+    try:
+        rows = conn.execute(
+            f"SELECT key, value FROM config WHERE key IN ({placeholders})", keys
+        ).fetchall()
+    except sqlite3.DatabaseError:
+        # Fresh databases have no config table yet; use the defaults.
+        return settings
+
+    for key, value in rows:
+        name = key[len("db_"):]
+        if value is None or str(value).strip() == "":
+            continue
+        if name in PRAGMA_CHOICES:
+            choice = str(value).strip().upper()
+            if choice not in PRAGMA_CHOICES[name]:
+                logger.warning(
+                    "Ignoring invalid %s value %r",
+                    key,
+                    value,
+                    extra={"key": key, "value": value},
+                )
+                continue
+            settings[name] = choice
+        else:
+            try:
+                settings[name] = int(value)
+            except (TypeError, ValueError):
+                logger.warning(
+                    "Ignoring non-integer %s value %r",
+                    key,
+                    value,
+                    extra={"key": key, "value": value},
+                )
+    return settings
+
+
+def _apply_pragmas(conn: sqlite3.Connection, path: str) -> None:
+    """Apply the tuned PRAGMAs to a newly opened connection."""
+    # busy_timeout goes first so the journal_mode switch can wait on locks.
+    settings = _load_pragma_settings(conn)
+    for name in ["busy_timeout"] + [n for n in settings if n != "busy_timeout"]:
         try:
-            conn.create_function(
-                "REGEXP",
-                2,
-                lambda pattern, value: 1 if value is not None and re.search(pattern, str(value)) else 0,
+            conn.execute(f"PRAGMA {name} = {settings[name]}")
+        except sqlite3.DatabaseError as exc:
+            logger.exception(
+                "Failed to apply PRAGMA %s",
+                name,
+                extra={"db_path": path, "pragma": name, "error": str(exc)},
             )
+
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    """Open a connection with REGEXP and strip_tags registered and PRAGMAs applied."""
+    conn = sqlite3.connect(path)
+    if SUPPORTS_REGEX:
+        try:
+            conn.create_function("REGEXP", 2, _regexp, deterministic=True)
         except sqlite3.DatabaseError as exc:
             logger.exception(
                 "Failed to register REGEXP function",
-                extra={"db_path": DB_PATH, "error": str(exc)},
+                extra={"db_path": path, "error": str(exc)},
+            )
+    try:
+        conn.create_function("strip_tags", 1, _strip_tags, deterministic=True)
+    except sqlite3.DatabaseError as exc:
+        logger.exception(
+            "Failed to register strip_tags function",
+            extra={"db_path": path, "error": str(exc)},
+        )
+    _apply_pragmas(conn, path)
+    return conn
+
+
+def _discard(entry: _PooledConnection) -> None:
+    """Drop a pooled connection, closing it if this process owns it."""
+    if entry.pid == os.getpid():
+        try:
+            entry.conn.close()
+        except sqlite3.Error:
+            logger.warning(
+                "Failed to close pooled connection",
+                exc_info=True,
+                extra={"db_path": entry.path},
             )
+    _bump_stat("discarded")
+
+
+@contextmanager
+def get_connection():
+    """Yield this thread's pooled connection to DB_PATH.
+
+    The connection stays open for reuse by later calls on the same thread.
+    Nested calls share it; when the outermost block exits, any transaction
+    left uncommitted is rolled back, matching the old close-on-exit behavior.
+    """
+    entry = getattr(_local, "entry", None)
+    if entry is not None and entry.is_stale():
+        if entry.depth:
+            # The path or pool changed while this thread is mid-block; hand
+            # out a one-off connection so the open block is left untouched.
+            _bump_stat("misses")
+            conn = _open_connection(DB_PATH)
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+        _discard(entry)
+        entry = _local.entry = None
+
+    if entry is None:
+        _bump_stat("misses")
+        entry = _PooledConnection(
+            _open_connection(DB_PATH), DB_PATH, _pool_generation
+        )
+        _local.entry = entry
+    else:
+        _bump_stat("hits")
+
+    entry.depth += 1
     try:
-        yield conn
+        yield entry.conn
     finally:
-        conn.close()
+        entry.depth -= 1
+        if entry.depth == 0 and entry.conn.in_transaction:
+            entry.conn.rollback()
+
+
+def _pooled_entry(conn: sqlite3.Connection) -> _PooledConnection | None:
+    entry = getattr(_local, "entry", None)
+    if entry is not None and entry.conn is conn:
+        return entry
+    return None
+
+
+@contextmanager
+def transaction():
+    """Open a unit of work that nested write helpers join.
+
+    Helpers that finish with ``commit(conn)`` skip their own commit while a
+    unit of work is open on this thread, so everything written inside the
+    outermost block is committed once on exit, or rolled back if it raises.
+    The write lock is taken up front (``BEGIN IMMEDIATE``) to avoid lock
+    upgrades failing when another process is writing.
+    """
+    with get_connection() as conn:
+        entry = _pooled_entry(conn)
+        if entry is not None and entry.tx_depth:
+            entry.tx_depth += 1
+            try:
+                yield conn
+            finally:
+                entry.tx_depth -= 1
+            return
+
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        if entry is not None:
+            entry.tx_depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            if entry is not None:
+                entry.tx_depth = 0
+
+
+def in_transaction() -> bool:
+    """Return True if a unit of work is open on the calling thread."""
+    entry = getattr(_local, "entry", None)
+    return bool(entry is not None and entry.tx_depth)
+
+
+def commit(conn: sqlite3.Connection) -> None:
+    """Commit ``conn`` unless it belongs to an open unit of work."""
+    entry = _pooled_entry(conn)
+    if entry is not None and entry.tx_depth:
+        return
+    conn.commit()
+
+
+def close_connection() -> None:
+    """Close the calling thread's pooled connection, if any."""
+    entry = getattr(_local, "entry", None)
+    if entry is not None and entry.depth == 0:
+        _discard(entry)
+        _local.entry = None
+
+
+def reset_connection_pool() -> None:
+    """Invalidate every pooled connection so PRAGMA changes take effect."""
+    global _pool_generation
+    with _pool_lock:
+        _pool_generation += 1
+    close_connection()
+
+
+def get_pool_stats() -> dict:
+    """Return connection pool hit/miss counters."""
+    with _pool_lock:
+        stats = dict(_pool_stats)
+        stats["generation"] = _pool_generation
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
 
 
 def check_db_status(path: str) -> str:
@@ -2,6 +2,11 @@ import json
 from db.database import get_connection
 from db.config import get_layout_defaults
 from db.validation import validate_table, validate_field
+from db.aggregates import ensure_aggregates, reinstall_materialized
+from db.schema import bump_schema_generation
+from db.field_values import sync_field_values
+from db.search import refresh_fts_index
+from db.table_stats import ensure_table_stats
 from utils.field_registry import get_field_type, get_type_size_map
 
 
@@ -81,6 +86,9 @@ def add_field_to_schema(
             tuple(values),
         )
         conn.commit()
+    bump_schema_generation()
+    sync_field_values(table)
+    refresh_fts_index(table)
 
 def add_column_to_table(table_name, field_name, field_type):
     from db.database import get_connection
@@ -102,6 +110,7 @@ def add_column_to_table(table_name, field_name, field_type):
         cur = conn.cursor()
         cur.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{field_name}" {sql_type}')
         conn.commit()
+    bump_schema_generation()
 
 def drop_column_from_table(table, field_name):
     validate_table(table)
@@ -143,6 +152,12 @@ def drop_column_from_table(table, field_name):
         cur.execute(f'ALTER TABLE "{temp_table}" RENAME TO "{table}"')
 
         conn.commit()
+    bump_schema_generation()
+    # Dropping the original table also dropped its FTS and stats triggers.
+    refresh_fts_index(table, force=True)
+    ensure_table_stats([table])
+    ensure_aggregates(table)
+    sync_field_values(table)
 
 def remove_field_from_schema(table, field_name):
     validate_table(table)
@@ -154,3 +169,35 @@ def remove_field_from_schema(table, field_name):
             (table, field_name),
         )
         conn.commit()
+    bump_schema_generation()
+    sync_field_values(table)
+    refresh_fts_index(table)
+
+
+def change_field_type(table, field_name, new_type):
+    """Change a field's type in field_schema and resync what depends on it.
+
+    Options are cleared when the new type does not allow them.
+    """
+    validate_table(table)
+    validate_field(table, field_name)
+    ft = get_field_type(new_type)
+    if not ft:
+        raise ValueError(f"Unsupported field type: {new_type}")
+    with get_connection() as conn:
+        cur = conn.cursor()
+        if getattr(ft, 'allows_options', False):
+            cur.execute(
+                'UPDATE field_schema SET field_type = ? WHERE table_name = ? AND field_name = ?',
+                (new_type, table, field_name),
+            )
+        else:
+            cur.execute(
+                'UPDATE field_schema SET field_type = ?, field_options = NULL WHERE table_name = ? AND field_name = ?',
+                (new_type, table, field_name),
+            )
+        conn.commit()
+    bump_schema_generation()
+    sync_field_values(table)
+    reinstall_materialized(table, field_name)
+    refresh_fts_index(table)
@@ -1,7 +1,7 @@
 import logging
 import datetime
 import sqlite3
-from db.database import get_connection
+from db.database import get_connection, commit, transaction
 from db.validation import validate_table
 
 logger = logging.getLogger(__name__)
@@ -45,7 +45,7 @@ def append_edit_log(
                 """,
                 (table, record_id, timestamp, field_name, old_value, new_value, actor),
             )
-            conn.commit()
+            commit(conn)
             logger.info(
                 "Logged edit for %s id=%s field=%s old=%r new=%r",
                 table,
@@ -67,6 +67,42 @@ def append_edit_log(
             )
 
 
+def append_edit_logs(
+    table: str,
+    entries: list[tuple],
+    actor: str | None = None,
+) -> int:
+    """Insert many edit_history rows for one table with a single executemany.
+
+    ``entries`` holds ``(record_id, field_name, old_value, new_value)`` tuples.
+    Errors propagate so a surrounding transaction() can roll back.
+    """
+    validate_table(table)
+    if not entries:
+        return 0
+    timestamp = datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+    with get_connection() as conn:
+        conn.executemany(
+            """
+            INSERT INTO edit_history
+                (table_name, record_id, timestamp, field_name, old_value, new_value, actor)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (table, record_id, timestamp, field_name, old_value, new_value, actor)
+                for record_id, field_name, old_value, new_value in entries
+            ],
+        )
+        commit(conn)
+    logger.info(
+        "Logged %s edits for %s",
+        len(entries),
+        table,
+        extra={"table": table, "count": len(entries), "actor": actor},
+    )
+    return len(entries)
+
+
 def get_edit_history(table_name: str, record_id: int, limit: int | None = None) -> list[dict]:
     """Return edit history rows ordered by timestamp descending."""
     validate_table(table_name)
@@ -118,26 +154,27 @@ def revert_edit(entry: dict) -> bool:
                 extra={"table": table, "record_id": record_id},
             )
             return False
-        if field.startswith("relation_"):
-            from db.relationships import add_relationship, remove_relationship
-
-            rel_table = field[len("relation_") :]
-            if old_val is None and new_val is not None:
-                add_relationship(
-                    table, record_id, rel_table, int(new_val), actor="undo"
-                )
-            elif new_val is None and old_val is not None:
-                remove_relationship(
-                    table, record_id, rel_table, int(old_val), actor="undo"
-                )
+        with transaction():
+            if field.startswith("relation_"):
+                from db.relationships import add_relationship, remove_relationship
+
+                rel_table = field[len("relation_") :]
+                if old_val is None and new_val is not None:
+                    add_relationship(
+                        table, record_id, rel_table, int(new_val), actor="undo"
+                    )
+                elif new_val is None and old_val is not None:
+                    remove_relationship(
+                        table, record_id, rel_table, int(old_val), actor="undo"
+                    )
+                else:
+                    return False
             else:
-                return False
-        else:
-            from db.records import update_field_value
+                from db.records import update_field_value
 
-            update_field_value(table, record_id, field, old_val)
-        if not field.startswith("relation_"):
-            append_edit_log(table, record_id, field, new_val, old_val, actor="undo")
+                update_field_value(table, record_id, field, old_val)
+            if not field.startswith("relation_"):
+                append_edit_log(table, record_id, field, new_val, old_val, actor="undo")
     except (sqlite3.DatabaseError, ValueError):
         logger.exception(
             "Failed to revert edit",
@@ -0,0 +1,241 @@
+import logging
+import sqlite3
+
+from db.catalog import get_table_meta
+from db.database import get_connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# One row per element of a comma-joined multi_select/foreign_key value, so
+# element filters and distributions can use an index instead of LIKE scans
+# and Python-side splitting. Triggers on each base table keep it in sync with
+# every write path, including imports. The triggers are installed, dropped
+# and backfilled by sync_field_values() when the schema changes, never on
+# read.
+FIELD_VALUES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS field_values (
+        table_name TEXT NOT NULL,
+        field_name TEXT NOT NULL,
+        record_id INTEGER NOT NULL,
+        value TEXT NOT NULL COLLATE NOCASE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_field_values_lookup "
+    "ON field_values(table_name, field_name, value)",
+    "CREATE INDEX IF NOT EXISTS idx_field_values_record "
+    "ON field_values(table_name, record_id)",
+)
+
+_TRIGGER_SUFFIXES = ("ai", "au", "ad")
+
+
+def _trigger_name(table: str, field: str, suffix: str) -> str:
+    return f"fv__{table}__{field}__{suffix}"
+
+
+def _split_values(expr: str) -> str:
+    """Return a json_each() source yielding the comma-separated parts of ``expr``.
+
+    json_quote() never emits a bare comma inside an escape sequence, so
+    swapping commas for '","' always yields a valid JSON array of strings.
+    """
+    return f"""json_each('[' || replace(json_quote({expr}), ',', '","') || ']')"""
+
+
+def _insert_values_sql(table: str, field: str, record_expr: str, value_expr: str) -> str:
+    return (
+        "INSERT INTO field_values (table_name, field_name, record_id, value) "
+        f"SELECT '{table}', '{field}', {record_expr}, trim(j.value) "
+        f"FROM {_split_values(value_expr)} AS j "
+        "WHERE j.value IS NOT NULL AND trim(j.value) <> ''"
+    )
+
+
+def _delete_values_sql(table: str, field: str, record_expr: str) -> str:
+    return (
+        "DELETE FROM field_values "
+        f"WHERE table_name = '{table}' AND field_name = '{field}' "
+        f"AND record_id = {record_expr}"
+    )
+
+
+def _drop_field(conn: sqlite3.Connection, table: str, field: str) -> None:
+    for suffix in _TRIGGER_SUFFIXES:
+        conn.execute(f'DROP TRIGGER IF EXISTS "{_trigger_name(table, field, suffix)}"')
+    conn.execute(
+        "DELETE FROM field_values WHERE table_name = ? AND field_name = ?",
+        (table, field),
+    )
+
+
+def _install_field(conn: sqlite3.Connection, table: str, field: str) -> None:
+    """(Re)create the triggers for ``table.field`` and backfill its values."""
+    _drop_field(conn, table, field)
+    ai, au, ad = (_trigger_name(table, field, s) for s in _TRIGGER_SUFFIXES)
+    conn.execute(
+        f'CREATE TRIGGER "{ai}" AFTER INSERT ON "{table}" BEGIN '
+        f'{_insert_values_sql(table, field, "new.id", f"new.{field}")}; END'
+    )
+    conn.execute(
+        f'CREATE TRIGGER "{au}" AFTER UPDATE OF {field} ON "{table}" BEGIN '
+        f'{_delete_values_sql(table, field, "old.id")}; '
+        f'{_insert_values_sql(table, field, "new.id", f"new.{field}")}; END'
+    )
+    conn.execute(
+        f'CREATE TRIGGER "{ad}" AFTER DELETE ON "{table}" BEGIN '
+        f'{_delete_values_sql(table, field, "old.id")}; END'
+    )
+    conn.execute(
+        "INSERT INTO field_values (table_name, field_name, record_id, value) "
+        f"SELECT '{table}', '{field}', t.id, trim(j.value) "
+        f'FROM "{table}" AS t, {_split_values(f"t.{field}")} AS j '
+        "WHERE j.value IS NOT NULL AND trim(j.value) <> ''"
+    )
+
+
+def sync_field_values(table: str) -> tuple[str, ...]:
+    """Sync the value index triggers for ``table`` with its current schema.
+
+    Called after a schema change. Returns the indexed fields. Fields that are
+    new (or whose table was recreated) are backfilled; fields that are no
+    longer multi-valued, or no longer exist, have their triggers and rows
+    removed.
+    """
+    meta = get_table_meta(table)
+    if meta is None:
+        return ()
+
+    prefix = f"fv__{table}__"
+    with get_connection() as conn:
+        names = {
+            r[0]
+            for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+                (table,),
+            ).fetchall()
+            if r[0].startswith(prefix)
+        }
+        has_table = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'field_values'"
+        ).fetchone()
+        indexed = set()
+        if has_table:
+            indexed = {
+                r[0]
+                for r in conn.execute(
+                    "SELECT DISTINCT field_name FROM field_values WHERE table_name = ?",
+                    (table,),
+                ).fetchall()
+            }
+    present: dict[str, set] = {}
+    for name in names:
+        field, _, suffix = name[len(prefix):].rpartition("__")
+        present.setdefault(field, set()).add(suffix)
+
+    desired = set(meta.multi_value_fields)
+    complete = {f for f, sfx in present.items() if sfx == set(_TRIGGER_SUFFIXES)}
+    to_install = desired - complete if has_table else desired
+    to_drop = (set(present) | indexed) - desired
+    if to_install or to_drop or not has_table:
+        with transaction() as conn:
+            for stmt in FIELD_VALUES_SQL:
+                conn.execute(stmt)
+            for field in sorted(to_drop):
+                _drop_field(conn, table, field)
+            for field in sorted(to_install):
+                _install_field(conn, table, field)
+        logger.info(
+            "Synced field value index for %s",
+            table,
+            extra={
+                "table": table,
+                "installed": sorted(to_install),
+                "dropped": sorted(to_drop),
+            },
+        )
+    return meta.multi_value_fields
+
+
+def migrate_field_values() -> None:
+    """Install the value index for every base table.
+
+    Run once at startup so databases created before the index existed (or
+    whose triggers were lost) are backfilled outside any request.
+    """
+    try:
+        with get_connection() as conn:
+            tables = [
+                r[0]
+                for r in conn.execute(
+                    "SELECT table_name FROM config_base_tables"
+                ).fetchall()
+            ]
+    except sqlite3.DatabaseError as exc:
+        logger.warning(
+            "Could not list base tables for the value index: %s",
+            exc,
+            extra={"error": str(exc)},
+        )
+        return
+    for table in tables:
+        try:
+            sync_field_values(table)
+        except (sqlite3.DatabaseError, ValueError) as exc:
+            logger.exception(
+                "Failed to sync field value index for %s",
+                table,
+                extra={"table": table, "error": str(exc)},
+            )
+
+
+def value_filter_clause(
+    table: str,
+    field: str,
+    values: list,
+    mode: str,
+    params: list,
+) -> str:
+    """Return an indexed semi-join matching records whose ``field`` holds
+    any (or, with ``mode == 'all'``, every) of ``values`` as an element."""
+    subquery = (
+        "id IN (SELECT record_id FROM field_values "
+        "WHERE table_name = ? AND field_name = ? AND value {cond})"
+    )
+    if mode == "all":
+        parts = []
+        for value in values:
+            params.extend([table, field, str(value).strip()])
+            parts.append(subquery.format(cond="= ?"))
+        return "(" + " AND ".join(parts) + ")"
+    params.extend([table, field, *(str(v).strip() for v in values)])
+    placeholders = ", ".join("?" for _ in values)
+    return "(" + subquery.format(cond=f"IN ({placeholders})") + ")"
+
+
+def value_distribution(table: str, field: str, limit: int | None = None) -> dict[str, int]:
+    """Return ``{value: record count}`` for a multi-valued field.
+
+    With ``limit`` only the most common values are returned and the rest are
+    summed under ``"Other"``.
+    """
+    sql = (
+        "SELECT value COLLATE BINARY AS v, COUNT(*) AS n FROM field_values "
+        "WHERE table_name = ? AND field_name = ? "
+        "GROUP BY v ORDER BY n DESC, v"
+    )
+    with get_connection() as conn:
+        if limit is not None:
+            rows = conn.execute(sql + " LIMIT ?", (table, field, limit)).fetchall()
+            total = conn.execute(
+                "SELECT COUNT(*) FROM field_values WHERE table_name = ? AND field_name = ?",
+                (table, field),
+            ).fetchone()[0]
+        else:
+            rows = conn.execute(sql, (table, field)).fetchall()
+            total = sum(r[1] for r in rows)
+    counts = {r[0]: r[1] for r in rows}
+    rest = total - sum(counts.values())
+    if rest > 0:
+        counts["Other"] = counts.get("Other", 0) + rest
+    return counts
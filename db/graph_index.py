@@ -0,0 +1,275 @@
+import logging
+import threading
+from array import array
+from collections import deque
+
+from db import database
+from db.database import get_connection
+from db.table_stats import get_write_version
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per batch while building the index.
+BUILD_BATCH_SIZE = 50_000
+# Pending edge changes applied on top of the CSR arrays before a rebuild.
+MAX_DELTA_EDGES = 10_000
+
+_index_lock = threading.Lock()
+_index: dict = {"key": None, "graph": None}
+
+
+class GraphIndex:
+    """Undirected relationship graph held in compressed sparse row form.
+
+    Records are encoded as dense integer node ids. ``offsets[n]`` ..
+    ``offsets[n + 1]`` slices ``neighbors`` for node ``n``. Edges added or
+    removed after the build live in small delta sets until the next rebuild.
+    The deltas are immutable: writers build new ones and swap them in under
+    ``_index_lock``, and each query reads one snapshot without locking.
+    """
+
+    def __init__(self, version: int):
+        self.version = version
+        self.tables: list[str] = []
+        self._table_ids: dict[str, int] = {}
+        self._node_ids: dict[int, int] = {}
+        self._nodes = array("q")
+        self.offsets = array("l", [0])
+        self.neighbors = array("l")
+        # (added, removed): {node: frozenset(nodes)} and frozenset of pairs.
+        self._delta: tuple[dict, frozenset] = ({}, frozenset())
+        self.delta_size = 0
+        self.edge_count = 0
+
+    # -- node encoding -------------------------------------------------
+
+    def _key(self, table: str, record_id: int, create: bool = False) -> int | None:
+        tid = self._table_ids.get(table)
+        if tid is None:
+            if not create:
+                return None
+            tid = self._table_ids[table] = len(self.tables)
+            self.tables.append(table)
+        return (tid << 40) | int(record_id)
+
+    def node(self, table: str, record_id: int, create: bool = False) -> int | None:
+        """Return the dense node id for a record, or None if it has no links."""
+        key = self._key(table, record_id, create)
+        if key is None:
+            return None
+        node = self._node_ids.get(key)
+        if node is None and create:
+            node = self._node_ids[key] = len(self._nodes)
+            self._nodes.append(key)
+        return node
+
+    def record(self, node: int) -> tuple[str, int]:
+        key = self._nodes[node]
+        return self.tables[key >> 40], key & ((1 << 40) - 1)
+
+    # -- building --------------------------------------------------------
+
+    @classmethod
+    def build(cls, conn, version: int) -> "GraphIndex":
+        graph = cls(version)
+        src = array("l")
+        dst = array("l")
+        cur = conn.execute("SELECT table_a, id_a, table_b, id_b FROM relationships")
+        while True:
+            rows = cur.fetchmany(BUILD_BATCH_SIZE)
+            if not rows:
+                break
+            for table_a, id_a, table_b, id_b in rows:
+                a = graph.node(table_a, id_a, create=True)
+                b = graph.node(table_b, id_b, create=True)
+                src.append(a)
+                dst.append(b)
+        graph.edge_count = len(src)
+
+        node_count = len(graph._nodes)
+        degree = array("l", bytes(array("l").itemsize * (node_count + 1)))
+        for a, b in zip(src, dst):
+            degree[a + 1] += 1
+            degree[b + 1] += 1
+        for n in range(node_count):
+            degree[n + 1] += degree[n]
+        graph.offsets = degree
+        fill = array("l", degree[:-1]) if node_count else array("l")
+        graph.neighbors = array("l", bytes(array("l").itemsize * degree[-1]))
+        for a, b in zip(src, dst):
+            graph.neighbors[fill[a]] = b
+            fill[a] += 1
+            graph.neighbors[fill[b]] = a
+            fill[b] += 1
+        return graph
+
+    # -- incremental changes ---------------------------------------------
+
+    def apply_changes(self, changes) -> None:
+        """Publish a new delta with ``(a, b, added)`` node pairs applied.
+
+        Callers hold ``_index_lock``; readers keep using the old snapshot.
+        """
+        added, removed = self._delta
+        added = dict(added)
+        removed = set(removed)
+
+        def link(a: int, b: int, on: bool) -> None:
+            for x, y in ((a, b), (b, a)):
+                current = added.get(x, frozenset())
+                added[x] = current | {y} if on else current - {y}
+
+        for a, b, is_add in changes:
+            pair = (min(a, b), max(a, b))
+            if is_add:
+                if pair in removed:
+                    removed.discard(pair)
+                elif b not in self._csr_neighbors(a):
+                    link(a, b, True)
+            elif b in added.get(a, ()):
+                link(a, b, False)
+            elif b in self._csr_neighbors(a):
+                removed.add(pair)
+            self.delta_size += 1
+        self._delta = ({k: v for k, v in added.items() if v}, frozenset(removed))
+
+    # -- queries -----------------------------------------------------------
+
+    def _csr_neighbors(self, node: int):
+        if node >= len(self.offsets) - 1:
+            return ()
+        return self.neighbors[self.offsets[node]:self.offsets[node + 1]]
+
+    def _neighbors(self, node: int, delta):
+        added, removed = delta
+        for other in self._csr_neighbors(node):
+            if removed and (min(node, other), max(node, other)) in removed:
+                continue
+            yield other
+        yield from added.get(node, ())
+
+    def neighbors_of(self, node: int):
+        return self._neighbors(node, self._delta)
+
+    def degree(self, node: int) -> int:
+        return sum(1 for _ in self.neighbors_of(node))
+
+    def component(self, node: int, limit: int | None = None) -> tuple[list[int], bool]:
+        """Return ``(members, truncated)`` for the component containing ``node``."""
+        delta = self._delta
+        seen = {node}
+        queue = deque([node])
+        while queue:
+            current = queue.popleft()
+            for other in self._neighbors(current, delta):
+                if other not in seen:
+                    if limit is not None and len(seen) >= limit:
+                        return list(seen), True
+                    seen.add(other)
+                    queue.append(other)
+        return list(seen), False
+
+    def shortest_path(self, start: int, goal: int, max_depth: int | None = None) -> list[int] | None:
+        """Return the node ids on a shortest path, or None if unreachable."""
+        if start == goal:
+            return [start]
+        delta = self._delta
+        parents = {start: None}
+        frontier = [start]
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            next_frontier = []
+            for current in frontier:
+                for other in self._neighbors(current, delta):
+                    if other in parents:
+                        continue
+                    parents[other] = current
+                    if other == goal:
+                        path = [goal]
+                        while parents[path[-1]] is not None:
+                            path.append(parents[path[-1]])
+                        return path[::-1]
+                    next_frontier.append(other)
+            frontier = next_frontier
+        return None
+
+    def stats(self) -> dict:
+        added, removed = self._delta
+        added_edges = sum(len(v) for v in added.values()) // 2
+        return {
+            "nodes": len(self._nodes),
+            "edges": self.edge_count + added_edges - len(removed),
+            "pending_changes": self.delta_size,
+            "version": self.version,
+        }
+
+
+def get_graph_index() -> GraphIndex:
+    """Return the graph index for the current database, building it if needed.
+
+    The index is rebuilt when the relationships table was written by
+    something other than add/remove_relationship (e.g. an import) or when the
+    pending delta grows past ``MAX_DELTA_EDGES``.
+    """
+    version = get_write_version("relationships")
+    with _index_lock:
+        graph = _index["graph"]
+        if (
+            graph is not None
+            and _index["key"] == database.DB_PATH
+            and graph.version == version
+            and graph.delta_size <= MAX_DELTA_EDGES
+        ):
+            return graph
+        with get_connection() as conn:
+            graph = GraphIndex.build(conn, version)
+        _index["key"] = database.DB_PATH
+        _index["graph"] = graph
+    logger.info(
+        "Built relationship graph index",
+        extra=graph.stats(),
+    )
+    return graph
+
+
+def note_relationship_changes(changes, writes: int | None = None) -> None:
+    """Apply add/remove changes to a built index instead of rebuilding it.
+
+    ``changes`` holds ``(table_a, id_a, table_b, id_b, added)`` tuples for
+    links that were just committed to the relationships table. ``writes``
+    is the number of relationships rows written (default ``len(changes)``),
+    including writes that leave the graph alone, such as a ``two_way``
+    update. Call this after the outermost commit.
+    """
+    if database.in_transaction():
+        # An outer unit of work may still roll back. Leave the index alone;
+        # once it commits, the version check rebuilds the index.
+        return
+    if writes is None:
+        writes = len(changes)
+    with _index_lock:
+        graph = _index["graph"]
+        if graph is None or _index["key"] != database.DB_PATH:
+            return
+        version = get_write_version("relationships")
+        # Any other writer moves the version past what we wrote, so rebuild
+        # on next use.
+        if version != graph.version + writes:
+            _index["graph"] = None
+            return
+        pairs = []
+        for table_a, id_a, table_b, id_b, added in changes:
+            a = graph.node(table_a, id_a, create=added)
+            b = graph.node(table_b, id_b, create=added)
+            if a is not None and b is not None:
+                pairs.append((a, b, added))
+        graph.apply_changes(pairs)
+        graph.version = version
+
+
+def reset_graph_index() -> None:
+    """Drop the in-memory graph index."""
+    with _index_lock:
+        _index["key"] = None
+        _index["graph"] = None
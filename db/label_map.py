@@ -0,0 +1,82 @@
+import logging
+import sqlite3
+import string
+
+from db.catalog import get_table_meta
+
+logger = logging.getLogger(__name__)
+
+# Largest referenced table resolved through an in-memory map. Only an
+# ``{label: id}`` dict is kept, filled from a streamed cursor.
+MAX_REFERENCE_LABELS = 1_000_000
+FETCH_BATCH_SIZE = 50_000
+# Marks a label shared by more than one record.
+AMBIGUOUS = -1
+
+# SQLite's NOCASE collation only folds ASCII letters; match it.
+_ASCII_FOLD = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def fold_label(label) -> str:
+    """Return the lookup key for a record label."""
+    return str(label).strip().translate(_ASCII_FOLD)
+
+
+def split_labels(value) -> list[str]:
+    """Return the non-blank labels of a comma-joined foreign_key value."""
+    if value is None:
+        return []
+    return [part.strip() for part in str(value).split(",") if part.strip()]
+
+
+class LabelMap:
+    """Case-insensitive ``label -> record id`` lookup for one table.
+
+    Built once by streaming the table's label column. Tables larger than
+    ``MAX_REFERENCE_LABELS`` are not loaded and ``complete`` is False.
+    """
+
+    __slots__ = ("table", "label_field", "ids", "complete")
+
+    def __init__(self, conn: sqlite3.Connection, table: str):
+        meta = get_table_meta(table)
+        if meta is None:
+            raise ValueError(f"Unknown table: {table}")
+        self.table = table
+        self.label_field = meta.label_field
+        self.ids: dict[str, int] = {}
+        cur = conn.execute(
+            f'SELECT id, "{self.label_field}" FROM "{table}" '
+            f'WHERE "{self.label_field}" IS NOT NULL LIMIT ?',
+            (MAX_REFERENCE_LABELS + 1,),
+        )
+        loaded = 0
+        while True:
+            rows = cur.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            loaded += len(rows)
+            if loaded > MAX_REFERENCE_LABELS:
+                break
+            for record_id, label in rows:
+                key = fold_label(label)
+                if key:
+                    known = self.ids.get(key)
+                    self.ids[key] = record_id if known in (None, record_id) else AMBIGUOUS
+        self.complete = loaded <= MAX_REFERENCE_LABELS
+        if not self.complete:
+            self.ids = {}
+            logger.warning(
+                "Label map for %s skipped: more than %d labelled rows",
+                table,
+                MAX_REFERENCE_LABELS,
+                extra={"table": table, "limit": MAX_REFERENCE_LABELS},
+            )
+
+    def get(self, label) -> int | None:
+        """Return the record id for ``label``, ``AMBIGUOUS`` or None."""
+        return self.ids.get(fold_label(label))
+
+    def unresolved(self, value) -> list[str]:
+        """Return the labels in a foreign_key value that match no record."""
+        return [label for label in split_labels(value) if self.get(label) is None]
@@ -1,8 +1,9 @@
 import logging
 from db.database import SUPPORTS_REGEX
-from db.schema import get_field_schema
+from db.catalog import get_table_meta
+from db.search import fts_search_clause
+from db.field_values import value_filter_clause
 from db.validation import validate_fields
-from utils.field_registry import FIELD_TYPES
 
 logger = logging.getLogger(__name__)
 
@@ -73,6 +74,36 @@ def _apply_date_ranges(
             params.append(end)
 
 
+def _keyset_clause(
+    sort_field: str | None,
+    dir_sql: str,
+    sort_value,
+    last_id: int,
+    params: list,
+) -> str:
+    """Return a clause selecting rows after ``(sort_value, last_id)``.
+
+    Mirrors ``ORDER BY sort_field COLLATE NOCASE <dir>, id <dir>``, where
+    SQLite places NULLs first ascending and last descending.
+    """
+    if not sort_field:
+        params.append(last_id)
+        return "id < ?" if dir_sql == "DESC" else "id > ?"
+
+    col = f"{sort_field} COLLATE NOCASE"
+    if dir_sql == "DESC":
+        if sort_value is None:
+            params.append(last_id)
+            return f"({sort_field} IS NULL AND id < ?)"
+        params.extend([sort_value, sort_value, last_id])
+        return f"({col} < ? OR ({col} = ? AND id < ?) OR {sort_field} IS NULL)"
+    if sort_value is None:
+        params.append(last_id)
+        return f"(({sort_field} IS NULL AND id > ?) OR {sort_field} IS NOT NULL)"
+    params.extend([sort_value, sort_value, last_id])
+    return f"({col} > ? OR ({col} = ? AND id > ?))"
+
+
 def _build_filters(
     table,
     search=None,
@@ -102,6 +133,8 @@ def _build_filters(
 
         date_starts: dict = {}
         date_ends: dict = {}
+        meta = get_table_meta(table)
+        multi_fields = meta.multi_value_fields if meta else ()
 
         for fld, val in filters.items():
             clean_values = _normalize_filter_values(val)
@@ -126,6 +159,12 @@ def _build_filters(
             else:
                 op = (ops or {}).get(fld, "contains")
                 mode = (modes or {}).get(fld, "any")
+                if op in ("contains", "equals") and fld in multi_fields:
+                    # Match whole elements via the indexed value table.
+                    clauses.append(
+                        value_filter_clause(table, fld, clean_values, mode, params)
+                    )
+                    continue
                 clause = _build_field_clause(fld, clean_values, op, mode, params)
                 if clause:
                     clauses.append(clause)
@@ -134,14 +173,14 @@ def _build_filters(
 
     if search:
         search_term = search.strip()
-        all_fields = get_field_schema()[table]
-        search_fields = [
-            f
-            for f, m in all_fields.items()
-            if m["type"] in FIELD_TYPES and FIELD_TYPES[m["type"]].searchable
-        ]
-        if search_fields:
-            validate_fields(table, search_fields)
+        fts = fts_search_clause(table, search_term)
+        meta = get_table_meta(table)
+        search_fields = list(meta.searchable_fields) if meta else []
+        if fts:
+            clause, match = fts
+            clauses.append(clause)
+            params.append(match)
+        elif search_fields:
             subconds = [f"{f} LIKE ?" for f in search_fields]
             clauses.append("(" + " OR ".join(subconds) + ")")
             params.extend([f"%{search_term}%"] * len(subconds))
@@ -1,13 +1,124 @@
 import logging
 import sqlite3
+import threading
+from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 import datetime
-from db.database import get_connection
-from db.schema import get_field_schema
+import json
+from db import database
+from db.database import get_connection, commit, transaction
+from db.schema import get_field_schema, get_schema_generation
 from db.validation import validate_table, validate_field
-from db.query_filters import _build_filters
+from db.query_filters import _build_filters, _keyset_clause, _normalize_filter_values
+from db.table_stats import get_table_stats
+from db.catalog import fts_table_name, get_table_meta
+from db.search import fts_search_clause, load_snippets
+from db.field_values import value_distribution
+
+
+def _select_list(table, columns=None, textarea_chars=None, keep=()) -> str:
+    """Return the SELECT column list for ``get_all_records``.
+
+    ``columns`` projects the result onto those columns plus ``id``, the
+    title field and ``keep`` (e.g. the sort field). ``textarea_chars``
+    truncates textarea values to that many characters.
+    """
+    prefix = f"{table}."
+    meta = get_table_meta(table)
+    if meta is None or (columns is None and not textarea_chars):
+        return f"{prefix}*"
+    if columns is None:
+        selected = list(meta.columns)
+    else:
+        wanted = ["id", meta.title_field, *keep, *columns]
+        selected = [c for c in meta.columns if c in set(wanted)]
+    textarea = set(meta.textarea_fields) - set(keep) if textarea_chars else set()
+    parts = []
+    for col in selected:
+        if col in textarea:
+            parts.append(f'substr({prefix}"{col}", 1, {int(textarea_chars)}) AS "{col}"')
+        else:
+            parts.append(f'{prefix}"{col}"')
+    return ", ".join(parts)
+
 
+def _records_query(
+    table,
+    search=None,
+    filters=None,
+    ops=None,
+    modes=None,
+    sort_field=None,
+    direction="asc",
+    limit=None,
+    offset=0,
+    keyset=False,
+    after=None,
+    columns=None,
+    textarea_chars=None,
+    rank=True,
+):
+    """Return ``(sql, params, match)`` for a records query.
+
+    ``match`` is the FTS expression used for the search, if any. Raises
+    ``ValueError`` for invalid filter fields.
+    """
+    order_field = None
+    if sort_field:
+        try:
+            validate_field(table, sort_field)
+            order_field = sort_field
+        except ValueError:
+            logger.exception(
+                "Invalid sort field: %s",
+                sort_field,
+                extra={"table": table, "sort_field": sort_field},
+            )
+    dir_sql = "DESC" if str(direction).lower() == "desc" else "ASC"
+
+    fts = fts_search_clause(table, search.strip()) if search else None
+    match = fts[1] if fts else None
+    ranked = rank and match is not None and not sort_field and not keyset
+    select = _select_list(
+        table,
+        columns,
+        textarea_chars,
+        keep=(order_field,) if order_field else (),
+    )
+
+    if ranked:
+        # Join the FTS hits so results can be ordered by bm25 rank.
+        clauses, params = _build_filters(table, None, filters, ops, modes)
+        fts_name = fts_table_name(table)
+        sql = (
+            f"SELECT {select} FROM {table} JOIN "
+            f"(SELECT rowid AS _fts_rowid, rank AS _fts_rank FROM {fts_name} "
+            f"WHERE {fts_name} MATCH ?) AS hits "
+            f"ON hits._fts_rowid = {table}.id"
+        )
+        params = [match, *params]
+    else:
+        clauses, params = _build_filters(table, search, filters, ops, modes)
+        sql = f"SELECT {select} FROM {table}"
+    if keyset and after is not None:
+        clauses.append(_keyset_clause(order_field, dir_sql, after[0], after[1], params))
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+
+    # ``id`` breaks ties so pages (and cursors) never overlap.
+    if ranked:
+        sql += " ORDER BY hits._fts_rank, id"
+    elif order_field:
+        sql += f" ORDER BY {order_field} COLLATE NOCASE {dir_sql}, id {dir_sql}"
+    elif keyset or limit is not None:
+        sql += f" ORDER BY id {dir_sql}"
+
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+        if not keyset:
+            sql += f" OFFSET {int(offset)}"
+    return sql, params, match
 
 
 def get_all_records(
@@ -20,35 +131,42 @@ def get_all_records(
     direction="asc",
     limit=None,
     offset=0,
+    keyset=False,
+    after=None,
+    columns=None,
+    textarea_chars=None,
 ):
-    """Return a list of records honoring search/filter params."""
+    """Return a list of records honoring search/filter params.
+
+    With ``keyset`` the rows are ordered by ``(sort_field, id)`` and ``after``
+    may carry the ``(sort_value, id)`` of the last row already seen, so the
+    next page is a range scan instead of an ever-growing OFFSET.
+
+    ``columns`` limits the fetched columns (``id``, the title field and the
+    sort field are always included) and ``textarea_chars`` truncates
+    textarea values, so list pages avoid reading whole rich-text bodies.
+    """
 
     validate_table(table)
 
     with get_connection() as conn:
         cursor = conn.cursor()
         try:
-            clauses, params = _build_filters(table, search, filters, ops, modes)
-
-            sql = f"SELECT * FROM {table}"
-            if clauses:
-                sql += " WHERE " + " AND ".join(clauses)
-
-            if sort_field:
-                try:
-                    validate_field(table, sort_field)
-                    dir_sql = "DESC" if str(direction).lower() == "desc" else "ASC"
-                    sql += f" ORDER BY {sort_field} COLLATE NOCASE {dir_sql}"
-                except ValueError:
-                    logger.exception(
-                        "Invalid sort field: %s",
-                        sort_field,
-                        extra={"table": table, "sort_field": sort_field},
-                    )
-
-            if limit is not None:
-                sql += f" LIMIT {int(limit)} OFFSET {int(offset)}"
-
+            sql, params, match = _records_query(
+                table,
+                search,
+                filters,
+                ops,
+                modes,
+                sort_field,
+                direction,
+                limit,
+                offset,
+                keyset,
+                after,
+                columns,
+                textarea_chars,
+            )
             logger.info(
                 "[QUERY] SQL: %s | params: %s",
                 sql,
@@ -59,7 +177,10 @@ def get_all_records(
 
             rows = cursor.fetchall()
             cols = [desc[0] for desc in cursor.description]
-            return [dict(zip(cols, row)) for row in rows]
+            records = [dict(zip(cols, row)) for row in rows]
+            if match is not None:
+                _attach_snippets(conn, table, match, records)
+            return records
         except (sqlite3.DatabaseError, ValueError) as e:
             logger.exception(
                 "[QUERY ERROR] %s",
@@ -69,13 +190,152 @@ def get_all_records(
             return []
 
 
+EXPORT_BATCH_SIZE = 1000
+
+
+def iter_records(
+    table,
+    search=None,
+    filters=None,
+    ops=None,
+    modes=None,
+    sort_field=None,
+    direction="asc",
+    columns=None,
+    batch_size=EXPORT_BATCH_SIZE,
+):
+    """Yield lists of record dicts, ``batch_size`` rows at a time.
+
+    Rows are read with ``fetchmany`` inside a single read transaction, so the
+    export sees one consistent snapshot while memory stays bounded by the
+    batch size. Errors are raised to the caller since output may already
+    have been sent.
+    """
+
+    validate_table(table)
+
+    with get_connection() as conn:
+        sql, params, _ = _records_query(
+            table,
+            search,
+            filters,
+            ops,
+            modes,
+            sort_field,
+            direction,
+            columns=columns,
+            rank=False,
+        )
+        logger.info(
+            "[EXPORT] SQL: %s | params: %s",
+            sql,
+            params,
+            extra={"table": table},
+        )
+        own_tx = not conn.in_transaction
+        if own_tx:
+            conn.execute("BEGIN")
+        try:
+            cursor = conn.execute(sql, params)
+            cols = [desc[0] for desc in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(zip(cols, row)) for row in rows]
+            cursor.close()
+        finally:
+            if own_tx and conn.in_transaction:
+                conn.rollback()
+
+
+def _attach_snippets(conn, table, match, records) -> None:
+    """Add highlighted ``_snippets`` for matched textarea fields to ``records``."""
+    meta = get_table_meta(table)
+    if meta is None or not meta.textarea_fields:
+        return
+    ids = [r["id"] for r in records if "id" in r]
+    snippets = load_snippets(conn, table, match, ids, meta.textarea_fields)
+    for record in records:
+        if record.get("id") in snippets:
+            record["_snippets"] = snippets[record["id"]]
+
+
+# Filtered counts keyed by (db, table, filter signature) and tagged with the
+# (schema generation, table write version) they were computed at. The
+# write version comes from db.table_stats, so entries go stale on any write.
+COUNT_CACHE_SIZE = 512
+_count_cache_lock = threading.Lock()
+_count_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+# Number of evenly spaced id windows sampled by estimate_count().
+_SAMPLE_WINDOWS = 10
+
+
+def _count_signature(search, filters, ops, modes) -> str | None:
+    """Return a normalized signature for a filter set, or None if unfiltered."""
+    search = (search or "").strip()
+    norm_filters = {}
+    for field, value in (filters or {}).items():
+        values = _normalize_filter_values(value)
+        if values:
+            norm_filters[field] = [str(v) for v in values]
+    if not search and not norm_filters:
+        return None
+    norm_ops = {
+        f: op for f, op in (ops or {}).items() if f in norm_filters and op != "contains"
+    }
+    norm_modes = {
+        f: m for f, m in (modes or {}).items() if f in norm_filters and m != "any"
+    }
+    return json.dumps([search, norm_filters, norm_ops, norm_modes], sort_keys=True)
+
+
+def _cached_count(key, version):
+    with _count_cache_lock:
+        entry = _count_cache.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        _count_cache.move_to_end(key)
+        return entry[1]
+
+
+def _store_count(key, version, count) -> None:
+    with _count_cache_lock:
+        _count_cache[key] = (version, count)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+
+
+def clear_count_cache() -> None:
+    """Drop every cached filtered count."""
+    with _count_cache_lock:
+        _count_cache.clear()
+
+
 def count_records(table, search=None, filters=None, ops=None, modes=None):
-    """Return count of records matching the provided filters/search."""
+    """Return count of records matching the provided filters/search.
+
+    Unfiltered counts come from the maintained row counter; filtered counts
+    are cached until the table is next written to.
+    """
 
     validate_table(table)
     with get_connection() as conn:
         cursor = conn.cursor()
         try:
+            signature = _count_signature(search, filters, ops, modes)
+            row_count, write_version = get_table_stats([table]).get(table, (0, 0))
+            if signature is None:
+                return row_count
+
+            key = (database.DB_PATH, table, signature)
+            version = (get_schema_generation(), write_version)
+            cached = _cached_count(key, version)
+            if cached is not None:
+                return cached
+
             clauses, params = _build_filters(table, search, filters, ops, modes)
             sql = f"SELECT COUNT(*) FROM {table}"
             if clauses:
@@ -88,7 +348,9 @@ def count_records(table, search=None, filters=None, ops=None, modes=None):
             )
             cursor.execute(sql, params)
             row = cursor.fetchone()
-            return row[0] if row else 0
+            count = row[0] if row else 0
+            _store_count(key, version, count)
+            return count
         except (sqlite3.DatabaseError, ValueError) as e:
             logger.exception(
                 "[COUNT ERROR] %s",
@@ -97,25 +359,99 @@ def count_records(table, search=None, filters=None, ops=None, modes=None):
             )
             return 0
 
+
+def estimate_count(
+    table,
+    search=None,
+    filters=None,
+    ops=None,
+    modes=None,
+    *,
+    threshold=100_000,
+    sample_size=20_000,
+) -> tuple[int, bool]:
+    """Return ``(count, approximate)`` for the provided filters/search.
+
+    Tables smaller than ``threshold`` rows, unfiltered counts and counts
+    already cached are exact. Otherwise the filters are applied to about
+    ``sample_size`` rows taken from evenly spaced id windows and the match
+    ratio is scaled to the table's row count.
+    """
+
+    validate_table(table)
+    signature = _count_signature(search, filters, ops, modes)
+    try:
+        row_count, write_version = get_table_stats([table]).get(table, (0, 0))
+    except sqlite3.DatabaseError as e:
+        logger.exception(
+            "[COUNT ERROR] %s",
+            e,
+            extra={"table": table, "error": str(e)},
+        )
+        return 0, False
+    if signature is None:
+        return row_count, False
+    if row_count < threshold:
+        return count_records(table, search, filters, ops, modes), False
+    cached = _cached_count(
+        (database.DB_PATH, table, signature),
+        (get_schema_generation(), write_version),
+    )
+    if cached is not None:
+        return cached, False
+
+    with get_connection() as conn:
+        try:
+            clauses, params = _build_filters(table, search, filters, ops, modes)
+            lo, hi = conn.execute(f"SELECT MIN(id), MAX(id) FROM {table}").fetchone()
+            if lo is None:
+                return 0, False
+            per_window = max(sample_size // _SAMPLE_WINDOWS, 1)
+            step = max((hi - lo + 1) // _SAMPLE_WINDOWS, 1)
+            windows = []
+            for i in range(_SAMPLE_WINDOWS):
+                windows.append(
+                    f"SELECT * FROM (SELECT * FROM {table} WHERE id >= ? "
+                    f"ORDER BY id LIMIT {per_window})"
+                )
+                params.append(lo + i * step)
+            cond = " AND ".join(clauses) if clauses else "1"
+            sql = (
+                f"SELECT COUNT(*), SUM(CASE WHEN {cond} THEN 1 ELSE 0 END) "
+                f"FROM ({' UNION '.join(windows)}) AS {table}"
+            )
+            sampled, matched = conn.execute(sql, params).fetchone()
+        except (sqlite3.DatabaseError, ValueError) as e:
+            logger.exception(
+                "[COUNT ERROR] %s",
+                e,
+                extra={"table": table, "error": str(e)},
+            )
+            return 0, False
+    if not sampled:
+        return 0, False
+    return round((matched or 0) / sampled * row_count), True
+
+
 def get_record_by_id(table, record_id):
     validate_table(table)
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table})")
-        fields = [row[1] for row in cursor.fetchall()]
         cursor.execute(f"SELECT * FROM {table} WHERE id = ?", (record_id,))
         row = cursor.fetchone()
         if row:
+            fields = [desc[0] for desc in cursor.description]
             record = dict(zip(fields, row))
 
             # Sanitize any textarea fields on retrieval to guard against
             # potentially unsafe HTML that may have been stored before
             # sanitization was implemented.
-            schema = get_field_schema().get(table, {})
-            from utils.html_sanitizer import sanitize_html
-            for field_name, meta in schema.items():
-                if meta.get("type") == "textarea" and field_name in record:
-                    record[field_name] = sanitize_html(record[field_name] or "")
+            meta = get_table_meta(table)
+            if meta is not None and meta.textarea_fields:
+                from utils.html_sanitizer import sanitize_html
+                for field_name in meta.textarea_fields:
+                    if field_name in record:
+                        record[field_name] = sanitize_html(record[field_name] or "")
 
             return record
     return None
@@ -125,19 +461,38 @@ def touch_last_edited(table: str, record_id: int) -> None:
     """Update the last_edited timestamp for a record if the column exists."""
     validate_table(table)
 
+    meta = get_table_meta(table)
+    if meta is None or not meta.has_last_edited:
+        return
+
     timestamp = datetime.datetime.utcnow().isoformat(timespec="seconds")
 
     with get_connection() as conn:
         cur = conn.cursor()
-        cur.execute(f"PRAGMA table_info({table})")
-        cols = [row[1] for row in cur.fetchall()]
-        if "last_edited" not in cols:
-            return
         cur.execute(
             f"UPDATE {table} SET last_edited = ? WHERE id = ?",
             (timestamp, record_id),
         )
-        conn.commit()
+        commit(conn)
+
+def touch_last_edited_many(table: str, record_ids) -> None:
+    """Set last_edited on many records of ``table`` with one UPDATE."""
+    validate_table(table)
+
+    meta = get_table_meta(table)
+    ids = sorted(set(record_ids))
+    if meta is None or not meta.has_last_edited or not ids:
+        return
+
+    timestamp = datetime.datetime.utcnow().isoformat(timespec="seconds")
+
+    with get_connection() as conn:
+        conn.execute(
+            f"UPDATE {table} SET last_edited = ? "
+            "WHERE id IN (SELECT value FROM json_each(?))",
+            (timestamp, json.dumps(ids)),
+        )
+        commit(conn)
 
 def update_field_value(table, record_id, field, new_value):
     validate_table(table)
@@ -149,7 +504,9 @@ def update_field_value(table, record_id, field, new_value):
         from utils.html_sanitizer import sanitize_html
         new_value = sanitize_html(new_value)
 
-    with get_connection() as conn:
+    # The value change and the last_edited touch share one commit; callers
+    # that open their own transaction() fold both into it.
+    with transaction() as conn:
         cursor = conn.cursor()
         try:
             logger.debug(
@@ -168,7 +525,7 @@ def update_field_value(table, record_id, field, new_value):
                 f"UPDATE {table} SET {field} = ? WHERE id = ?",
                 (new_value, record_id),
             )
-            conn.commit()
+            commit(conn)
             logger.info(
                 "Updated %s.%s for id=%s to %r",
                 table,
@@ -199,6 +556,85 @@ def update_field_value(table, record_id, field, new_value):
         return success
 
 
+BULK_CHUNK_SIZE = 500
+
+
+def bulk_update_field_values(
+    table: str,
+    record_ids: list[int],
+    field: str,
+    new_value,
+    *,
+    actor: str | None = None,
+) -> int:
+    """Set ``field`` to ``new_value`` for many records in one transaction.
+
+    Old values are read per chunk with ``WHERE id IN (...)``, the update sets
+    ``last_edited`` in the same statement, and edit history rows (with the
+    real old values, only for rows that changed) are written in bulk.
+    Returns the number of existing records updated.
+    """
+    validate_table(table)
+    validate_field(table, field)
+    if field == "id":
+        raise ValueError("Cannot bulk update id")
+
+    fmeta = get_field_schema().get(table, {}).get(field, {})
+    if fmeta.get("type") == "textarea":
+        from utils.html_sanitizer import sanitize_html
+        new_value = sanitize_html(new_value)
+
+    ids = list(dict.fromkeys(int(i) for i in record_ids))
+    if not ids:
+        return 0
+
+    from db.edit_history import append_edit_logs
+
+    table_meta = get_table_meta(table)
+    set_sql = f'"{field}" = ?'
+    set_params = [new_value]
+    if table_meta is not None and table_meta.has_last_edited and field != "last_edited":
+        set_sql += ", last_edited = ?"
+        set_params.append(datetime.datetime.utcnow().isoformat(timespec="seconds"))
+
+    updated = 0
+    new_text = str(new_value)
+    with transaction() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = ids[start:start + BULK_CHUNK_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(
+                f'SELECT id, "{field}" FROM "{table}" WHERE id IN ({placeholders})',
+                chunk,
+            )
+            old_values = cursor.fetchall()
+            if not old_values:
+                continue
+            cursor.execute(
+                f'UPDATE "{table}" SET {set_sql} WHERE id IN ({placeholders})',
+                set_params + chunk,
+            )
+            updated += cursor.rowcount
+            append_edit_logs(
+                table,
+                [
+                    (rid, field, None if old is None else str(old), new_text)
+                    for rid, old in old_values
+                    if str(old) != new_text
+                ],
+                actor=actor,
+            )
+    logger.info(
+        "Bulk updated %s.%s for %s records",
+        table,
+        field,
+        updated,
+        extra={"table": table, "field": field, "updated": updated},
+    )
+    return updated
+
+
 def create_record(table, form_data):
     # 1) Validate the table name
     validate_table(table)
@@ -211,8 +647,10 @@ def create_record(table, form_data):
                 return None
 
             # 2) Figure out real columns on the table
-            cursor.execute(f"PRAGMA table_info({table})")
-            cols = [col[1] for col in cursor.fetchall()]
+            table_meta = get_table_meta(table)
+            if table_meta is None:
+                return None
+            cols = table_meta.column_set
 
             # 3) Build insert_data, but only for known schema fields
             insert_data = {}
@@ -230,9 +668,9 @@ def create_record(table, form_data):
                 insert_data[f] = value
 
             timestamp = datetime.datetime.utcnow().isoformat(timespec="seconds")
-            if "date_created" in cols:
+            if table_meta.has_date_created:
                 insert_data.setdefault("date_created", timestamp)
-            if "last_edited" in cols:
+            if table_meta.has_last_edited:
                 insert_data.setdefault("last_edited", timestamp)
 
             if not insert_data:
@@ -245,7 +683,7 @@ def create_record(table, form_data):
 
             cursor.execute(sql, params)
             record_id = cursor.lastrowid
-            conn.commit()
+            commit(conn)
             return record_id
         except (sqlite3.DatabaseError, ValueError) as e:
             logger.exception(
@@ -262,7 +700,7 @@ def delete_record(table, record_id):
         cursor = conn.cursor()
         try:
             cursor.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,))
-            conn.commit()
+            commit(conn)
             return True
         except sqlite3.DatabaseError as e:
             logger.exception(
@@ -278,62 +716,176 @@ def count_nonnull(table: str, field: str) -> int:
         "count_nonnull kickoff",
         extra={"table": table, "field": field},
     )
+    try:
+        return _count_nonnull_query(table, field)
+    except sqlite3.DatabaseError as e:
+        logger.exception(
+            "[count_nonnull] SQL error for %s.%s: %s",
+            table,
+            field,
+            e,
+            extra={"table": table, "field": field, "error": str(e)},
+        )
+        return 0
+
+
+def _count_nonnull_query(table: str, field: str) -> int:
+    """Count non-null ``field`` values; database errors propagate."""
+    validate_table(table)
     # Verify that the field exists and is not hidden or "id"
     fmeta = get_field_schema().get(table, {}).get(field)
     if fmeta is None or fmeta.get("type") == "hidden" or field == "id":
         raise ValueError(f"Invalid or protected field: {field}")
     with get_connection() as conn:
         cursor = conn.cursor()
-        try:
-            sql = f'SELECT COUNT(*) FROM "{table}" WHERE "{field}" IS NOT NULL'
-            cursor.execute(sql)
-            return cursor.fetchone()[0] or 0
-        except sqlite3.DatabaseError as e:
-            logger.exception(
-                "[count_nonnull] SQL error for %s.%s: %s",
-                table,
-                field,
-                e,
-                extra={"table": table, "field": field, "error": str(e)},
-            )
-            return 0
+        sql = f'SELECT COUNT(*) FROM "{table}" WHERE "{field}" IS NOT NULL'
+        cursor.execute(sql)
+        return cursor.fetchone()[0] or 0
+
+
+DATE_BUCKETS = {
+    "day": "date({col})",
+    "week": "strftime('%Y-W%W', {col})",
+    "month": "strftime('%Y-%m', {col})",
+}
+OTHER_LABEL = "Other"
+# Date values SQLite cannot parse (the bucket expression yields NULL).
+INVALID_DATE_LABEL = "Invalid date"
+
+
+def _with_other(pairs, total: int, limit: int | None) -> dict[str, int]:
+    """Return ``pairs`` as a dict, folding anything past ``limit`` into Other."""
+    counts = {str(k): v for k, v in pairs[:limit] if k is not None}
+    rest = total - sum(counts.values())
+    if rest > 0:
+        counts[OTHER_LABEL] = counts.get(OTHER_LABEL, 0) + rest
+    return counts
 
 
-def field_distribution(table: str, field: str) -> dict[str, int]:
-    """Return counts of each distinct value for a field."""
+def _numeric_histogram(cur, table, field, bins) -> dict[str, int] | None:
+    """Bucket the numeric values of ``field`` into ``bins`` equal ranges.
+
+    Text left in a number column (e.g. from imports) is counted under
+    ``OTHER_LABEL``. Returns None when the column holds no numbers.
+    """
+    numeric = f"typeof(\"{field}\") IN ('integer', 'real')"
+    lo, hi = cur.execute(
+        f'SELECT MIN("{field}"), MAX("{field}") FROM "{table}" WHERE {numeric}'
+    ).fetchone()
+    if lo is None:
+        return None
+    width = (hi - lo) / bins or 1.0
+    rows = cur.execute(
+        f'SELECT MIN(CAST(("{field}" - ?) / ? AS INTEGER), ?) AS b, COUNT(*) '
+        f'FROM "{table}" WHERE {numeric} '
+        "GROUP BY b ORDER BY b",
+        (lo, width, bins - 1),
+    ).fetchall()
+    hist = {
+        f"{lo + b * width:g}–{lo + (b + 1) * width:g}": count for b, count in rows
+    }
+    other = cur.execute(
+        f'SELECT COUNT(*) FROM "{table}" WHERE "{field}" IS NOT NULL '
+        f'AND "{field}" <> \'\' AND NOT {numeric}'
+    ).fetchone()[0]
+    if other:
+        hist[OTHER_LABEL] = other
+    return hist
+
+
+def field_distribution(
+    table: str,
+    field: str,
+    limit: int | None = None,
+    bucket: str | None = None,
+    bins: int = 10,
+) -> dict[str, int]:
+    """Return counts of each distinct value for a field, aggregated in SQL.
+
+    Categorical values are ordered by count; with ``limit`` only the top
+    values are returned and the remainder is folded into ``"Other"``.
+    Number fields with more than ``bins`` distinct values become a
+    histogram. Date fields are grouped chronologically by ``bucket``
+    (``day``, ``week`` or ``month``); ``limit`` keeps the latest buckets.
+    """
+    try:
+        return _field_distribution_query(table, field, limit, bucket, bins)
+    except sqlite3.DatabaseError as e:
+        logger.exception(
+            "[field_distribution] SQL error for %s.%s: %s",
+            table,
+            field,
+            e,
+            extra={"table": table, "field": field, "error": str(e)},
+        )
+        return {}
+
+
+def _field_distribution_query(
+    table: str,
+    field: str,
+    limit: int | None = None,
+    bucket: str | None = None,
+    bins: int = 10,
+) -> dict[str, int]:
+    """Compute :func:`field_distribution`; database errors propagate."""
     validate_table(table)
     validate_field(table, field)
     fmeta = get_field_schema().get(table, {}).get(field)
     if fmeta is None or fmeta.get("type") == "hidden" or field == "id":
         raise ValueError(f"Invalid field: {field}")
+    if bucket is not None and bucket not in DATE_BUCKETS:
+        raise ValueError(f"Invalid bucket: {bucket}")
+    if limit is not None and limit <= 0:
+        limit = None
+
+    from utils.field_registry import FIELD_TYPES
+
+    ftype = FIELD_TYPES.get(fmeta.get("type"))
+    meta = get_table_meta(table)
+    not_empty = f'"{field}" IS NOT NULL AND "{field}" <> \'\''
+    if meta is not None and field in meta.multi_value_fields:
+        return value_distribution(table, field, limit)
 
     with get_connection() as conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                f'SELECT "{field}" FROM "{table}" WHERE "{field}" IS NOT NULL'
-            )
-            rows = [r[0] for r in cursor.fetchall()]
-        except sqlite3.DatabaseError as e:
-            logger.exception(
-                "[field_distribution] SQL error for %s.%s: %s",
-                table,
-                field,
-                e,
-                extra={"table": table, "field": field, "error": str(e)},
-            )
-            return {}
-
-    counts: dict[str, int] = {}
-    for val in rows:
-        if val is None or val == "":
-            continue
-        if fmeta["type"] == "multi_select":
-            parts = [p.strip() for p in str(val).split(',') if p.strip()]
-            for p in parts:
-                counts[p] = counts.get(p, 0) + 1
-        else:
-            counts[str(val)] = counts.get(str(val), 0) + 1
-    return counts
+        cur = conn.cursor()
+        if fmeta.get("type") == "date":
+            key = DATE_BUCKETS[bucket or "day"].format(col=f'"{field}"')
+            rows = cur.execute(
+                f'SELECT {key} AS k, COUNT(*) FROM "{table}" WHERE {not_empty} '
+                "GROUP BY k ORDER BY k",
+            ).fetchall()
+            invalid = sum(c for k, c in rows if k is None)
+            rows = [(k, c) for k, c in rows if k is not None]
+            counts = {}
+            if limit is not None and len(rows) > limit:
+                counts[OTHER_LABEL] = sum(c for _, c in rows[:-limit])
+                rows = rows[-limit:]
+            counts.update((str(k), c) for k, c in rows)
+            if invalid:
+                counts[INVALID_DATE_LABEL] = invalid
+            return counts
+
+        if ftype is not None and ftype.numeric and bins > 0:
+            distinct = cur.execute(
+                f'SELECT COUNT(DISTINCT "{field}") FROM "{table}" WHERE {not_empty}'
+            ).fetchone()[0]
+            if distinct > bins:
+                hist = _numeric_histogram(cur, table, field, bins)
+                if hist is not None:
+                    return hist
+
+        total = cur.execute(
+            f'SELECT COUNT(*) FROM "{table}" WHERE {not_empty}'
+        ).fetchone()[0]
+        sql = (
+            f'SELECT "{field}" AS v, COUNT(*) AS n FROM "{table}" WHERE {not_empty} '
+            "GROUP BY v ORDER BY n DESC, v"
+        )
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        rows = cur.execute(sql).fetchall()
+        return _with_other(rows, total, limit)
+
 
 
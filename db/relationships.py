@@ -1,36 +1,34 @@
+import json
 import logging
 import sqlite3
 
 logger = logging.getLogger(__name__)
 
-from db.database import get_connection
+from db.database import get_connection, commit, transaction
 from db.validation import validate_table
-from db.records import touch_last_edited
-from db.schema import get_title_field
-
-
-def _get_label(cursor, table, record_id):
-    """Return label for a record from the given table."""
-    cursor.execute(f"PRAGMA table_info({table})")
-    cols = [r[1] for r in cursor.fetchall()]
-    if not cols:
-        return None
-    title_field = get_title_field(table)
-    if title_field:
-        label_field = title_field
-    elif table in cols:
-        label_field = table
-    elif len(cols) > 1:
-        label_field = cols[1]
-    else:
-        label_field = cols[0]
-    cursor.execute(f"SELECT id, {label_field} FROM {table} WHERE id = ?", (record_id,))
-    row = cursor.fetchone()
-    return row if row else None
-
-
-def get_related_records(source_table, record_id):
-    """Return dict of related records grouped by table."""
+from db.records import touch_last_edited, touch_last_edited_many
+from db.catalog import get_table_meta
+from db.graph_index import note_relationship_changes
+
+
+def _table_labels(cur) -> dict[str, str]:
+    """Return ``{table_name: display_name}`` for all base tables."""
+    return {
+        r[0]: r[1]
+        for r in cur.execute(
+            "SELECT table_name, display_name FROM config_base_tables"
+        ).fetchall()
+    }
+
+
+def get_related_records(source_table, record_id, limit: int | None = None):
+    """Return dict of related records grouped by table.
+
+    Each group is ``{"label", "items", "total"}``. Targets are resolved with
+    one query per related table. Items keep the order in which the links
+    were created. ``limit`` caps the items returned per table, while
+    ``total`` still counts every linked record.
+    """
     validate_table(source_table)
     related = {}
     with get_connection() as conn:
@@ -41,15 +39,22 @@ def get_related_records(source_table, record_id):
               FROM relationships
              WHERE (table_a = ? AND id_a = ?)
                 OR (table_b = ? AND id_b = ?)
+             ORDER BY rowid
             """,
             (source_table, record_id, source_table, record_id),
         )
-        links = cur.fetchall()
-        for table_a, id_a, table_b, id_b, two_way in links:
+        targets: dict[str, dict[int, bool]] = {}
+        for table_a, id_a, table_b, id_b, two_way in cur.fetchall():
             if table_a == source_table and id_a == record_id:
                 target_table, target_id = table_b, id_b
             else:
                 target_table, target_id = table_a, id_a
+            targets.setdefault(target_table, {})[target_id] = bool(two_way)
+        if not targets:
+            return related
+
+        table_labels = _table_labels(cur)
+        for target_table, links in targets.items():
             try:
                 validate_table(target_table)
             except ValueError:
@@ -57,24 +62,187 @@ def get_related_records(source_table, record_id):
                     "Invalid related table", exc_info=True, extra={"table": target_table}
                 )
                 continue
-            row = _get_label(cur, target_table, target_id)
-            if not row:
+            meta = get_table_meta(target_table)
+            if meta is None:
                 continue
-            item = {"id": row[0], "name": row[1], "two_way": bool(two_way)}
-            # Determine display label for the related table
-            row_label = cur.execute(
-                "SELECT display_name FROM config_base_tables WHERE table_name = ?",
-                (target_table,),
-            ).fetchone()
-            table_label = row_label[0] if row_label else target_table.capitalize()
-            group = related.setdefault(
-                target_table,
-                {"label": table_label, "items": []},
+            # The id list travels as one JSON parameter, so very large link
+            # sets never hit SQLite's bound-variable limit. Its array index
+            # keeps the items in the order the links were created.
+            sql = (
+                f'SELECT t.id, t."{meta.label_field}", COUNT(*) OVER () '
+                f'FROM json_each(?) AS j JOIN "{target_table}" AS t ON t.id = j.value '
+                "ORDER BY j.key"
             )
-            group["items"].append(item)
+            params = [json.dumps(list(links))]
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(int(limit))
+            rows = cur.execute(sql, params).fetchall()
+            if not rows:
+                continue
+            related[target_table] = {
+                "label": table_labels.get(target_table, target_table.capitalize()),
+                "items": [
+                    {"id": r[0], "name": r[1], "two_way": links[r[0]]} for r in rows
+                ],
+                "total": rows[0][2],
+            }
     return related
 
 
+# Hard caps for traverse_relationships so one request stays bounded.
+MAX_TRAVERSAL_DEPTH = 6
+MAX_TRAVERSAL_NODES = 5000
+
+
+def _step_sql(src: str, dst: str, two_way_only: bool, table_filter: bool) -> str:
+    """Links from the frontier following ``src`` -> ``dst``."""
+    extra = " AND r.two_way = 1" if two_way_only else ""
+    if table_filter:
+        extra += f" AND r.table_{dst} IN (SELECT value FROM json_each(:tables))"
+    return (
+        f"SELECT r.table_{dst}, r.id_{dst} FROM frontier AS f "
+        f"JOIN relationships AS r ON r.table_{src} = f.t AND r.id_{src} = f.id "
+        f"WHERE r.rowid IN (SELECT rowid FROM relationships "
+        f"WHERE table_{src} = f.t AND id_{src} = f.id LIMIT :fanout){extra}"
+    )
+
+
+def _load_labels(cur, nodes) -> dict[tuple[str, int], str]:
+    """Return ``{(table, id): label}`` using one query per table."""
+    by_table: dict[str, list[int]] = {}
+    for table, node_id in nodes:
+        by_table.setdefault(table, []).append(node_id)
+    labels = {}
+    for table, ids in by_table.items():
+        meta = get_table_meta(table)
+        if meta is None:
+            continue
+        rows = cur.execute(
+            f'SELECT id, "{meta.label_field}" FROM "{table}" '
+            "WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(ids),),
+        ).fetchall()
+        labels.update({(table, r[0]): r[1] for r in rows})
+    return labels
+
+
+def traverse_relationships(
+    table: str,
+    record_id: int,
+    depth: int = 2,
+    *,
+    fanout: int = 100,
+    tables: list[str] | None = None,
+    two_way_only: bool = False,
+    max_nodes: int = 1000,
+) -> dict:
+    """Return every record within ``depth`` hops of ``table``/``record_id``.
+
+    The walk is breadth-first, one query per level over the relationship
+    indexes, and skips records it has already visited. It stops as soon as
+    ``max_nodes`` records are found, so the work is bounded by the result
+    size rather than by the number of paths.
+    ``fanout`` caps the links followed from each record, ``tables`` limits
+    which tables the walk may enter and ``two_way_only`` skips one-way links.
+
+    This deliberately does not use a ``WITH RECURSIVE`` query. SQLite's
+    ``UNION`` only deduplicates whole rows, and a row has to carry its depth
+    for the depth limit to work. So a recursive CTE re-expands a record once
+    for every path that reaches it, and on a dense graph the work grows with
+    the number of paths. Driving the levels from Python keeps one visited
+    set for the whole walk.
+    Returns ``{"nodes": [...], "edges": [...], "truncated": bool}``; edges are
+    the links between returned nodes.
+    """
+    validate_table(table)
+    for name in tables or ():
+        validate_table(name)
+    depth = max(0, min(int(depth), MAX_TRAVERSAL_DEPTH))
+    max_nodes = max(1, min(int(max_nodes), MAX_TRAVERSAL_NODES))
+    table_filter = bool(tables)
+    steps = " UNION ".join(
+        _step_sql(src, dst, two_way_only, table_filter)
+        for src, dst in (("a", "b"), ("b", "a"))
+    )
+    sql = (
+        "WITH frontier(t, id) AS ("
+        "SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') "
+        f"FROM json_each(:frontier)) {steps}"
+    )
+    params = {
+        "fanout": max(1, int(fanout)),
+        "tables": json.dumps(list(tables or [])),
+    }
+    with get_connection() as conn:
+        cur = conn.cursor()
+        try:
+            rows = [(table, record_id, 0)]
+            visited = {(table, record_id)}
+            frontier = [(table, record_id)]
+            truncated = False
+            for level in range(1, depth + 1):
+                if not frontier:
+                    break
+                params["frontier"] = json.dumps(frontier)
+                found = sorted(
+                    {tuple(r) for r in cur.execute(sql, params).fetchall()} - visited
+                )
+                room = max_nodes - len(rows)
+                if len(found) > room:
+                    found = found[:room]
+                    truncated = True
+                visited.update(found)
+                rows += [(t, i, level) for t, i in found]
+                frontier = found
+                if truncated:
+                    break
+            keys = json.dumps([[r[0], r[1]] for r in rows])
+            node_set = (
+                "(SELECT json_extract(value, '$[0]') AS t, "
+                "json_extract(value, '$[1]') AS id FROM json_each(?))"
+            )
+            edge_rows = cur.execute(
+                "SELECT r.table_a, r.id_a, r.table_b, r.id_b, r.two_way "
+                f"FROM {node_set} AS n JOIN relationships AS r "
+                "ON r.table_a = n.t AND r.id_a = n.id "
+                f"WHERE EXISTS (SELECT 1 FROM {node_set} AS m "
+                "WHERE m.t = r.table_b AND m.id = r.id_b)"
+                + (" AND r.two_way = 1" if two_way_only else ""),
+                (keys, keys),
+            ).fetchall()
+            labels = _load_labels(cur, [(r[0], r[1]) for r in rows])
+        except sqlite3.DatabaseError as e:
+            logger.exception(
+                "[traverse_relationships] SQL error: %s",
+                e,
+                extra={"table": table, "record_id": record_id, "error": str(e)},
+            )
+            return {"nodes": [], "edges": [], "truncated": False}
+    nodes = [
+        {"table": t, "id": i, "depth": d, "label": labels.get((t, i))}
+        for t, i, d in rows
+    ]
+    edges = [
+        {
+            "table_a": r[0],
+            "id_a": r[1],
+            "table_b": r[2],
+            "id_b": r[3],
+            "two_way": bool(r[4]),
+        }
+        for r in edge_rows
+    ]
+    logger.debug(
+        "Traversed %d nodes from %s:%s",
+        len(nodes),
+        table,
+        record_id,
+        extra={"table": table, "record_id": record_id, "depth": depth, "nodes": len(nodes)},
+    )
+    return {"nodes": nodes, "edges": edges, "truncated": truncated}
+
+
 def add_relationship(
     table_a,
     id_a,
@@ -89,16 +257,24 @@ def add_relationship(
     ordered = sorted([(table_a, id_a), (table_b, id_b)], key=lambda t: t[0])
     a_tbl, a_id = ordered[0]
     b_tbl, b_id = ordered[1]
-    with get_connection() as conn:
+    key = (a_tbl, a_id, b_tbl, b_id)
+    flag = 1 if two_way else 0
+    inserted = updated = 0
+    with transaction() as conn:
         cur = conn.cursor()
         try:
-            cur.execute(
-                "INSERT INTO relationships (table_a, id_a, table_b, id_b, two_way)"
-                " VALUES (?, ?, ?, ?, ?)"
-                " ON CONFLICT(table_a,id_a,table_b,id_b) DO UPDATE SET two_way=excluded.two_way",
-                (a_tbl, a_id, b_tbl, b_id, 1 if two_way else 0),
-            )
-            conn.commit()
+            inserted = cur.execute(
+                "INSERT OR IGNORE INTO relationships (table_a, id_a, table_b, id_b, two_way)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (*key, flag),
+            ).rowcount
+            if not inserted:
+                updated = cur.execute(
+                    "UPDATE relationships SET two_way = ? WHERE table_a = ? AND id_a = ?"
+                    " AND table_b = ? AND id_b = ? AND two_way <> ?",
+                    (flag, *key, flag),
+                ).rowcount
+            commit(conn)
             success = True
         except sqlite3.DatabaseError as e:
             logger.exception(
@@ -133,7 +309,11 @@ def add_relationship(
                 str(id_a),
                 actor=actor,
             )
-        return success
+    if success:
+        note_relationship_changes(
+            [(*key, True)] if inserted else [], writes=inserted + updated
+        )
+    return success
 
 
 def remove_relationship(table_a, id_a, table_b, id_b, *, actor: str | None = None):
@@ -142,14 +322,15 @@ def remove_relationship(table_a, id_a, table_b, id_b, *, actor: str | None = Non
     ordered = sorted([(table_a, id_a), (table_b, id_b)], key=lambda t: t[0])
     a_tbl, a_id = ordered[0]
     b_tbl, b_id = ordered[1]
-    with get_connection() as conn:
+    removed = 0
+    with transaction() as conn:
         cur = conn.cursor()
         try:
-            cur.execute(
+            removed = cur.execute(
                 "DELETE FROM relationships WHERE table_a = ? AND id_a = ? AND table_b = ? AND id_b = ?",
                 (a_tbl, a_id, b_tbl, b_id),
-            )
-            conn.commit()
+            ).rowcount
+            commit(conn)
             success = True
         except sqlite3.DatabaseError as e:
             logger.exception(
@@ -184,4 +365,97 @@ def remove_relationship(table_a, id_a, table_b, id_b, *, actor: str | None = Non
                 None,
                 actor=actor,
             )
-        return success
+    if success and removed:
+        note_relationship_changes([(a_tbl, a_id, b_tbl, b_id, False)])
+    return success
+
+
+# Upper bound on changes accepted by one bulk_update_relationships call.
+MAX_BULK_RELATIONSHIPS = 5000
+
+
+def bulk_update_relationships(changes, *, actor: str | None = None) -> dict:
+    """Apply many relationship adds/removes in one transaction.
+
+    ``changes`` is a list of dicts with ``action`` (``add``/``remove``),
+    ``table_a``, ``id_a``, ``table_b``, ``id_b`` and optional ``two_way``.
+    Every change is validated before anything is written, and only the last
+    change for each pair is applied, matching the result of running them in
+    order. ``added``/``removed`` count links that actually appeared or
+    disappeared; only those get edit-history rows, a ``last_edited`` update
+    and a graph index change. Raises ``ValueError`` on invalid input;
+    database errors roll back the whole batch and propagate.
+    """
+    if len(changes) > MAX_BULK_RELATIONSHIPS:
+        raise ValueError(f"At most {MAX_BULK_RELATIONSHIPS} changes per request")
+    final: dict[tuple, tuple] = {}
+    for change in changes:
+        action = change.get("action")
+        if action not in ("add", "remove"):
+            raise ValueError(f"Invalid action: {action!r}")
+        table_a, table_b = change.get("table_a"), change.get("table_b")
+        validate_table(table_a)
+        validate_table(table_b)
+        try:
+            id_a, id_b = int(change.get("id_a")), int(change.get("id_b"))
+        except (TypeError, ValueError):
+            raise ValueError("Relationship ids must be integers") from None
+        (a_tbl, a_id), (b_tbl, b_id) = sorted(
+            [(table_a, id_a), (table_b, id_b)], key=lambda t: t[0]
+        )
+        key = (a_tbl, a_id, b_tbl, b_id)
+        two_way = 1 if change.get("two_way", True) else 0
+        final.pop(key, None)
+        final[key] = (action == "add", two_way, table_a, id_a, table_b, id_b)
+
+    from db.edit_history import append_edit_logs
+
+    applied = []
+    touched: dict[str, set[int]] = {}
+    logs: dict[str, list[tuple]] = {}
+    added_count = removed_count = rewritten = 0
+    with transaction() as conn:
+        for key, (added, two_way, table_a, id_a, table_b, id_b) in final.items():
+            if added:
+                changed = conn.execute(
+                    "INSERT OR IGNORE INTO relationships (table_a, id_a, table_b, id_b, two_way)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (*key, two_way),
+                ).rowcount
+                if not changed:
+                    if conn.execute(
+                        "UPDATE relationships SET two_way = ? WHERE table_a = ? AND id_a = ?"
+                        " AND table_b = ? AND id_b = ? AND two_way <> ?",
+                        (two_way, *key, two_way),
+                    ).rowcount:
+                        rewritten += 1
+                        touched.setdefault(table_a, set()).add(id_a)
+                        touched.setdefault(table_b, set()).add(id_b)
+                    continue
+                added_count += 1
+            else:
+                if not conn.execute(
+                    "DELETE FROM relationships WHERE table_a = ? AND id_a = ? AND table_b = ? AND id_b = ?",
+                    key,
+                ).rowcount:
+                    continue
+                removed_count += 1
+            applied.append((*key, added))
+            touched.setdefault(table_a, set()).add(id_a)
+            touched.setdefault(table_b, set()).add(id_b)
+            old_b, new_b = (None, str(id_b)) if added else (str(id_b), None)
+            old_a, new_a = (None, str(id_a)) if added else (str(id_a), None)
+            logs.setdefault(table_a, []).append((id_a, f"relation_{table_b}", old_b, new_b))
+            logs.setdefault(table_b, []).append((id_b, f"relation_{table_a}", old_a, new_a))
+        for table, ids in touched.items():
+            touch_last_edited_many(table, ids)
+        for table, entries in logs.items():
+            append_edit_logs(table, entries, actor=actor)
+        commit(conn)
+    note_relationship_changes(applied, writes=len(applied) + rewritten)
+    logger.info(
+        "Applied %d relationship changes",
+        len(applied),
+        extra={"added": added_count, "removed": removed_count, "actor": actor},
+    )
+    return {"added": added_count, "removed": removed_count}
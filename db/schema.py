@@ -1,12 +1,75 @@
 import json
 import logging
 import sqlite3
+import threading
 
+from db import database
 from db.database import get_connection
 from db.validation import validate_table, validate_field
 
 logger = logging.getLogger(__name__)
 
+# Every change to field_schema (or to base table columns) bumps the counter
+# row in schema_version, in the same transaction as the write, so caches
+# keyed on get_schema_generation() are invalidated in every process.  The
+# in-process counter is only a fallback for databases created before the
+# schema_version table existed.
+_schema_lock = threading.Lock()
+_schema_generation = 0
+_schema_cache: dict = {"key": None, "schema": None}
+
+
+def _read_schema_generation() -> tuple[int, bool]:
+    """Return the stored generation and whether this thread has uncommitted writes."""
+    try:
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT generation FROM schema_version WHERE id = 1"
+            ).fetchone()
+            pending = conn.in_transaction
+    except sqlite3.DatabaseError:
+        return _schema_generation, False
+    if row is None:
+        return _schema_generation, pending
+    return row[0], pending
+
+
+def get_schema_generation() -> int:
+    """Return the current schema generation counter."""
+    return _read_schema_generation()[0]
+
+
+def bump_schema_generation() -> int:
+    """Invalidate cached schema data after a schema change.
+
+    Writes to field_schema bump the stored counter on their own; this is for
+    changes that only touch table DDL or that bypass field_schema.
+    """
+    global _schema_generation
+    with _schema_lock:
+        _schema_generation += 1
+        _schema_cache["key"] = None
+        _schema_cache["schema"] = None
+    try:
+        with database.transaction() as conn:
+            conn.execute(
+                "UPDATE schema_version SET generation = generation + 1 WHERE id = 1"
+            )
+    except sqlite3.DatabaseError as exc:
+        logger.warning(
+            "Could not bump stored schema generation: %s",
+            exc,
+            extra={"error": str(exc)},
+        )
+    generation = get_schema_generation()
+    logger.debug(
+        "Schema generation bumped to %s",
+        generation,
+        extra={"schema_generation": generation},
+    )
+    return generation
+
+
 # Create library with field types and coordinate layouts
 def load_field_schema():
     """
@@ -98,6 +161,7 @@ def update_foreign_field_options():
     # For each 'foreign_key' field, fetch id+label from its foreign table and update field_options.
     # Local import to avoid circular dependency
     from db.validation import validate_table
+    from db.catalog import get_table_meta
 
     with get_connection() as conn:
         cur = conn.cursor()
@@ -133,17 +197,10 @@ def update_foreign_field_options():
                 )
                 continue
             try:
-                cur.execute(f"PRAGMA table_info({foreign_table})")
-                cols = [r[1] for r in cur.fetchall()]
-                if not cols:
+                meta = get_table_meta(foreign_table)
+                if meta is None:
                     raise ValueError(f"No columns in {foreign_table}")
-                title_field = get_title_field(foreign_table)
-                if title_field and title_field in cols:
-                    label_field = title_field
-                else:
-                    label_field = cols[1] if len(cols) > 1 else cols[0]
-                if label_field not in cols:
-                    continue
+                label_field = meta.label_field
                 cur.execute(f"SELECT COUNT(*) FROM {foreign_table}")
                 total = cur.fetchone()[0]
                 if total > MAX_OPTIONS:
@@ -190,15 +247,34 @@ def update_foreign_field_options():
             )
 
         conn.commit()
+    bump_schema_generation()
 
 
 def get_field_schema():
-    return load_field_schema()
+    """Return the field schema, reloading it only when the generation changes.
+
+    The returned dict is shared between callers and must be treated as
+    read-only; use ``load_field_schema()`` for a private copy.
+    """
+    generation, pending = _read_schema_generation()
+    key = (database.DB_PATH, generation)
+    if _schema_cache["key"] == key:
+        return _schema_cache["schema"]
+    schema = load_field_schema()
+    if pending:
+        # Uncommitted schema writes may still roll back; don't share them.
+        return schema
+    with _schema_lock:
+        # Only publish if nothing bumped the generation while we were loading.
+        if key == (database.DB_PATH, get_schema_generation()):
+            _schema_cache["key"] = key
+            _schema_cache["schema"] = schema
+    return schema
 
 
 def get_title_field(table: str) -> str | None:
     """Return the field marked as the title for the table, if any."""
-    schema = load_field_schema()
+    schema = get_field_schema()
     tbl = schema.get(table, {})
     for field, meta in tbl.items():
         if meta.get("title"):
@@ -239,7 +315,7 @@ def refresh_card_cache():
 
 def update_layout(table: str, layout_items: list[dict]) -> int:
     validate_table(table)
-    current_schema = load_field_schema()
+    current_schema = get_field_schema()
 
     if table not in current_schema:
         raise ValueError(f"Unknown table: {table}")
@@ -294,15 +370,11 @@ def update_layout(table: str, layout_items: list[dict]) -> int:
             )
             if cur.rowcount:
                 updated += 1
-                current_schema[table][field]["layout"] = {
-                    "colStart": col_start,
-                    "colSpan": col_span,
-                    "rowStart": row_start,
-                    "rowSpan": row_span,
-                }
 
         conn.commit()
 
+    if updated:
+        bump_schema_generation()
     return updated
 
 
@@ -324,7 +396,7 @@ def update_field_styling(table: str, field: str, styling_dict: dict) -> bool:
 
     validate_table(table)
     validate_field(table, field)
-    current_schema = load_field_schema()
+    current_schema = get_field_schema()
     if table not in current_schema or field not in current_schema[table]:
         raise ValueError(f"Unknown table/field: {table}.{field}")
 
@@ -350,7 +422,7 @@ def update_field_styling(table: str, field: str, styling_dict: dict) -> bool:
 
     updated = cur.rowcount > 0
     if updated:
-        current_schema[table][field]["styling"] = styling_dict or {}
+        bump_schema_generation()
 
     return updated
 
@@ -446,6 +518,9 @@ def create_base_table(table_name: str, description: str, title_field: str) -> bo
             conn.rollback()
             return False
 
+    bump_schema_generation()
+    from db.field_values import sync_field_values
+    sync_field_values(table_name)
     return True
 
 def set_title_field(table: str, field: str) -> bool:
@@ -485,6 +560,7 @@ def set_title_field(table: str, field: str) -> bool:
                 (table, field),
             )
             conn.commit()
+            bump_schema_generation()
 
             ok = cur.rowcount > 0
             if ok:
@@ -0,0 +1,255 @@
+import html
+import logging
+import re
+import sqlite3
+
+from markupsafe import Markup
+
+from db.catalog import fts_table_name, get_table_meta
+from db.database import get_connection, transaction
+from db.schema import bump_schema_generation
+from db.validation import validate_table
+
+logger = logging.getLogger(__name__)
+
+# Sentinel characters wrapped around matched terms by snippet(); they are
+# swapped for <mark> tags only after the surrounding text has been escaped.
+_HIT_START = "\x02"
+_HIT_END = "\x03"
+_SNIPPET_TOKENS = 16
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(search: str | None) -> str | None:
+    """Return an FTS5 MATCH expression for free-text ``search``.
+
+    Every word becomes a quoted prefix term so user input can never be parsed
+    as FTS5 query syntax. Returns ``None`` when there is nothing to match.
+    """
+    tokens = _TOKEN_RE.findall(search or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{tok}"*' for tok in tokens)
+
+
+def fts_search_clause(table: str, search: str | None) -> tuple[str, str] | None:
+    """Return ``(clause, match)`` restricting ``table`` to FTS hits.
+
+    Only used when the table has an index covering exactly its current
+    searchable fields; otherwise ``None`` and callers fall back to LIKE.
+    """
+    meta = get_table_meta(table)
+    if meta is None or not meta.fts_columns:
+        return None
+    if set(meta.fts_columns) != set(meta.searchable_fields):
+        logger.warning(
+            "FTS index for %s is out of date; falling back to LIKE search",
+            table,
+            extra={"table": table},
+        )
+        return None
+    match = build_match_query(search)
+    if match is None:
+        return None
+    fts = fts_table_name(table)
+    return f"id IN (SELECT rowid FROM {fts} WHERE {fts} MATCH ?)", match
+
+
+def _drop_fts_objects(conn: sqlite3.Connection, table: str) -> None:
+    fts = fts_table_name(table)
+    for suffix in ("ai", "ad", "au"):
+        conn.execute(f'DROP TRIGGER IF EXISTS "{fts}_{suffix}"')
+    conn.execute(f'DROP TABLE IF EXISTS "{fts}"')
+
+
+def _create_fts_objects(conn: sqlite3.Connection, table: str, columns, textarea) -> None:
+    """Create the index, its sync triggers and backfill it.
+
+    Textarea HTML goes through ``strip_tags()`` (registered on every pooled
+    connection) so tag names and entities are not indexed. The index stores
+    that text itself, which keeps snippets aligned with what was matched.
+    """
+    fts = fts_table_name(table)
+    col_list = ", ".join(columns)
+
+    def values(ref: str) -> str:
+        return ", ".join(
+            f"strip_tags({ref}{c})" if c in textarea else f"{ref}{c}" for c in columns
+        )
+
+    conn.execute(
+        f'CREATE VIRTUAL TABLE "{fts}" USING fts5({col_list}, '
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    conn.execute(
+        f'CREATE TRIGGER "{fts}_ai" AFTER INSERT ON "{table}" BEGIN '
+        f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {values('new.')}); END"
+    )
+    conn.execute(
+        f'CREATE TRIGGER "{fts}_ad" AFTER DELETE ON "{table}" BEGIN '
+        f"DELETE FROM {fts} WHERE rowid = old.id; END"
+    )
+    conn.execute(
+        f'CREATE TRIGGER "{fts}_au" AFTER UPDATE OF {col_list} ON "{table}" BEGIN '
+        f"DELETE FROM {fts} WHERE rowid = old.id; "
+        f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {values('new.')}); END"
+    )
+    conn.execute(
+        f"INSERT INTO {fts}(rowid, {col_list}) "
+        f'SELECT id, {values("")} FROM "{table}"'
+    )
+
+
+def create_fts_index(table: str) -> bool:
+    """Create (or rebuild) the FTS5 index for ``table``'s searchable fields.
+
+    The index is kept in sync by triggers, so every write path updates it
+    without further changes.
+    """
+    validate_table(table)
+    meta = get_table_meta(table)
+    if meta is None or not meta.searchable_fields:
+        logger.warning(
+            "No searchable fields to index for %s",
+            table,
+            extra={"table": table},
+        )
+        return False
+    try:
+        with transaction() as conn:
+            _drop_fts_objects(conn, table)
+            _create_fts_objects(
+                conn, table, meta.searchable_fields, meta.textarea_fields
+            )
+    except sqlite3.DatabaseError as exc:
+        logger.exception(
+            "Failed to build FTS index for %s",
+            table,
+            extra={"table": table, "error": str(exc)},
+        )
+        return False
+    bump_schema_generation()
+    logger.info(
+        "Built FTS index for %s",
+        table,
+        extra={"table": table, "columns": list(meta.searchable_fields)},
+    )
+    return True
+
+
+def drop_fts_index(table: str) -> bool:
+    """Remove the FTS5 index and its triggers for ``table``."""
+    validate_table(table)
+    try:
+        with transaction() as conn:
+            _drop_fts_objects(conn, table)
+    except sqlite3.DatabaseError as exc:
+        logger.exception(
+            "Failed to drop FTS index for %s",
+            table,
+            extra={"table": table, "error": str(exc)},
+        )
+        return False
+    bump_schema_generation()
+    logger.info("Dropped FTS index for %s", table, extra={"table": table})
+    return True
+
+
+def refresh_fts_index(table: str, force: bool = False) -> bool:
+    """Rebuild ``table``'s FTS index if it has one and it is out of date.
+
+    Called after schema changes that alter the searchable columns. Pass
+    ``force`` when the base table was recreated, which drops its triggers.
+    """
+    meta = get_table_meta(table)
+    if meta is None or not meta.fts_columns:
+        return False
+    if not meta.searchable_fields:
+        return drop_fts_index(table)
+    if not force and set(meta.fts_columns) == set(meta.searchable_fields):
+        return False
+    return create_fts_index(table)
+
+
+def migrate_fts_indexes() -> None:
+    """Rebuild indexes created as external-content tables over raw HTML.
+
+    Run once at startup; indexes already in the current form are left alone.
+    """
+    try:
+        with get_connection() as conn:
+            tables = [
+                r[0][: -len("_fts")]
+                for r in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' "
+                    "AND name LIKE '%\\_fts' ESCAPE '\\' AND sql LIKE '%content=%'"
+                ).fetchall()
+            ]
+    except sqlite3.DatabaseError as exc:
+        logger.warning(
+            "Could not list search indexes: %s",
+            exc,
+            extra={"error": str(exc)},
+        )
+        return
+    for table in tables:
+        try:
+            create_fts_index(table)
+        except ValueError:
+            logger.warning(
+                "Skipping search index for unknown table %s",
+                table,
+                extra={"table": table},
+            )
+
+
+def render_snippet(raw: str | None) -> Markup:
+    """Return ``raw`` snippet text as safe HTML with hits wrapped in <mark>.
+
+    The index holds tag-stripped text, so the snippet only needs escaping.
+    """
+    text = html.escape(raw or "")
+    text = text.replace(_HIT_START, "<mark>").replace(_HIT_END, "</mark>")
+    return Markup(text)
+
+
+def load_snippets(
+    conn: sqlite3.Connection,
+    table: str,
+    match: str,
+    record_ids: list[int],
+    fields,
+) -> dict[int, dict[str, Markup]]:
+    """Return ``{record_id: {field: snippet}}`` for ``fields`` that matched.
+
+    Snippets are computed only for the given page of ids rather than for
+    every match.
+    """
+    meta = get_table_meta(table)
+    if not record_ids or meta is None or not meta.fts_columns:
+        return {}
+    columns = [(f, meta.fts_columns.index(f)) for f in fields if f in meta.fts_columns]
+    if not columns:
+        return {}
+    fts = fts_table_name(table)
+    snippet_sql = ", ".join(
+        f"snippet({fts}, {idx}, '{_HIT_START}', '{_HIT_END}', '…', {_SNIPPET_TOKENS})"
+        for _, idx in columns
+    )
+    placeholders = ",".join("?" for _ in record_ids)
+    rows = conn.execute(
+        f"SELECT rowid, {snippet_sql} FROM {fts} "
+        f"WHERE {fts} MATCH ? AND rowid IN ({placeholders})",
+        [match, *record_ids],
+    ).fetchall()
+    result: dict[int, dict[str, Markup]] = {}
+    for row in rows:
+        snippets = {
+            field: render_snippet(value)
+            for (field, _), value in zip(columns, row[1:])
+            if value and _HIT_START in value
+        }
+        if snippets:
+            result[row[0]] = snippets
+    return result
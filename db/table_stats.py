@@ -0,0 +1,122 @@
+import logging
+import sqlite3
+import threading
+
+from db import database
+from db.database import get_connection, transaction
+from db.schema import get_schema_generation
+
+logger = logging.getLogger(__name__)
+
+# Per-table row counter and write version maintained by triggers on each base
+# table, so every write path (including the import worker and raw SQL) keeps
+# them current. The write version is the invalidation key for derived caches.
+STATS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS table_stats (
+        table_name TEXT PRIMARY KEY,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        write_version INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+# Tables whose triggers are known to exist for (DB_PATH, schema generation).
+# Recreating a table (e.g. dropping a column) bumps the generation, so the
+# triggers are re-checked and reinstalled.
+_installed_lock = threading.Lock()
+_installed: dict = {"key": None, "tables": set()}
+
+
+def _trigger_names(table: str) -> tuple[str, str, str]:
+    return (f"{table}_stats_ai", f"{table}_stats_ad", f"{table}_stats_au")
+
+
+def _install(conn: sqlite3.Connection, table: str) -> None:
+    """Create the stats row and triggers for ``table`` and seed its count."""
+    conn.execute(STATS_TABLE_SQL)
+    ins, dele, upd = _trigger_names(table)
+    conn.execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{ins}" AFTER INSERT ON "{table}" BEGIN '
+        "UPDATE table_stats SET row_count = row_count + 1, "
+        f"write_version = write_version + 1 WHERE table_name = '{table}'; END"
+    )
+    conn.execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{dele}" AFTER DELETE ON "{table}" BEGIN '
+        "UPDATE table_stats SET row_count = row_count - 1, "
+        f"write_version = write_version + 1 WHERE table_name = '{table}'; END"
+    )
+    conn.execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{upd}" AFTER UPDATE ON "{table}" BEGIN '
+        "UPDATE table_stats SET write_version = write_version + 1 "
+        f"WHERE table_name = '{table}'; END"
+    )
+    count = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    conn.execute(
+        "INSERT INTO table_stats (table_name, row_count, write_version) VALUES (?, ?, 1) "
+        "ON CONFLICT(table_name) DO UPDATE SET row_count = excluded.row_count, "
+        "write_version = write_version + 1",
+        (table, count),
+    )
+
+
+def ensure_table_stats(tables) -> None:
+    """Make sure ``tables`` have counters and triggers installed."""
+    key = (database.DB_PATH, get_schema_generation())
+    with _installed_lock:
+        if _installed["key"] != key:
+            _installed["key"] = key
+            _installed["tables"] = set()
+        missing = [t for t in tables if t not in _installed["tables"]]
+    if not missing:
+        return
+
+    with get_connection() as conn:
+        existing = {
+            r[0]
+            for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_stats_a_'"
+            ).fetchall()
+        }
+        has_stats = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'table_stats'"
+        ).fetchone()
+    to_install = [
+        t for t in missing if not has_stats or not set(_trigger_names(t)) <= existing
+    ]
+    if to_install:
+        with transaction() as conn:
+            for table in to_install:
+                _install(conn, table)
+        logger.info(
+            "Installed table stats triggers for %s",
+            to_install,
+            extra={"tables": to_install},
+        )
+    with _installed_lock:
+        if _installed["key"] == key:
+            _installed["tables"].update(missing)
+
+
+def get_table_stats(tables) -> dict[str, tuple[int, int]]:
+    """Return ``{table: (row_count, write_version)}`` for ``tables``."""
+    tables = list(tables)
+    if not tables:
+        return {}
+    ensure_table_stats(tables)
+    placeholders = ", ".join("?" for _ in tables)
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT table_name, row_count, write_version FROM table_stats "
+            f"WHERE table_name IN ({placeholders})",
+            tables,
+        ).fetchall()
+    return {r[0]: (r[1], r[2]) for r in rows}
+
+
+def get_row_count(table: str) -> int:
+    """Return the maintained row count for ``table``."""
+    return get_table_stats([table]).get(table, (0, 0))[0]
+
+
+def get_write_version(table: str) -> int:
+    """Return a number that changes whenever ``table`` is written to."""
+    return get_table_stats([table]).get(table, (0, 0))[1]
@@ -13,5 +13,11 @@ def validate_field(table: str, field: str):
         raise ValueError(f"Invalid column `{field}` for table `{table}`")
 
 def validate_fields(table: str, fields: list[str]):
+    from db.schema import get_field_schema
+    schema = get_field_schema()
+    if table not in schema:
+        raise ValueError(f"Invalid table: {table}")
+    table_schema = schema[table]
     for f in fields:
-        validate_field(table, f)
+        if f not in table_schema:
+            raise ValueError(f"Invalid column `{f}` for table `{table}`")
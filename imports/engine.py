@@ -0,0 +1,524 @@
+import datetime
+import json
+import logging
+import sqlite3
+from itertools import islice
+
+from db.catalog import get_table_meta
+from db.database import get_connection, transaction
+from db.label_map import AMBIGUOUS, LabelMap, split_labels
+from db.schema import get_field_schema
+from db.validation import validate_table
+
+logger = logging.getLogger(__name__)
+
+_MARKUP_CHARS = frozenset("<>&")
+# Name prefix of the temporary key indexes upsert jobs create and drop.
+KEY_INDEX_PREFIX = "idx_import_key__"
+
+
+class ImportPlan:
+    """Insert statement and column handling for one table, resolved once
+    per job instead of once per row."""
+
+    __slots__ = (
+        "table",
+        "columns",
+        "textarea_idx",
+        "stamp_idx",
+        "insert_sql",
+        "reference_idx",
+        "references",
+    )
+
+    def __init__(self, table: str):
+        validate_table(table)
+        meta = get_table_meta(table)
+        fields = get_field_schema().get(table, {})
+        if meta is None or not fields:
+            raise ValueError(f"Unknown table: {table}")
+        columns = [
+            f
+            for f, m in fields.items()
+            if f != "id" and m["type"] != "hidden" and f in meta.column_set
+        ]
+        self.textarea_idx = tuple(
+            i for i, f in enumerate(columns) if fields[f]["type"] == "textarea"
+        )
+        stamps = [
+            c
+            for c, present in (
+                ("date_created", meta.has_date_created),
+                ("last_edited", meta.has_last_edited),
+            )
+            if present and c not in columns
+        ]
+        self.reference_idx = tuple(
+            (i, fields[f]["foreign_key"])
+            for i, f in enumerate(columns)
+            if fields[f]["type"] == "foreign_key" and fields[f].get("foreign_key")
+        )
+        self.references: list[tuple[int, LabelMap]] = []
+        self.stamp_idx = tuple(range(len(columns), len(columns) + len(stamps)))
+        columns += stamps
+        if not columns:
+            raise ValueError(f"No importable columns on {table}")
+        self.table = table
+        self.columns = tuple(columns)
+        self.insert_sql = (
+            f'INSERT INTO "{table}" ({", ".join(columns)}) '
+            f'VALUES ({", ".join("?" for _ in columns)})'
+        )
+
+    def normalize(self, row: dict, timestamp: str) -> list:
+        """Return insert parameters for ``row`` (missing fields become '')."""
+        from utils.html_sanitizer import sanitize_html
+
+        values = [row.get(c, "") for c in self.columns]
+        for i in self.textarea_idx:
+            value = values[i]
+            # Text without markup characters comes back from bleach unchanged.
+            if not isinstance(value, str) or _MARKUP_CHARS.intersection(value):
+                values[i] = sanitize_html(value)
+        for i in self.stamp_idx:
+            values[i] = timestamp
+        return values
+
+    def load_references(self, conn: sqlite3.Connection) -> None:
+        """Build one label map per table referenced by a foreign_key column."""
+        maps: dict[str, LabelMap | None] = {}
+        for idx, target in self.reference_idx:
+            if target not in maps:
+                try:
+                    maps[target] = LabelMap(conn, target)
+                except (sqlite3.DatabaseError, ValueError):
+                    logger.exception(
+                        "Cannot resolve references from %s to %s",
+                        self.table,
+                        target,
+                        extra={"table": self.table, "foreign_table": target},
+                    )
+                    maps[target] = None
+            label_map = maps[target]
+            if label_map is not None and label_map.complete:
+                self.references.append((idx, label_map))
+
+    def resolve(self, values: list, link: bool = False) -> list[tuple[str, int]]:
+        """Check the foreign_key labels in ``values`` against their tables.
+
+        Raises ValueError naming labels that match no record (or, when
+        ``link`` is set, several records). Returns ``(table, id)`` targets
+        for relationships when ``link`` is set.
+        """
+        targets = []
+        for idx, label_map in self.references:
+            labels = split_labels(values[idx])
+            values[idx] = ", ".join(labels)
+            missing, ambiguous = [], []
+            for label in labels:
+                record_id = label_map.get(label)
+                if record_id is None:
+                    missing.append(label)
+                elif record_id == AMBIGUOUS:
+                    ambiguous.append(label)
+                elif link:
+                    targets.append((label_map.table, record_id))
+            if missing:
+                raise ValueError(
+                    f"Unknown {label_map.table} labels: {', '.join(missing)}"
+                )
+            if link and ambiguous:
+                raise ValueError(
+                    f"Ambiguous {label_map.table} labels: {', '.join(ambiguous)}"
+                )
+        return targets
+
+
+class MergePlan(ImportPlan):
+    """Upsert handling on top of an insert plan: rows are matched to existing
+    records on ``key_fields``; matches get their changed fields updated and
+    the rest are inserted."""
+
+    __slots__ = ("key_fields", "key_idx", "data_count", "lookup_sql", "_present")
+
+    def __init__(self, table: str, key_fields):
+        super().__init__(table)
+        self.data_count = len(self.columns) - len(self.stamp_idx)
+        data_columns = self.columns[: self.data_count]
+        key_fields = tuple(dict.fromkeys(key_fields or ()))
+        if not key_fields:
+            raise ValueError("Upsert imports need at least one key field")
+        for field in key_fields:
+            if field not in data_columns:
+                raise ValueError(f"Invalid key field: {field}")
+        self.key_fields = key_fields
+        self.key_idx = tuple(data_columns.index(f) for f in key_fields)
+        match = " AND ".join(
+            f"t.\"{f}\" = json_extract(j.value, '$[{i}]')" for i, f in enumerate(key_fields)
+        )
+        selected = ", ".join(f't."{c}"' for c in data_columns)
+        self.lookup_sql = (
+            f'SELECT t.id, {selected} FROM json_each(?) AS j JOIN "{table}" AS t ON {match}'
+        )
+        self._present: dict[frozenset, tuple] = {}
+
+    @property
+    def index_name(self) -> str:
+        return f"{KEY_INDEX_PREFIX}{self.table}__{'__'.join(self.key_fields)}"
+
+    def present(self, row: dict) -> tuple:
+        """Indexes of the data columns supplied by ``row`` (cached per key set)."""
+        keys = frozenset(row)
+        idx = self._present.get(keys)
+        if idx is None:
+            idx = self._present[keys] = tuple(
+                i for i in range(self.data_count) if self.columns[i] in keys
+            )
+        return idx
+
+    def key(self, values) -> tuple:
+        """Return the key of a stored record or of insert parameters as text."""
+        return tuple(_key_text(values[i]) for i in self.key_idx)
+
+    def update_sql(self, changed: tuple) -> str:
+        sets = [f'"{self.columns[i]}" = ?' for i in changed]
+        if "last_edited" in self.columns[self.data_count:]:
+            sets.append("last_edited = ?")
+        return f'UPDATE "{self.table}" SET {", ".join(sets)} WHERE id = ?'
+
+
+def _key_text(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return None if value is None else str(value)
+
+
+def ensure_key_index(conn: sqlite3.Connection, plan: MergePlan) -> str | None:
+    """Index ``plan``'s key columns unless an existing index already leads
+    with them. Returns the name of the index the job owns and must drop, if any.
+
+    A covering ``idx_import_key__*`` index is a leftover from a job whose
+    worker died before dropping it, so it is adopted rather than kept.
+    """
+    wanted = list(plan.key_fields)
+    for (name,) in conn.execute(
+        f"SELECT name FROM pragma_index_list('{plan.table}')"
+    ).fetchall():
+        cols = [r[0] for r in conn.execute(
+            "SELECT name FROM pragma_index_info(?) ORDER BY seqno", (name,)
+        ).fetchall()]
+        if cols[: len(wanted)] == wanted:
+            return name if name.startswith(KEY_INDEX_PREFIX) else None
+    columns = ", ".join(f'"{f}"' for f in wanted)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{plan.index_name}" ON "{plan.table}" ({columns})')
+    return plan.index_name
+
+
+def _differs(old, new) -> bool:
+    """Return True when an imported text value changes a stored value."""
+    if old is None:
+        return new not in (None, "")
+    if isinstance(old, (int, float)) and isinstance(new, str):
+        try:
+            return float(new) != old
+        except ValueError:
+            return True
+    return str(old) != str(new)
+
+
+def _last_ids(conn: sqlite3.Connection, count: int) -> range:
+    """Ids of the last ``count`` rows inserted by one executemany.
+
+    The write lock is held, so SQLite assigns consecutive rowids.
+    """
+    last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    return range(last - count + 1, last + 1)
+
+
+def _apply_ops(conn: sqlite3.Connection, ops) -> tuple[list, list[dict]]:
+    """Execute ``(row_number, sql, params, logs, links)`` ops.
+
+    Ops sharing a statement run as one executemany; if any fails the whole
+    set is replayed op by op under savepoints. Inserts have ``logs`` None;
+    updates end their params with the record id. Returns ``(op, record_id)``
+    for the applied ops and the row errors.
+    """
+    conn.execute("SAVEPOINT import_chunk")
+    try:
+        grouped: dict[str, list] = {}
+        for op in ops:
+            grouped.setdefault(op[1], []).append(op)
+        applied = []
+        for sql, group in grouped.items():
+            conn.executemany(sql, [op[2] for op in group])
+            if group[0][3] is None:
+                applied += zip(group, _last_ids(conn, len(group)))
+            else:
+                applied += ((op, op[2][-1]) for op in group)
+        conn.execute("RELEASE import_chunk")
+        return applied, []
+    except sqlite3.DatabaseError:
+        conn.execute("ROLLBACK TO import_chunk")
+        conn.execute("RELEASE import_chunk")
+
+    applied, errors = [], []
+    for op in ops:
+        conn.execute("SAVEPOINT import_row")
+        try:
+            cur = conn.execute(op[1], op[2])
+            applied.append((op, cur.lastrowid if op[3] is None else op[2][-1]))
+        except sqlite3.DatabaseError as exc:
+            conn.execute("ROLLBACK TO import_row")
+            errors.append({"row": op[0], "message": str(exc)})
+        conn.execute("RELEASE import_row")
+    return applied, errors
+
+
+def _merge_rows(conn, plan: MergePlan, rows, timestamp: str, actor):
+    """Upsert chunk items whose keys are unique.
+
+    Returns ``(errors, counts, linked)`` where ``linked`` pairs record ids
+    with their resolved reference targets.
+    """
+    from db.edit_history import append_edit_logs
+
+    matches: dict[tuple, list] = {}
+    keys = [[item[1][i] for i in plan.key_idx] for item in rows]
+    for found in conn.execute(plan.lookup_sql, (json.dumps(keys),)).fetchall():
+        current = found[1:]
+        matches.setdefault(plan.key(current), []).append(found)
+
+    errors: list[dict] = []
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    linked = []
+    ops = []
+    for row_no, params, present, links in rows:
+        found = matches.get(plan.key(params), ())
+        if not found:
+            ops.append((row_no, plan.insert_sql, params, None, links))
+            continue
+        if len(found) > 1:
+            errors.append({"row": row_no, "message": f"Key matches {len(found)} records"})
+            continue
+        record_id, current = found[0][0], found[0][1:]
+        changed = tuple(
+            i for i in present if i not in plan.key_idx and _differs(current[i], params[i])
+        )
+        if not changed:
+            counts["unchanged"] += 1
+            if links:
+                linked.append((record_id, links))
+            continue
+        update_params = [params[i] for i in changed]
+        if "last_edited" in plan.columns[plan.data_count:]:
+            update_params.append(timestamp)
+        logs = [
+            (
+                record_id,
+                plan.columns[i],
+                None if current[i] is None else str(current[i]),
+                str(params[i]),
+            )
+            for i in changed
+        ]
+        ops.append(
+            (row_no, plan.update_sql(changed), update_params + [record_id], logs, links)
+        )
+
+    applied, op_errors = _apply_ops(conn, ops)
+    for op, record_id in applied:
+        counts["updated" if op[3] is not None else "inserted"] += 1
+        if op[4]:
+            linked.append((record_id, op[4]))
+    append_edit_logs(
+        plan.table,
+        [entry for op, _ in applied if op[3] for entry in op[3]],
+        actor=actor,
+    )
+    return errors + op_errors, counts, linked
+
+
+def _merge_chunk(conn, plan: MergePlan, chunk, timestamp: str, actor):
+    """Upsert a chunk of ``(row_number, params, present, links)`` items.
+
+    A key repeated within the chunk starts a new pass, so the later row sees
+    the record written by the earlier one. Returns ``(errors, counts,
+    linked)`` like ``_merge_rows``.
+    """
+    errors: list[dict] = []
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    linked = []
+    passes: list[list] = [[]]
+    seen: set = set()
+    for item in chunk:
+        key = plan.key(item[1])
+        if any(v in (None, "") for v in key):
+            errors.append({"row": item[0], "message": "Missing key value"})
+            continue
+        if key in seen:
+            passes.append([])
+            seen = set()
+        seen.add(key)
+        passes[-1].append(item)
+    for rows in passes:
+        if not rows:
+            continue
+        pass_errors, pass_counts, pass_linked = _merge_rows(conn, plan, rows, timestamp, actor)
+        errors += pass_errors
+        linked += pass_linked
+        for name, n in pass_counts.items():
+            counts[name] += n
+    return errors, counts, linked
+
+
+def _insert_chunk(conn: sqlite3.Connection, plan: ImportPlan, chunk):
+    """Insert ``(row_number, params, present, links)`` items.
+
+    The chunk is tried with one executemany; if that fails it is replayed
+    row by row, each under its own savepoint, so one bad row only drops
+    itself. Returns the row errors and ``(record_id, links)`` for inserted
+    rows with reference targets.
+    """
+    applied, errors = _apply_ops(
+        conn,
+        [(row_no, plan.insert_sql, params, None, links) for row_no, params, _, links in chunk],
+    )
+    return errors, [(record_id, op[4]) for op, record_id in applied if op[4]]
+
+
+def _write_links(conn: sqlite3.Connection, table: str, linked) -> int:
+    """Add two-way relationships from new/updated records to their targets."""
+    rows = set()
+    for record_id, targets in linked:
+        for target, target_id in targets:
+            if (target, target_id) == (table, record_id):
+                continue
+            (a_tbl, a_id), (b_tbl, b_id) = sorted(
+                [(table, record_id), (target, target_id)], key=lambda t: t[0]
+            )
+            rows.add((a_tbl, a_id, b_tbl, b_id))
+    if not rows:
+        return 0
+    cur = conn.executemany(
+        "INSERT INTO relationships (table_a, id_a, table_b, id_b, two_way)"
+        " VALUES (?, ?, ?, ?, 1)"
+        " ON CONFLICT(table_a,id_a,table_b,id_b) DO NOTHING",
+        sorted(rows),
+    )
+    return cur.rowcount
+
+
+def run_import(
+    table: str,
+    rows,
+    *,
+    chunk_size: int = 1000,
+    progress=None,
+    collect_errors: bool = True,
+    start_row: int = 0,
+    checkpoint=None,
+    key_fields=None,
+    actor: str | None = None,
+    link_references: bool = False,
+) -> dict:
+    """Insert ``rows`` (an iterable of ``{field: value}`` dicts) into ``table``.
+
+    Rows are normalized and written ``chunk_size`` at a time, one transaction
+    per chunk. The first ``start_row`` rows are skipped, so a job can resume
+    after its last committed chunk. ``checkpoint(conn, last_row,
+    chunk_errors, chunk_counts)`` runs inside each chunk's transaction, so
+    whatever it records commits together with the rows. ``progress(processed,
+    chunk_errors)`` is called after each committed chunk.
+
+    With ``key_fields`` the import upserts: rows matching an existing record
+    on those fields update only the supplied fields whose values changed
+    (logged to edit_history as ``actor``), and other rows are inserted. The
+    key columns are indexed for the duration of the job if no index covers
+    them.
+
+    foreign_key labels are checked against a label map of each referenced
+    table, built once per call; rows with unknown labels become row errors.
+    With ``link_references`` a relationship to each referenced record is
+    added as well.
+
+    Row numbers and ``processed`` count source rows from the start of
+    ``rows``; the other counts cover this call only. Pass
+    ``collect_errors=False`` when a callback persists the errors, so they
+    are not also held in memory.
+    """
+    plan = MergePlan(table, key_fields) if key_fields else ImportPlan(table)
+    chunk_size = max(1, int(chunk_size))
+    processed = start_row
+    error_count = 0
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0}
+    errors: list[dict] = []
+    links_created = 0
+    with get_connection() as conn:
+        plan.load_references(conn)
+    key_index = None
+    if key_fields:
+        with transaction() as conn:
+            key_index = ensure_key_index(conn, plan)
+    numbered = enumerate(islice(rows, start_row, None), start=start_row + 1)
+    try:
+        while True:
+            batch = list(islice(numbered, chunk_size))
+            if not batch:
+                break
+            timestamp = datetime.datetime.utcnow().isoformat(timespec="seconds")
+            chunk, chunk_errors = [], []
+            for row_no, row in batch:
+                try:
+                    params = plan.normalize(row, timestamp)
+                    links = plan.resolve(params, link_references)
+                except (TypeError, ValueError, AttributeError) as exc:
+                    chunk_errors.append({"row": row_no, "message": str(exc)})
+                    continue
+                present = plan.present(row) if key_fields else None
+                chunk.append((row_no, params, present, links))
+            with transaction() as conn:
+                if key_fields:
+                    merge_errors, counts, linked = _merge_chunk(
+                        conn, plan, chunk, timestamp, actor
+                    )
+                    chunk_errors += merge_errors
+                else:
+                    insert_errors, linked = _insert_chunk(conn, plan, chunk)
+                    chunk_errors += insert_errors
+                    counts = {
+                        "inserted": len(batch) - len(chunk_errors),
+                        "updated": 0,
+                        "unchanged": 0,
+                    }
+                if linked:
+                    links_created += _write_links(conn, table, linked)
+                chunk_errors.sort(key=lambda e: e["row"])
+                if checkpoint is not None:
+                    checkpoint(conn, batch[-1][0], chunk_errors, counts)
+            processed = batch[-1][0]
+            error_count += len(chunk_errors)
+            for name, n in counts.items():
+                totals[name] += n
+            if collect_errors:
+                errors += chunk_errors
+            if chunk_errors:
+                logger.warning(
+                    "Import into %s: %d row errors in chunk",
+                    table,
+                    len(chunk_errors),
+                    extra={"table": table, "rows": [e["row"] for e in chunk_errors]},
+                )
+            if progress is not None:
+                progress(processed, chunk_errors)
+    finally:
+        if key_index is not None:
+            with transaction() as conn:
+                conn.execute(f'DROP INDEX IF EXISTS "{key_index}"')
+    return {
+        "processed": processed,
+        "imported": sum(totals.values()),
+        "error_count": error_count,
+        "errors": errors,
+        "links_created": links_created,
+        **totals,
+    }
@@ -1,16 +1,174 @@
 import csv
+import json
+import os
+import re
+import shutil
+import sqlite3
 import sys
+import time
+import uuid
+from contextlib import contextmanager
 from io import StringIO
+from itertools import islice
+
+from db.database import get_connection
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Uploaded CSVs are spooled here and imported from disk by reference.
+UPLOAD_DIR = os.path.join(PROJECT_ROOT, "data", "imports")
+UPLOAD_TTL = 24 * 60 * 60
+PREVIEW_ROWS = 200
+_COPY_BUFFER = 1024 * 1024
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Imported cells (textarea HTML in particular) can exceed the csv module's
+# default field limit. The limit is process-wide, so lift it once here rather
+# than toggling it around readers that may be suspended mid-iteration.
+csv.field_size_limit(sys.maxsize)
+
 
 def parse_csv(file):
     decoded = file.read().decode("utf-8")
     csv_stream = StringIO(decoded)
-    original_limit = csv.field_size_limit()
-    csv.field_size_limit(sys.maxsize)
-    try:
-        reader = csv.DictReader(csv_stream)
-        rows = list(reader)
-        headers = reader.fieldnames
-    finally:
-        csv.field_size_limit(original_limit)
+    reader = csv.DictReader(csv_stream)
+    rows = list(reader)
+    headers = reader.fieldnames
     return headers, rows
+
+
+def upload_path(upload_id: str) -> str:
+    """Return the spool file for ``upload_id``."""
+    if not isinstance(upload_id, str) or not _UPLOAD_ID_RE.match(upload_id):
+        raise ValueError("Invalid upload id")
+    return os.path.join(UPLOAD_DIR, f"{upload_id}.csv")
+
+
+def _meta_path(upload_id: str) -> str:
+    return upload_path(upload_id)[: -len(".csv")] + ".json"
+
+
+def _pending_uploads() -> set[str]:
+    """Return upload ids referenced by import jobs that have not completed."""
+    try:
+        with get_connection() as conn:
+            rows = conn.execute(
+                "SELECT source FROM import_status "
+                "WHERE source IS NOT NULL AND status IS NOT 'complete'"
+            ).fetchall()
+    except sqlite3.OperationalError:
+        # No import has been queued yet.
+        return set()
+    return {r[0] for r in rows}
+
+
+def cleanup_stale_uploads(max_age: int = UPLOAD_TTL) -> None:
+    """Delete spooled uploads older than ``max_age`` seconds.
+
+    Uploads of queued, running or failed jobs are kept so the jobs can
+    still run or be resumed.
+    """
+    if not os.path.isdir(UPLOAD_DIR):
+        return
+    cutoff = time.time() - max_age
+    pending = None
+    for name in os.listdir(UPLOAD_DIR):
+        path = os.path.join(UPLOAD_DIR, name)
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            if pending is None:
+                pending = _pending_uploads()
+            if os.path.splitext(name)[0] in pending:
+                continue
+            os.remove(path)
+        except OSError:
+            continue
+
+
+def _new_upload() -> tuple[str, str]:
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    cleanup_stale_uploads()
+    upload_id = uuid.uuid4().hex
+    return upload_id, upload_path(upload_id)
+
+
+def _finish_upload(upload_id: str, filename: str | None) -> dict:
+    """Scan the spooled file once for headers, a preview and the row count."""
+    preview = []
+    total = 0
+    with open_upload(upload_id) as reader:
+        headers = reader.fieldnames or []
+        for row in reader:
+            if total < PREVIEW_ROWS:
+                preview.append(row)
+            total += 1
+    meta = {"headers": headers, "total_rows": total, "filename": filename}
+    with open(_meta_path(upload_id), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    return {"upload_id": upload_id, "preview": preview, **meta}
+
+
+def spool_upload(file, filename: str | None = None) -> dict:
+    """Copy an uploaded CSV to disk in fixed-size chunks.
+
+    Returns ``{"upload_id", "headers", "total_rows", "preview", "filename"}``
+    where ``preview`` holds the first ``PREVIEW_ROWS`` rows.
+    """
+    upload_id, path = _new_upload()
+    with open(path, "wb") as out:
+        shutil.copyfileobj(file, out, _COPY_BUFFER)
+    return _finish_upload(upload_id, filename)
+
+
+def spool_rows(rows: list[dict]) -> dict:
+    """Write already-parsed rows to a spool file so jobs can reference them."""
+    upload_id, path = _new_upload()
+    headers: dict[str, None] = {}
+    for row in rows:
+        headers.update(dict.fromkeys(row))
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=list(headers), restval="")
+        writer.writeheader()
+        writer.writerows(rows)
+    return _finish_upload(upload_id, None)
+
+
+def get_upload_meta(upload_id: str) -> dict | None:
+    """Return the stored headers/row count for an upload, or None."""
+    try:
+        with open(_meta_path(upload_id), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def remove_upload(upload_id: str) -> None:
+    for path in (upload_path(upload_id), _meta_path(upload_id)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@contextmanager
+def open_upload(upload_id: str):
+    """Yield a ``csv.DictReader`` decoding the spooled file incrementally."""
+    with open(upload_path(upload_id), encoding="utf-8", newline="") as fh:
+        yield csv.DictReader(fh)
+
+
+def iter_upload_rows(upload_id: str, mapping: dict | None = None):
+    """Yield rows from a spooled upload, renamed by ``{header: field}``."""
+    with open_upload(upload_id) as reader:
+        if not mapping:
+            yield from reader
+            return
+        pairs = list(mapping.items())
+        for row in reader:
+            yield {field: row.get(header, "") for header, field in pairs}
+
+
+def read_upload_preview(upload_id: str, limit: int = PREVIEW_ROWS) -> list[dict]:
+    """Return the first ``limit`` rows of a spooled upload."""
+    with open_upload(upload_id) as reader:
+        return list(islice(reader, limit))
@@ -2,9 +2,18 @@ import os
 import json
 import logging
 import sqlite3
+import time
+import uuid
 from huey import SqliteHuey
+from db.config import get_import_chunk_size, get_import_stale_after
 from db.database import get_connection
-from db.records import create_record
+from imports.engine import run_import
+from imports.import_csv import (
+    get_upload_meta,
+    iter_upload_rows,
+    remove_upload,
+    spool_rows,
+)
 
 # Project root directory
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -19,8 +28,45 @@ huey = SqliteHuey(
 )
 
 
+# Columns added to import_status after its first release.
+_IMPORT_STATUS_COLUMNS = {
+    "source": "TEXT",
+    "mapping": "TEXT",
+    "error_count": "INTEGER",
+    "table_name": "TEXT",
+    "checkpoint_row": "INTEGER",
+    "heartbeat_at": "REAL",
+    "key_fields": "TEXT",
+    "inserted_rows": "INTEGER",
+    "updated_rows": "INTEGER",
+    "link_references": "INTEGER",
+    "run_token": "TEXT",
+}
+
+# Row errors are appended here instead of being re-serialized into
+# import_status.errors, which stays '[]' for new jobs.
+IMPORT_ERRORS_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS import_errors (
+        job_id INTEGER NOT NULL,
+        row_number INTEGER NOT NULL,
+        message TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_import_errors_job "
+    "ON import_errors(job_id, row_number)",
+)
+
+# Minimum seconds between progress log lines while a job runs.
+PROGRESS_INTERVAL = 1.0
+
+
+class ClaimLost(Exception):
+    """Another run claimed the import job; this run must stop writing."""
+
+
 def init_import_table():
-    """Ensure the import_status table exists."""
+    """Ensure the import_status table exists with every current column."""
     with get_connection() as conn:
         conn.execute(
             "CREATE TABLE IF NOT EXISTS import_status (\n"
@@ -31,9 +77,58 @@ def init_import_table():
             "  errors TEXT\n"
             ")"
         )
+        existing = {r[1] for r in conn.execute("PRAGMA table_info(import_status)")}
+        for column, decl in _IMPORT_STATUS_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE import_status ADD COLUMN {column} {decl}")
+        for stmt in IMPORT_ERRORS_SQL:
+            conn.execute(stmt)
         conn.commit()
 
 
+def create_import_job(
+    upload_id: str,
+    total_rows: int,
+    mapping: dict | None = None,
+    table: str | None = None,
+    key_fields: list[str] | None = None,
+    link_references: bool = False,
+) -> int:
+    """Record a queued job that imports the spooled upload ``upload_id``.
+
+    With ``key_fields`` the job upserts on those fields instead of inserting.
+    With ``link_references`` foreign_key values also create relationships.
+    """
+    init_import_table()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO import_status "
+            "(status, total_rows, imported_rows, errors, error_count, source, mapping, "
+            "table_name, checkpoint_row, key_fields, inserted_rows, updated_rows, "
+            "link_references) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                "queued",
+                total_rows,
+                0,
+                "[]",
+                0,
+                upload_id,
+                json.dumps(mapping or {}),
+                table,
+                0,
+                json.dumps(key_fields) if key_fields else None,
+                0,
+                0,
+                1 if link_references else 0,
+            ),
+        )
+        job_id = cur.lastrowid
+        conn.commit()
+    return job_id
+
+
 def _update_import_status(job_id, **kwargs):
     """Update fields for a given import job."""
     if not kwargs:
@@ -45,62 +140,216 @@ def _update_import_status(job_id, **kwargs):
         conn.commit()
 
 
-def _run_import(job_id, table, rows):
-    """Helper to perform the actual row import."""
+def _claim_import(job_id) -> str | None:
+    """Mark a queued job as running and return this run's token.
+
+    Returns None when the job is not queued, e.g. a duplicate delivery of a
+    task whose job another worker already claimed.
+    """
+    token = uuid.uuid4().hex
+    with get_connection() as conn:
+        cur = conn.execute(
+            "UPDATE import_status SET status = 'in_progress', run_token = ?, "
+            "heartbeat_at = ? WHERE id = ? AND status = 'queued'",
+            (token, time.time(), job_id),
+        )
+        conn.commit()
+    return token if cur.rowcount == 1 else None
+
+
+def _fail_import(job_id, run_token) -> None:
+    """Mark the job failed unless another run has claimed it since."""
+    with get_connection() as conn:
+        conn.execute(
+            "UPDATE import_status SET status = 'failed' WHERE id = ? AND run_token = ?",
+            (job_id, run_token),
+        )
+        conn.commit()
+
+
+def _record_checkpoint(conn, job_id, run_token, last_row, error_count, chunk_errors, counts):
+    """Append a chunk's errors and advance the job's checkpoint.
+
+    Runs inside the chunk's transaction, so the checkpoint never points past
+    rows that were rolled back or before rows that were committed. Raises
+    ``ClaimLost`` when the job was requeued and claimed by another run,
+    which rolls the chunk back.
+    """
+    cur = conn.execute(
+        "UPDATE import_status SET checkpoint_row = ?, imported_rows = ?, "
+        "error_count = ?, heartbeat_at = ?, "
+        "inserted_rows = COALESCE(inserted_rows, 0) + ?, "
+        "updated_rows = COALESCE(updated_rows, 0) + ? WHERE id = ? AND run_token = ?",
+        (
+            last_row,
+            last_row,
+            error_count,
+            time.time(),
+            counts["inserted"],
+            counts["updated"],
+            job_id,
+            run_token,
+        ),
+    )
+    if cur.rowcount == 0:
+        raise ClaimLost(f"Import job {job_id} was claimed by another run")
+    if chunk_errors:
+        conn.executemany(
+            "INSERT INTO import_errors (job_id, row_number, message) VALUES (?, ?, ?)",
+            [(job_id, e["row"], e["message"]) for e in chunk_errors],
+        )
+
+
+def is_stale(status: str | None, heartbeat_at: float | None) -> bool:
+    """Return True for a running job whose worker stopped sending heartbeats."""
+    if status != "in_progress":
+        return False
+    return heartbeat_at is None or time.time() - heartbeat_at > get_import_stale_after()
+
+
+def find_stale_imports() -> list[int]:
+    """Return ids of in-progress jobs whose heartbeat is older than the limit."""
+    init_import_table()
+    cutoff = time.time() - get_import_stale_after()
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT id FROM import_status WHERE status = 'in_progress' "
+            "AND (heartbeat_at IS NULL OR heartbeat_at < ?) ORDER BY id",
+            (cutoff,),
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+def get_import_errors(job_id, offset: int = 0, limit: int = 100) -> list[dict]:
+    """Return one page of ``{"row", "message"}`` errors for a job, by row."""
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT row_number, message FROM import_errors WHERE job_id = ? "
+            "ORDER BY row_number LIMIT ? OFFSET ?",
+            (job_id, limit, offset),
+        ).fetchall()
+    return [{"row": r[0], "message": r[1]} for r in rows]
+
+
+def _run_import(
+    job_id,
+    table,
+    rows,
+    total_rows,
+    start_row=0,
+    error_count=0,
+    key_fields=None,
+    link_references=False,
+):
+    """Helper to perform the actual row import.
+
+    ``rows`` may be any iterable (typically a generator over a spooled
+    upload), so it is consumed exactly once. Rows up to ``start_row`` were
+    committed by an earlier run of the job and are skipped. ``key_fields``
+    switches the job to upserting on those fields; ``link_references`` adds
+    relationships for resolved foreign_key labels.
+    """
+    run_token = _claim_import(job_id)
+    if run_token is None:
+        logger.warning(
+            "Import job %s is not queued; skipping",
+            job_id,
+            extra={"job_id": job_id, "table": table},
+        )
+        return None
     logger.info(
         "Import job %s started for table %s",
         job_id,
         table,
-        extra={"job_id": job_id, "table": table},
+        extra={"job_id": job_id, "table": table, "start_row": start_row},
     )
-    _update_import_status(job_id, status="in_progress", total_rows=len(rows))
-    errors: list[dict] = []
+    _update_import_status(job_id, total_rows=total_rows)
+    state = {"errors": error_count, "logged_at": time.monotonic()}
+
+    def checkpoint(conn, last_row, chunk_errors, counts):
+        state["errors"] += len(chunk_errors)
+        _record_checkpoint(
+            conn, job_id, run_token, last_row, state["errors"], chunk_errors, counts
+        )
+
+    def progress(processed, chunk_errors):
+        if time.monotonic() - state["logged_at"] < PROGRESS_INTERVAL:
+            return
+        state["logged_at"] = time.monotonic()
+        logger.info(
+            "Job %s table %s processed %s/%s rows",
+            job_id,
+            table,
+            processed,
+            total_rows,
+            extra={
+                "job_id": job_id,
+                "table": table,
+                "processed": processed,
+                "total_rows": total_rows,
+            },
+        )
+
     try:
-        for idx, row in enumerate(rows, start=1):
-            try:
-                if create_record(table, row) is None:
-                    raise sqlite3.DatabaseError("Failed to create")
-            except (sqlite3.DatabaseError, ValueError) as exc:  # noqa: BLE001
-                logger.exception(
-                    "Failed to import row",  # noqa: TRY401
-                    extra={"job_id": job_id, "table": table, "row": idx},
-                )
-                errors.append({"row": idx, "message": str(exc)})
-            if idx % 10 == 0 or idx == len(rows):
-                logger.info(
-                    "Job %s table %s processed %s/%s rows",
-                    job_id,
-                    table,
-                    idx,
-                    len(rows),
-                    extra={
-                        "job_id": job_id,
-                        "table": table,
-                        "processed": idx,
-                        "total_rows": len(rows),
-                    },
-                )
-                _update_import_status(
-                    job_id, imported_rows=idx, errors=json.dumps(errors)
-                )
-        _update_import_status(job_id, status="complete")
+        result = run_import(
+            table,
+            rows,
+            chunk_size=get_import_chunk_size(),
+            progress=progress,
+            collect_errors=False,
+            start_row=start_row,
+            checkpoint=checkpoint,
+            key_fields=key_fields,
+            actor=f"import:{job_id}",
+            link_references=link_references,
+        )
+        with get_connection() as conn:
+            cur = conn.execute(
+                "UPDATE import_status SET status = 'complete' WHERE id = ? AND run_token = ?",
+                (job_id, run_token),
+            )
+            conn.commit()
+        if cur.rowcount == 0:
+            raise ClaimLost(f"Import job {job_id} was claimed by another run")
         # trigger automation rules that run on import
         from automation import engine as automation_engine
         automation_engine.run_import_rules(table)
         logger.info(
-            "Import job %s for table %s complete: %s rows imported, %s errors",
+            "Import job %s for table %s complete: %s inserted, %s updated, %s errors",
             job_id,
             table,
-            len(rows) - len(errors),
-            len(errors),
+            result["inserted"],
+            result["updated"],
+            state["errors"],
             extra={
                 "job_id": job_id,
                 "table": table,
-                "imported": len(rows) - len(errors),
-                "error_count": len(errors),
+                "imported": result["imported"],
+                "inserted": result["inserted"],
+                "updated": result["updated"],
+                "unchanged": result["unchanged"],
+                "links_created": result["links_created"],
+                "error_count": state["errors"],
             },
         )
-        return {"job_id": job_id, "imported": len(rows) - len(errors), "errors": errors}
+        return {
+            "job_id": job_id,
+            "imported": result["imported"],
+            "inserted": result["inserted"],
+            "updated": result["updated"],
+            "unchanged": result["unchanged"],
+            "links_created": result["links_created"],
+            "error_count": state["errors"],
+        }
+    except ClaimLost:
+        # The run holding the job now owns its status and spooled upload.
+        logger.warning(
+            "Import job %s for table %s stopped: claimed by another run",
+            job_id,
+            table,
+            extra={"job_id": job_id, "table": table},
+        )
+        return None
     except sqlite3.DatabaseError:
         logger.exception(
             "Import job %s for table %s failed",
@@ -108,7 +357,7 @@ def _run_import(job_id, table, rows):
             table,
             extra={"job_id": job_id, "table": table},
         )
-        _update_import_status(job_id, status="failed")
+        _fail_import(job_id, run_token)
         raise
     except ValueError:
         logger.exception(
@@ -117,7 +366,7 @@ def _run_import(job_id, table, rows):
             table,
             extra={"job_id": job_id, "table": table},
         )
-        _update_import_status(job_id, status="failed")
+        _fail_import(job_id, run_token)
         raise
     except Exception:
         logger.exception(
@@ -126,27 +375,97 @@ def _run_import(job_id, table, rows):
             table,
             extra={"job_id": job_id, "table": table},
         )
-        _update_import_status(job_id, status="failed")
+        _fail_import(job_id, run_token)
         raise
 
 
 @huey.task()
-def process_import(job_id, table, rows):
-    """Background task to create records from parsed CSV rows."""
-    return _run_import(job_id, table, rows)
+def process_import(job_id, table):
+    """Background task importing the upload referenced by job ``job_id``.
 
+    Only the job id travels through the queue; rows are streamed from the
+    spooled file so neither process holds the whole CSV in memory. A job
+    that already has a checkpoint continues after it. The spooled file is
+    only removed once the job completes, so failed jobs can be resumed.
+    """
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT source, mapping, total_rows, checkpoint_row, error_count, "
+            "key_fields, link_references FROM import_status WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+    if row is None or not row[0]:
+        logger.error(
+            "Import job %s has no source upload",
+            job_id,
+            extra={"job_id": job_id, "table": table},
+        )
+        _update_import_status(job_id, status="failed")
+        return None
+    upload_id, mapping_json, total_rows, start_row, error_count, key_json, link = row
+    rows = iter_upload_rows(upload_id, json.loads(mapping_json or "{}"))
+    result = _run_import(
+        job_id,
+        table,
+        rows,
+        total_rows,
+        start_row or 0,
+        error_count or 0,
+        json.loads(key_json) if key_json else None,
+        bool(link),
+    )
+    if result is not None:
+        remove_upload(upload_id)
+    return result
 
-@huey.task()
-def import_rows(table, rows):
-    """Create a new import job and process the provided rows."""
+
+def resume_import(job_id) -> bool:
+    """Requeue a failed or stale job from its last checkpoint.
+
+    The job is claimed with a conditional update, so a job that is still
+    running (or was already requeued) is left alone. Clearing the run token
+    stops a stale worker that is still alive from committing further chunks.
+    Returns False when the job cannot be resumed.
+    """
     init_import_table()
     with get_connection() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO import_status (status, total_rows, imported_rows, errors) VALUES (?, ?, ?, ?)",
-            ("queued", len(rows), 0, "[]"),
+        row = conn.execute(
+            "SELECT source, table_name FROM import_status WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None or not row[0] or not row[1]:
+            return False
+        upload_id, table = row
+        if get_upload_meta(upload_id) is None:
+            return False
+        cur = conn.execute(
+            "UPDATE import_status SET status = 'queued', heartbeat_at = ?, run_token = NULL "
+            "WHERE id = ? AND (status = 'failed' OR "
+            "(status = 'in_progress' AND (heartbeat_at IS NULL OR heartbeat_at < ?)))",
+            (time.time(), job_id, time.time() - get_import_stale_after()),
         )
-        job_id = cur.lastrowid
         conn.commit()
-    return _run_import(job_id, table, rows)
+    if cur.rowcount != 1:
+        return False
+    logger.info(
+        "Resuming import job %s for table %s",
+        job_id,
+        table,
+        extra={"job_id": job_id, "table": table},
+    )
+    process_import(job_id, table)
+    return True
 
+
+@huey.task()
+def import_rows(table, rows):
+    """Create a new import job and process the provided rows."""
+    upload = spool_rows(rows)
+    job_id = create_import_job(
+        upload["upload_id"], upload["total_rows"], table=table
+    )
+    result = _run_import(
+        job_id, table, iter_upload_rows(upload["upload_id"]), upload["total_rows"]
+    )
+    if result is not None:
+        remove_upload(upload["upload_id"])
+    return result
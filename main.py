@@ -18,6 +18,8 @@ from db.schema import (
     get_title_field,
 )
 from db.config import get_config_rows
+from db.field_values import migrate_field_values
+from db.search import migrate_fts_indexes
 from utils.field_registry import FIELD_TYPES
 import utils.validation  # ensure register_type() runs at startup  # noqa: F401
 
@@ -62,6 +64,8 @@ if not needs_wizard:
     with get_connection() as conn:
         app.config['CARD_INFO'] = load_card_info(conn)
         app.config['BASE_TABLES'] = load_base_tables(conn)
+    migrate_field_values()
+    migrate_fts_indexes()
 else:
     app.config['CARD_INFO'] = []
     app.config['BASE_TABLES'] = []
@@ -1,6 +1,6 @@
-function compileRowsForImport() {
-    // 1) Find all <select data-header> under #imported-fields-container
-    const mapped = Array.from(
+function compileMappedColumns() {
+    // Find all <select data-header> under #imported-fields-container
+    return Array.from(
       document.querySelectorAll('#imported-fields-container select[data-header]')
     )
       // only those where the validation-results sibling contains a .matched-valid span
@@ -13,8 +13,11 @@ function compileRowsForImport() {
         key: sel.dataset.header,  // CSV header
         column: sel.value         // table field
       }));
-  
-    // 2) For each original row (window.importedRows), pick only those mapped columns
+  }
+
+function compileRowsForImport() {
+    const mapped = compileMappedColumns();
+    // For each original row (window.importedRows), pick only those mapped columns
     return window.importedRows.map(row => {
       const out = {};
       mapped.forEach(({ key, column }) => {
@@ -31,45 +34,109 @@ document.addEventListener('DOMContentLoaded', () => {
     const errorsEl = document.getElementById('import-errors');
     if (!importBtn || !statusContainer || !progressEl || !errorsEl) return;
   
+    // Poll a job until it finishes. Failed or stale jobs get a button that
+    // resumes them from their last committed chunk.
+    function pollImport(importId) {
+      const interval = setInterval(() => {
+        fetch(`/import-status?importId=${importId}`)
+          .then(r => r.json())
+          .then(data => {
+            progressEl.value = data.importedRows;
+            if (data.errorCount > 0) {
+              const hidden = data.errorCount - data.errors.length;
+              // Messages echo CSV values, so render them as text, never HTML.
+              errorsEl.replaceChildren(...data.errors
+                .map(e => `Row ${e.row}: ${e.message}`)
+                .concat(hidden > 0 ? [`…and ${hidden} more errors`] : [])
+                .map(text => {
+                  const line = document.createElement('div');
+                  line.textContent = text;
+                  return line;
+                }));
+            }
+            const running = data.status === 'queued' || data.status === 'in_progress';
+            if (running && !data.stale) return;
+            clearInterval(interval);
+            if (data.status === 'complete') {
+              errorsEl.insertAdjacentHTML('afterbegin', '<div class="text-green-600">Import complete!</div>');
+              return;
+            }
+            const label = data.stale ? 'Import stalled.' : 'Import failed.';
+            errorsEl.insertAdjacentHTML(
+              'afterbegin',
+              `<div class="text-red-600">${label} <button type="button" class="underline import-resume">Resume from row ${data.checkpointRow || 0}</button></div>`
+            );
+            errorsEl.querySelector('.import-resume').addEventListener('click', event => {
+              event.target.parentElement.remove();
+              fetch('/import-resume', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ importId })
+              })
+              .then(res => {
+                if (res.ok) pollImport(importId);
+              })
+              .catch(err => console.error('Error resuming import:', err));
+            });
+          });
+      }, 500);
+    }
+
+    const modeEl = document.getElementById('import-mode');
+    const keysEl = document.getElementById('import-keys');
+    if (modeEl && keysEl) {
+      modeEl.addEventListener('change', () => {
+        keysEl.classList.toggle('hidden', modeEl.value !== 'upsert');
+      });
+    }
+
     importBtn.addEventListener('click', event => {
       event.preventDefault();
       const table = importBtn.dataset.table;
       if (!table) return console.error('Import aborted: no table');
   
-      const rows = compileRowsForImport();
+      // Spooled uploads are imported server-side from the file on disk;
+      // only the header -> field mapping is sent.
+      let body;
+      if (window.importUploadId) {
+        const mapping = {};
+        compileMappedColumns().forEach(({ key, column }) => { mapping[key] = column; });
+        body = { table, upload: window.importUploadId, mapping };
+      } else {
+        body = { table, rows: compileRowsForImport() };
+      }
+      const linkEl = document.getElementById('import-link');
+      if (linkEl && linkEl.checked) body.link = true;
+      if (modeEl && modeEl.value === 'upsert') {
+        body.mode = 'upsert';
+        body.keys = Array.from(keysEl.selectedOptions).map(opt => opt.value);
+      }
       statusContainer.classList.remove('hidden');
       importBtn.disabled = true;
   
       fetch('/import-start', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ table, rows })
+        body: JSON.stringify(body)
       })
-      .then(res => res.json())
+      .then(res => res.json().catch(() => ({})).then(data => {
+        if (!res.ok) throw new Error(data.error || `Import could not start (${res.status})`);
+        return data;
+      }))
       .then(({ importId, totalRows }) => {
         importBtn.dataset.importId = importId;
         progressEl.max = totalRows;
-        let interval = setInterval(() => {
-          fetch(`/import-status?importId=${importId}`)
-            .then(r => r.json())
-            .then(data => {
-              progressEl.value = data.importedRows;
-              if (data.errorCount > 0) {
-                errorsEl.innerHTML = data.errors
-                  .map(e => `Row ${e.row}: ${e.message}`)
-                  .join('<br>');
-              }
-              if (data.status !== 'in_progress') {
-                clearInterval(interval);
-                const msg = data.status === 'complete'
-                  ? '<div class="text-green-600">Import complete!</div>'
-                  : '<div class="text-red-600">Import failed.</div>';
-                errorsEl.insertAdjacentHTML('afterbegin', msg);
-              }
-            });
-        }, 500);
+        pollImport(importId);
       })
-      .catch(err => console.error('Error starting import:', err));
+      .catch(err => {
+        console.error('Error starting import:', err);
+        // The error can echo submitted field names, so render it as text.
+        const line = document.createElement('div');
+        line.className = 'text-red-600';
+        line.textContent = err.message;
+        errorsEl.replaceChildren(line);
+        importBtn.disabled = false;
+      });
     });
   });
   
\ No newline at end of file
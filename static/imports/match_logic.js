@@ -88,11 +88,11 @@ document.addEventListener("change", event => {
     matchedFields[header] = { table, field: selectedField };
     updateMatchedDisplay(header, selectedField);
   
-    // Send full mapping + CSV rows to server for validation
+    // Send full mapping to server; it validates the spooled upload when present
     fetch("/trigger-validation", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ matchedFields, rows: window.importedRows })
+      body: JSON.stringify({ matchedFields, rows: window.importedRows, upload: window.importUploadId })
     })
       .then(res => {
         if (!res.ok) throw new Error(`Validation failed: ${res.status}`);
@@ -118,7 +118,10 @@ document.addEventListener("change", event => {
             `<span data-popup-key="${respHeader}" class="text-green-600 valid-popup">✅ ${results.valid} valid</span>` +
             `<span data-popup-key="${respHeader}" class="text-yellow-600 warning-popup">⚠️ ${results.warning ?? 0} warnings</span>` +
             `<span data-popup-key="${respHeader}" class="text-red-600 invalid-popup">❌ ${results.invalid} invalid</span>` +
-            `<span data-popup-key="${respHeader}" class="blank-popup">⬛ ${results.blank} blank</span>`;
+            `<span data-popup-key="${respHeader}" class="blank-popup">⬛ ${results.blank} blank</span>` +
+            (results.total_rows > results.checked_rows
+              ? `<span class="text-gray-500">(first ${results.checked_rows} of ${results.total_rows} rows)</span>`
+              : '');
   
           // Insert into DOM, placing before select-wrapper if present
           const flexRow = container.querySelector('.flex.justify-between');
@@ -49,9 +49,16 @@ document.addEventListener('DOMContentLoaded', () => {
           .then(data => {
             progressEl.value = data.importedRows;
             if (data.errorCount > 0) {
-              errorsEl.innerHTML = data.errors
+              const hidden = data.errorCount - data.errors.length;
+              // Messages echo CSV values, so render them as text, never HTML.
+              errorsEl.replaceChildren(...data.errors
                 .map(e => `Row ${e.row}: ${e.message}`)
-                .join('<br>');
+                .concat(hidden > 0 ? [`…and ${hidden} more errors`] : [])
+                .map(text => {
+                  const line = document.createElement('div');
+                  line.textContent = text;
+                  return line;
+                }));
             }
             if (data.status !== 'in_progress') {
               clearInterval(interval);
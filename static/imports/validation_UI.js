@@ -1,12 +1,19 @@
 // static/imports/validation_UI.js
 
+// CSV headers, values and messages built from them are untrusted text
+function escapeHtml(value) {
+    const el = document.createElement('span');
+    el.textContent = value ?? '';
+    return el.innerHTML;
+  }
+
 // Show the validation modal in the centered overlay
 function showValidationPopup(header, htmlContent) {
     const overlay = document.getElementById('validationOverlay');
     const popup   = document.getElementById('validation-popup');
     if (!popup || !overlay) return;
   
-    popup.innerHTML = `<strong>${header}:</strong> ${htmlContent}`;
+    popup.innerHTML = `<strong>${escapeHtml(header)}:</strong> ${htmlContent}`;
     overlay.classList.remove('hidden');
   }
   // Event listener for popups
@@ -38,7 +45,7 @@ function showValidationPopup(header, htmlContent) {
       let content;
       if (warnings.length) {
         const items = warnings
-          .map(w => `<li>Row ${w.row}${w.message ? `: ${w.message}` : ''}${w.reason ? ` (${w.reason})` : ''}</li>`)
+          .map(w => `<li>Row ${w.row}${w.message ? `: ${escapeHtml(w.message)}` : ''}${w.reason ? ` (${escapeHtml(w.reason)})` : ''}</li>`)
           .join('');
         content = `<p><strong>Warnings:</strong></p><ul>${items}</ul>`;
       } else {
@@ -76,7 +83,7 @@ function showValidationPopup(header, htmlContent) {
         const items = invalidRows
           .map(w =>
             typeof w === 'object'
-              ? `<li>Row ${w.row}: ${w.reason}${w.value ? ` (value: ${w.value})` : ''}</li>`
+              ? `<li>Row ${w.row}: ${escapeHtml(w.reason)}${w.value ? ` (value: ${escapeHtml(w.value)})` : ''}</li>`
               : `<li>Row ${w}</li>`
           )
           .join('');
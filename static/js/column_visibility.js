@@ -38,13 +38,34 @@ document.addEventListener("DOMContentLoaded", () => {
 
     dropdown.addEventListener("click", (e) => e.stopPropagation());
   }
+  // Keep the visible columns in the URL so the server only fetches those.
+  const syncColumnsParam = () => {
+    const all = checkboxes();
+    const selected = getSelectedFields();
+    const params = new URLSearchParams(window.location.search);
+    if (selected.length === all.length) {
+      params.delete("columns");
+    } else {
+      params.set("columns", selected.join(","));
+    }
+    history.replaceState({}, "", "?" + params.toString());
+  };
+
   // Attach listeners
   checkboxes().forEach(cb =>
     cb.addEventListener("change", () => {
+      syncColumnsParam();
       updateVisibility();
+      // A newly shown column was not fetched yet; reload the rows.
+      if (cb.checked) {
+        document.dispatchEvent(new CustomEvent("records:refresh"));
+      }
     })
   );
 
+  // Re-apply to rows fetched after a filter or column change
+  document.addEventListener("records:loaded", updateVisibility);
+
   // Initial update
   updateVisibility();
 });
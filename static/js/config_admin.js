@@ -69,6 +69,29 @@ document.addEventListener('DOMContentLoaded', () => {
       }
     });
   });
+  document.querySelectorAll('input.search-index-checkbox').forEach(cb => {
+    cb.addEventListener('change', async (e) => {
+      const el = e.currentTarget;
+      const table = el.dataset.table;
+      el.disabled = true;
+      try {
+        const resp = await fetch(`/admin/fields/${encodeURIComponent(table)}/search-index`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ enabled: el.checked })
+        });
+        const data = await resp.json().catch(() => ({}));
+        if (!resp.ok || !data.success) throw new Error(data.error || 'update_failed');
+      } catch (err) {
+        console.error('[fields_admin] search index update failed', err);
+        // revert UI
+        el.checked = !el.checked;
+        alert('Failed to update search index');
+      } finally {
+        el.disabled = false;
+      }
+    });
+  });
   // Change type popover handlers
   (function initChangeTypePopovers(){
     let fieldTypes = null;
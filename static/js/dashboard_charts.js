@@ -1,5 +1,7 @@
 // Dashboard chart rendering
 
+import { takeWidgetData } from './dashboard_data.js';
+
 document.addEventListener('DOMContentLoaded', () => {
   const FLOWBITE_COLORS = [
     '#0D9488', // teal
@@ -37,6 +39,20 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     const { chart_type: type = 'bar', x_field, y_field, aggregation, field, orientation } = cfg;
+    // Optional top-N limit and date bucketing are applied server-side.
+    const distributionUrl = (table, fld) => {
+      const params = new URLSearchParams({ field: fld });
+      if (cfg.limit !== undefined) params.set('limit', cfg.limit);
+      if (cfg.bucket) params.set('bucket', cfg.bucket);
+      return `/${table}/field-distribution?${params.toString()}`;
+    };
+    const preloaded = await takeWidgetData(widget);
+    // Distribution data, preloaded in the page's batch request when available.
+    const loadDistribution = async (table, fld) => {
+      if (preloaded && preloaded.distribution) return preloaded.distribution;
+      const res = await fetch(distributionUrl(table, fld));
+      return res.json();
+    };
     const hideLegend = widget._styling && widget._styling.hideLegend;
     const canvas = widget.querySelector('canvas') || document.createElement('canvas');
     if (!canvas.parentElement) widget.appendChild(canvas);
@@ -50,8 +66,7 @@ document.addEventListener('DOMContentLoaded', () => {
       if (!x_field) return;
       const [table, fieldName] = x_field.split(':');
       try {
-        const res = await fetch(`/${table}/field-distribution?field=${encodeURIComponent(fieldName)}`);
-        const data = await res.json();
+        const data = await loadDistribution(table, fieldName);
         const labels = Object.keys(data);
         const values = Object.values(data);
         const colors = labels.map((_, i) => `hsl(${(i * 40) % 360},70%,60%)`);
@@ -72,8 +87,7 @@ document.addEventListener('DOMContentLoaded', () => {
     if (type === 'bar' && field) {
       const [table, fld] = field.split(':');
       try {
-        const res = await fetch(`/${table}/field-distribution?field=${encodeURIComponent(fld)}`);
-        const data = await res.json();
+        const data = await loadDistribution(table, fld);
         const labels = Object.keys(data);
         const values = Object.values(data);
         const colors = labels.map((_, i) => FLOWBITE_COLORS[i % FLOWBITE_COLORS.length]);
@@ -94,8 +108,7 @@ document.addEventListener('DOMContentLoaded', () => {
     if (type === 'line' && field) {
       const [table, fld] = field.split(':');
       try {
-        const res = await fetch(`/${table}/field-distribution?field=${encodeURIComponent(fld)}`);
-        const data = await res.json();
+        const data = await loadDistribution(table, fld);
         const labels = Object.keys(data);
         const values = Object.values(data);
         chartInstance = new Chart(canvas, {
@@ -124,7 +137,9 @@ document.addEventListener('DOMContentLoaded', () => {
         .catch(() => 0);
     };
 
-    const values = await Promise.all([fetchVal(x_field), fetchVal(y_field)]);
+    const values = preloaded && preloaded.values
+      ? preloaded.values
+      : await Promise.all([fetchVal(x_field), fetchVal(y_field)]);
     const labels = [x_field.split(':')[1], y_field.split(':')[1]];
 
     chartInstance = new Chart(canvas, {
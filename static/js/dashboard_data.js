@@ -0,0 +1,33 @@
+// Batched initial data for dashboard value and chart widgets
+
+let batch = null;
+
+function loadBatch() {
+  if (batch) return batch;
+  const ids = Array.from(
+    document.querySelectorAll('[data-type="value"], [data-type="chart"]')
+  ).map(w => w.dataset.widget).filter(Boolean);
+  if (!ids.length) {
+    batch = Promise.resolve({});
+    return batch;
+  }
+  batch = fetch(`/dashboard/data?ids=${ids.join(',')}`)
+    .then(res => (res.ok ? res.json() : { widgets: {} }))
+    .then(data => data.widgets || {})
+    .catch(err => {
+      console.error('[dashboard_data] batch fetch error', err);
+      return {};
+    });
+  return batch;
+}
+
+// Resolve the preloaded data for a widget once; later calls (e.g. after the
+// widget config changes) resolve to null so callers fetch fresh data.
+export async function takeWidgetData(widget) {
+  const id = widget && widget.dataset.widget;
+  if (!id) return null;
+  const widgets = await loadBatch();
+  const data = widgets[id] || null;
+  delete widgets[id];
+  return data;
+}
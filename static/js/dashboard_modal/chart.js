@@ -214,6 +214,8 @@ export async function createChartWidget() {
       aggregation: chartAgg
     };
   }
+  const materializedEl = document.getElementById('chartMaterialized');
+  if (materializedEl && materializedEl.checked) payloadContent.materialized = true;
   const title = (chartTitleInputEl && chartTitleInputEl.value.trim()) || 'Chart Widget';
   const payload = {
     title,
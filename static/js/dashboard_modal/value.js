@@ -411,6 +411,9 @@ export async function createValueWidget() {
     payloadContent = { operation: selectedOperation, table, field };
   }
 
+  const materializedEl = document.getElementById('valueMaterialized');
+  if (materializedEl && materializedEl.checked) payloadContent.materialized = true;
+
   const title = (titleInputEl && titleInputEl.value.trim()) || defaultTitle;
   const payload = {
     title,
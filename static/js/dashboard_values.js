@@ -1,5 +1,7 @@
 // Dashboard value widget rendering
 
+import { takeWidgetData } from './dashboard_data.js';
+
 document.addEventListener('DOMContentLoaded', () => {
   const valueWidgets = document.querySelectorAll('[data-type="value"]');
   valueWidgets.forEach(async widget => {
@@ -29,6 +31,12 @@ document.addEventListener('DOMContentLoaded', () => {
       }
     }
 
+    const preloaded = await takeWidgetData(widget);
+    if (preloaded && preloaded.value !== undefined) {
+      resultEl.textContent = preloaded.value;
+      return;
+    }
+
     if (cfg.operation === 'sum' || cfg.operation === 'count') {
       const { table, field } = cfg;
       resultEl.textContent = '...';
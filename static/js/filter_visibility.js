@@ -28,6 +28,7 @@ document.addEventListener("DOMContentLoaded", () => {
         .then(r => r.json())
         .then(data => {
           tbody.innerHTML = data.rows_html;
+          document.dispatchEvent(new CustomEvent("records:loaded"));
           pagerWrap.innerHTML = data.pagination_html;
           const cnt = document.getElementById("record-count");
           if (cnt) cnt.outerHTML = data.count_html;
@@ -221,6 +222,11 @@ document.addEventListener("DOMContentLoaded", () => {
       updateState(params);
     });
   
+    // Refetch rows when another script changes the query (e.g. columns)
+    document.addEventListener("records:refresh", () => {
+      fetchRecords(new URLSearchParams(window.location.search));
+    });
+
     // Rebuild dropdown whenever column visibility changes
     document.querySelectorAll(".column-toggle").forEach(cb => {
       cb.addEventListener("change", () => setTimeout(populateFilterDropdown, 0));
@@ -13,3 +13,49 @@ def client():
     app.config['TESTING'] = True
     with app.test_client() as client:
         yield client
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    """Spool uploads into a per-test directory instead of data/imports."""
+    path = tmp_path / 'imports'
+    monkeypatch.setattr('imports.import_csv.UPLOAD_DIR', str(path))
+    return path
+
+
+@pytest.fixture
+def scratch_table():
+    """A throwaway base table with known rows, independent of the fixture data.
+
+    ``metric`` has ``title`` (text), ``amount`` (number) and ``kind``
+    (select) columns; amounts are 1..10 and kinds cycle through a, b, c.
+    """
+    import sqlite3
+    from db.database import DB_PATH, get_connection
+    from db.edit_fields import add_column_to_table, add_field_to_schema
+    from db.schema import bump_schema_generation, create_base_table
+
+    name = 'scratch_metric'
+    assert create_base_table(name, 'Scratch', 'title')
+    try:
+        add_column_to_table(name, 'amount', 'number')
+        add_field_to_schema(name, 'amount', 'number')
+        add_column_to_table(name, 'kind', 'select')
+        add_field_to_schema(name, 'kind', 'select', ['a', 'b', 'c'])
+        with get_connection() as conn:
+            conn.executemany(
+                f'INSERT INTO {name} (title, amount, kind) VALUES (?, ?, ?)',
+                [(f'Row {i}', i, 'abc'[i % 3]) for i in range(1, 11)],
+            )
+            conn.commit()
+        yield name
+    finally:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute(f'DROP TABLE IF EXISTS {name}')
+            for side in ('config_base_tables', 'field_schema', 'field_aggregates',
+                         'field_value_counts', 'table_stats'):
+                try:
+                    conn.execute(f'DELETE FROM {side} WHERE table_name = ?', (name,))
+                except sqlite3.OperationalError:
+                    pass
+        bump_schema_generation()
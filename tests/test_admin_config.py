@@ -101,3 +101,22 @@ def test_db_create_updates_path_and_allows_table_creation(client):
     update_config('db_path', 'data/crossbook.db')
     with app.app_context():
         reload_app_state()
+
+
+def test_fields_admin_search_index_toggle(client):
+    import re
+
+    def toggle_checked():
+        html = client.get('/admin/fields').get_data(as_text=True)
+        tag = re.search(r'<input[^>]*search-index-checkbox[^>]*data-table="location"[^>]*>', html)
+        assert tag is not None
+        return 'checked' in tag.group(0)
+
+    assert toggle_checked() is False
+    try:
+        resp = client.post('/admin/fields/location/search-index', json={'enabled': True})
+        assert resp.get_json() == {'success': True, 'enabled': True}
+        assert toggle_checked() is True
+    finally:
+        client.post('/admin/fields/location/search-index', json={'enabled': False})
+    assert toggle_checked() is False
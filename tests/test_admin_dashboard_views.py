@@ -215,3 +215,68 @@ def test_dashboard_delete_widget(client):
     assert del_resp.get_json()['success']
     widgets = get_dashboard_widgets()
     assert all(w['id'] != wid for w in widgets)
+
+
+def test_dashboard_data_batches_widgets(client, scratch_table):
+    widgets = {
+        'Total': ('value', {'operation': 'sum', 'table': scratch_table, 'field': 'amount'}),
+        'Avg': ('value', {'operation': 'math', 'math_operation': 'average',
+                          'field1': f'{scratch_table}:amount'}),
+        'Kinds': ('chart', {'chart_type': 'pie', 'x_field': f'{scratch_table}:kind', 'limit': 2}),
+    }
+    ids = {}
+    for title, (widget_type, cfg) in widgets.items():
+        resp = client.post('/dashboard/widget', json={
+            'title': title, 'widget_type': widget_type, 'content': json.dumps(cfg),
+            'col_start': 1, 'col_span': 1, 'row_span': 1,
+        })
+        ids[title] = resp.get_json()['id']
+    try:
+        resp = client.get('/dashboard/data', query_string={
+            'ids': ','.join(str(i) for i in ids.values()),
+        })
+        assert resp.status_code == 200
+        data = resp.get_json()['widgets']
+        assert data[str(ids['Total'])]['value'] == 55
+        assert data[str(ids['Avg'])]['value'] == 5.5
+        dist = data[str(ids['Kinds'])]['distribution']
+        assert dist == {'a': 3, 'b': 4, 'Other': 3}
+        assert client.get('/dashboard/data?ids=x').status_code == 400
+    finally:
+        for wid in ids.values():
+            client.post(f'/dashboard/widget/{wid}/delete')
+
+
+def test_materialized_widgets_install_and_drop_triggers(client, scratch_table):
+    from db.aggregates import live_fields
+
+    widgets = {
+        'Total': ('value', {'operation': 'sum', 'table': scratch_table, 'field': 'amount',
+                            'materialized': True}),
+        'Kinds': ('chart', {'chart_type': 'pie', 'x_field': f'{scratch_table}:kind', 'limit': 2,
+                            'materialized': True}),
+    }
+    assert live_fields(scratch_table) == set()
+    ids = {}
+    try:
+        for title, (widget_type, cfg) in widgets.items():
+            resp = client.post('/dashboard/widget', json={
+                'title': title, 'widget_type': widget_type, 'content': json.dumps(cfg),
+                'col_start': 1, 'col_span': 1, 'row_span': 1,
+            })
+            ids[title] = resp.get_json()['id']
+        assert live_fields(scratch_table) == {'amount', 'kind'}
+
+        resp = client.get('/dashboard/data', query_string={
+            'ids': ','.join(str(i) for i in ids.values()),
+        })
+        data = resp.get_json()['widgets']
+        assert data[str(ids['Total'])]['value'] == 55
+        assert data[str(ids['Kinds'])]['distribution'] == {'a': 3, 'b': 4, 'Other': 3}
+
+        client.post(f"/dashboard/widget/{ids.pop('Kinds')}/delete")
+        assert live_fields(scratch_table) == {'amount'}
+    finally:
+        for wid in ids.values():
+            client.post(f'/dashboard/widget/{wid}/delete')
+    assert live_fields(scratch_table) == set()
@@ -129,3 +129,103 @@ def test_url_field_add_update_and_bulk():
     drop_column_from_table('character', 'website')
     remove_field_from_schema('character', 'website')
 
+
+
+def _walk_cursor_pages(query):
+    seen = []
+    cursor = ''
+    while True:
+        resp = client.get('/api/content/records', query_string=query + [('cursor', cursor)])
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert data['total_count'] is None
+        seen.extend(r['id'] for r in data['records'])
+        cursor = data['next_cursor']
+        if not cursor:
+            return seen
+
+
+def test_cursor_pagination_matches_offset_order():
+    # Walk a small dedicated set of rows (with sort-key ties and NULLs) so
+    # the test does not depend on how many rows the database holds.
+    tags = ['Durza', 'Shade', None, 'Durza']
+    with sqlite3.connect(DB_PATH) as conn:
+        seeded = [
+            conn.execute(
+                'INSERT INTO content (chapter, tags, character) VALUES (?, ?, ?)',
+                (f'Cursorwalk {i}', tags[i % len(tags)], None if i % 3 == 0 else f'Char{i % 2}'),
+            ).lastrowid
+            for i in range(11)
+        ]
+    try:
+        for query in ([], [('sort', 'tags'), ('dir', 'desc')], [('sort', 'character')]):
+            query = query + [('chapter', 'Cursorwalk')]
+            full = client.get(
+                '/api/content/records', query_string=query + [('per_page', 100)]
+            ).get_json()
+            expected = [r['id'] for r in full['records']]
+            assert sorted(expected) == seeded
+            assert _walk_cursor_pages(query + [('per_page', 3)]) == expected
+    finally:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("DELETE FROM content WHERE chapter LIKE 'Cursorwalk %'")
+
+
+def test_cursor_rejected_for_other_sort():
+    data = client.get('/api/content/records', query_string={'cursor': '', 'per_page': 2}).get_json()
+    token = data['next_cursor']
+    assert token
+    resp = client.get('/api/content/records', query_string={'cursor': token, 'sort': 'chapter'})
+    assert resp.status_code == 400
+    resp = client.get('/api/content/records', query_string={'cursor': 'not-a-cursor'})
+    assert resp.status_code == 400
+
+
+def test_records_api_column_projection_and_textarea_truncation():
+    from db.records import create_record, delete_record
+
+    body = '<p>' + 'lorem ipsum ' * 200 + '</p>'
+    rec_id = create_record('location', {'location': 'Zq-projection', 'description': body})
+    try:
+        query = {'location': 'Zq-projection', 'columns': 'location'}
+        data = client.get('/api/location/records', query_string=query).get_json()
+        assert [set(r) for r in data['records']] == [{'id', 'location'}]
+        assert data['visible_columns'] == ['location']
+
+        query = {'location': 'Zq-projection'}
+        rec = client.get('/api/location/records', query_string=query).get_json()['records'][0]
+        assert 0 < len(rec['description']) <= 500
+
+        query['full_text'] = '1'
+        rec = client.get('/api/location/records', query_string=query).get_json()['records'][0]
+        assert len(rec['description']) > 500
+    finally:
+        delete_record('location', rec_id)
+
+
+def test_export_streams_csv_ndjson_and_gzip():
+    import csv
+    import gzip
+    import io
+    import json
+
+    from db.records import iter_records
+
+    with sqlite3.connect(DB_PATH) as conn:
+        total = conn.execute('SELECT COUNT(*) FROM content').fetchone()[0]
+
+    resp = client.get('/content/export')
+    assert resp.status_code == 200
+    rows = list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+    assert rows[0][0] == 'id' and len(rows) == total + 1
+
+    resp = client.get('/content/export', query_string={'format': 'ndjson', 'gzip': '1'})
+    assert resp.mimetype == 'application/gzip'
+    lines = gzip.decompress(resp.get_data()).decode().splitlines()
+    assert len(lines) == total
+    assert set(json.loads(lines[0])) >= {'id', 'content'}
+
+    assert client.get('/content/export', query_string={'format': 'xml'}).status_code == 400
+    batches = list(iter_records('content', batch_size=50))
+    assert [len(b) for b in batches[:-1]] == [50] * (len(batches) - 1)
+    assert sum(len(b) for b in batches) == total
@@ -3,6 +3,7 @@ import sys
 import sqlite3
 import json
 import pytest
+from unittest.mock import patch
 
 sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -10,6 +11,9 @@ sys.path.insert(
 
 from db.database import init_db_path
 from db.dashboard import (
+    cached_sum_field,
+    clear_result_cache,
+    get_result_cache_stats,
     sum_field,
     create_widget,
     update_widget_layout,
@@ -32,6 +36,38 @@ def test_sum_field_returns_correct_sum():
     assert sum_field("content", "linenumber") == expected
 
 
+def test_cached_sum_field_invalidated_by_writes():
+    clear_result_cache()
+    expected = fetch_value("SELECT SUM(linenumber) FROM content")
+    before = get_result_cache_stats()
+    assert cached_sum_field("content", "linenumber") == expected
+    assert cached_sum_field("content", "linenumber") == expected
+    stats = get_result_cache_stats()
+    assert stats["hits"] == before["hits"] + 1
+    assert stats["misses"] == before["misses"] + 1
+
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("UPDATE content SET linenumber = linenumber + 1 WHERE id = 1")
+    try:
+        assert cached_sum_field("content", "linenumber") == expected + 1
+        assert get_result_cache_stats()["misses"] == before["misses"] + 2
+    finally:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("UPDATE content SET linenumber = linenumber - 1 WHERE id = 1")
+
+
+def test_cached_sum_field_does_not_cache_errors():
+    clear_result_cache()
+    expected = fetch_value("SELECT SUM(linenumber) FROM content")
+    with patch(
+        "db.dashboard._sum_field_query",
+        side_effect=sqlite3.OperationalError("database is locked"),
+    ):
+        assert cached_sum_field("content", "linenumber") == 0
+    assert get_result_cache_stats()["size"] == 0
+    assert cached_sum_field("content", "linenumber") == expected
+
+
 def test_sum_field_raises_for_non_numeric():
     with pytest.raises(ValueError):
         sum_field("content", "content")  # 'content' field is not numeric
@@ -106,3 +142,63 @@ def test_update_widget_styling_valid_and_invalid():
     with sqlite3.connect(DB_PATH) as conn:
         conn.execute("DELETE FROM dashboard_widget WHERE id=?", (wid,))
         conn.commit()
+
+
+def test_materialized_aggregates_follow_writes():
+    from db.aggregates import (
+        disable_materialized,
+        enable_materialized,
+        get_materialized,
+        materialized_value_counts,
+    )
+
+    def exact():
+        return fetch_value("SELECT json_array(COUNT(linenumber), SUM(linenumber)) FROM content")
+
+    def race_counts():
+        with sqlite3.connect(DB_PATH) as conn:
+            return dict(conn.execute(
+                "SELECT race, COUNT(*) FROM character WHERE race <> '' GROUP BY race"
+            ).fetchall())
+
+    assert get_materialized("content", "linenumber") is None
+    assert materialized_value_counts("character", "race") is None
+    try:
+        assert enable_materialized("content", "linenumber") is True
+        assert enable_materialized("character", "race") is True
+        agg = get_materialized("content", "linenumber")
+        assert [agg["nonnull_count"], agg["sum"]] == json.loads(exact())
+        assert dict(materialized_value_counts("character", "race")) == race_counts()
+
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("INSERT INTO content (content, linenumber) VALUES ('x', 500)")
+            conn.execute("UPDATE content SET linenumber = NULL WHERE linenumber = 1")
+            conn.execute("DELETE FROM content WHERE linenumber = 500")
+            conn.execute("UPDATE character SET race = 'Dwarf' WHERE id = 1")
+        agg = get_materialized("content", "linenumber")
+        assert [agg["nonnull_count"], agg["sum"]] == json.loads(exact())
+        assert dict(materialized_value_counts("character", "race")) == race_counts()
+    finally:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("UPDATE content SET linenumber = 1 WHERE id = 1")
+            conn.execute("UPDATE character SET race = 'Human' WHERE id = 1")
+        disable_materialized("content", "linenumber")
+        disable_materialized("character", "race")
+    assert get_materialized("content", "linenumber") is None
+
+
+def test_materialized_triggers_follow_field_type_change(scratch_table):
+    from db.aggregates import enable_materialized, materialized_value_counts
+    from db.edit_fields import change_field_type
+
+    assert enable_materialized(scratch_table, "kind") is True
+    assert dict(materialized_value_counts(scratch_table, "kind")) == {"a": 3, "b": 4, "c": 3}
+
+    change_field_type(scratch_table, "kind", "text")
+    assert materialized_value_counts(scratch_table, "kind") == []
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(f"INSERT INTO {scratch_table} (title, kind) VALUES ('new', 'a')")
+    assert materialized_value_counts(scratch_table, "kind") == []
+
+    change_field_type(scratch_table, "kind", "select")
+    assert dict(materialized_value_counts(scratch_table, "kind")) == {"a": 4, "b": 4, "c": 3}
@@ -20,3 +20,78 @@ def test_check_db_status_valid_missing_corrupted():
     finally:
         os.remove(corrupt_path)
 
+
+
+def test_get_connection_reuses_pooled_connection():
+    from db import database
+
+    database.init_db_path(DB_PATH)
+    database.reset_connection_pool()
+    before = database.get_pool_stats()
+    with database.get_connection() as first:
+        with database.get_connection() as nested:
+            assert nested is first
+    with database.get_connection() as again:
+        assert again is first
+        mode = again.execute('PRAGMA journal_mode').fetchone()[0]
+    assert mode.lower() == database.DEFAULT_PRAGMAS['journal_mode'].lower()
+    after = database.get_pool_stats()
+    assert after['misses'] == before['misses'] + 1
+    assert after['hits'] == before['hits'] + 2
+
+
+def test_get_connection_rolls_back_uncommitted_work():
+    from db import database
+
+    database.init_db_path(DB_PATH)
+    with database.get_connection() as conn:
+        conn.execute("UPDATE config SET value = value WHERE key = 'heading'")
+        assert conn.in_transaction
+    with database.get_connection() as conn:
+        assert not conn.in_transaction
+
+
+def test_reset_connection_pool_opens_new_connection():
+    from db import database
+
+    database.init_db_path(DB_PATH)
+    with database.get_connection() as first:
+        pass
+    database.reset_connection_pool()
+    with database.get_connection() as second:
+        assert second is not first
+
+
+def test_transaction_commits_once_and_rolls_back_on_error():
+    import sqlite3
+    import pytest
+    from db import database
+
+    database.init_db_path(DB_PATH)
+    key = 'uow_test_key'
+
+    def stored():
+        with sqlite3.connect(DB_PATH) as other:
+            row = other.execute('SELECT value FROM config WHERE key=?', (key,)).fetchone()
+            return row[0] if row else None
+
+    with database.transaction() as conn:
+        assert database.in_transaction()
+        with database.transaction() as inner:
+            assert inner is conn
+            inner.execute('INSERT INTO config (key, value) VALUES (?, ?)', (key, 'a'))
+            database.commit(inner)
+        # Nested commit is deferred to the outermost block.
+        assert stored() is None
+    assert not database.in_transaction()
+    assert stored() == 'a'
+
+    with pytest.raises(RuntimeError):
+        with database.transaction() as conn:
+            conn.execute('UPDATE config SET value=? WHERE key=?', ('b', key))
+            raise RuntimeError('boom')
+    assert stored() == 'a'
+
+    with database.get_connection() as conn:
+        conn.execute('DELETE FROM config WHERE key=?', (key,))
+        conn.commit()
@@ -64,3 +64,244 @@ def test_add_and_drop_column():
     drop_column_from_table('character', col)
     remove_field_from_schema('character', col)
     assert col not in column_names('character')
+
+
+def test_table_meta_matches_columns_and_tracks_schema_changes():
+    from db.catalog import get_table_meta
+
+    meta = get_table_meta('character')
+    assert list(meta.columns) == column_names('character')
+    assert meta.label_field == 'character'
+    assert meta.has_last_edited and meta.has_date_created
+    assert 'character' in meta.searchable_fields
+    assert get_table_meta('character') is meta
+
+    col = 'temp_metacol'
+    if col in column_names('character'):
+        drop_column_from_table('character', col)
+        remove_field_from_schema('character', col)
+    add_column_to_table('character', col, 'text')
+    add_field_to_schema('character', col, 'text')
+    try:
+        refreshed = get_table_meta('character')
+        assert refreshed is not meta
+        assert col in refreshed.column_set
+        assert col in refreshed.searchable_fields
+    finally:
+        drop_column_from_table('character', col)
+        remove_field_from_schema('character', col)
+    assert col not in get_table_meta('character').column_set
+
+
+def test_bulk_update_field_values_logs_real_old_values():
+    from db.records import bulk_update_field_values
+
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute('SELECT id, race FROM character ORDER BY id LIMIT 3').fetchall()
+        max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM edit_history').fetchone()[0]
+    ids = [r[0] for r in rows]
+
+    updated = bulk_update_field_values('character', ids + [999999], 'race', 'Urgal', actor='bulk')
+    assert updated == len(ids)
+
+    with sqlite3.connect(DB_PATH) as conn:
+        values = conn.execute(
+            f"SELECT race FROM character WHERE id IN ({', '.join('?' for _ in ids)})", ids
+        ).fetchall()
+        history = conn.execute(
+            'SELECT record_id, old_value, new_value, actor FROM edit_history WHERE id > ? ORDER BY id',
+            (max_id,),
+        ).fetchall()
+        for rid, race in rows:
+            conn.execute('UPDATE character SET race = ? WHERE id = ?', (race, rid))
+        conn.execute('DELETE FROM edit_history WHERE id > ?', (max_id,))
+        conn.commit()
+
+    assert {v[0] for v in values} == {'Urgal'}
+    assert sorted(history) == sorted((rid, race, 'Urgal', 'bulk') for rid, race in rows)
+
+
+def test_fts_index_search_ranking_and_sync():
+    from db.records import count_records, get_all_records, update_field_value
+    from db.search import create_fts_index, drop_fts_index
+    from db.catalog import get_table_meta
+
+    assert create_fts_index('location')
+    rec_id = create_record(
+        'location',
+        {'location': 'Zyxwharf', 'description': '<p>Old <b>quixotic</b> harbour &amp; pier</p>'},
+    )
+    col = 'temp_ftscol'
+    try:
+        assert get_table_meta('location').fts_columns
+        rows = get_all_records('location', search='quixot')
+        assert [r['id'] for r in rows] == [rec_id]
+        assert '<mark>quixotic</mark>' in str(rows[0]['_snippets']['description'])
+        assert count_records('location', search='quixotic harbour') == 1
+        # Tag names and entities from the textarea HTML are not indexed.
+        assert count_records('location', search='Zyxwharf b') == 0
+        assert count_records('location', search='Zyxwharf amp') == 0
+        assert count_records('location', search='Zyxwharf pier') == 1
+        snippet = str(rows[0]['_snippets']['description'])
+        assert '&lt;' not in snippet and '<b>' not in snippet
+
+        update_field_value('location', rec_id, 'description', 'calm bay')
+        assert count_records('location', search='quixotic') == 0
+        assert count_records('location', search='calm') == 1
+
+        # Recreating the table for a dropped column must keep the index in sync.
+        add_column_to_table('location', col, 'text')
+        add_field_to_schema('location', col, 'text')
+        assert col in get_table_meta('location').fts_columns
+        drop_column_from_table('location', col)
+        remove_field_from_schema('location', col)
+        assert col not in get_table_meta('location').fts_columns
+        update_field_value('location', rec_id, 'description', 'stormy cove')
+        assert count_records('location', search='stormy') == 1
+    finally:
+        delete_record('location', rec_id)
+        assert count_records('location', search='stormy') == 0
+        if col in column_names('location'):
+            drop_column_from_table('location', col)
+            remove_field_from_schema('location', col)
+        assert drop_fts_index('location')
+    assert get_table_meta('location').fts_columns is None
+
+
+def test_count_cache_and_row_counters_track_writes():
+    from db.records import count_records, estimate_count
+    from db.table_stats import get_row_count
+
+    with sqlite3.connect(DB_PATH) as conn:
+        total = conn.execute('SELECT COUNT(*) FROM location').fetchone()[0]
+    assert get_row_count('location') == total
+    assert count_records('location') == total
+
+    filters = {'location': ['Zq-cache']}
+    assert count_records('location', filters=filters) == 0
+    rec_id = create_record('location', {'location': 'Zq-cache'})
+    try:
+        assert count_records('location') == total + 1
+        assert count_records('location', filters=filters) == 1
+        # Raw SQL writes are seen too, since the counters are trigger-maintained.
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("UPDATE location SET location = 'Zq-other' WHERE id = ?", (rec_id,))
+        assert count_records('location', filters=filters) == 0
+        # A sample covering the whole table scales back to the exact count.
+        estimate = estimate_count(
+            'location', filters={'location': ['Zq-other']}, threshold=0, sample_size=100000
+        )
+        assert estimate == (1, True)
+    finally:
+        delete_record('location', rec_id)
+    assert get_row_count('location') == total
+
+
+def test_multi_select_value_index_follows_writes():
+    from db.records import count_records, update_field_value
+
+    rec_id = create_record('content', {'content': 'zq line', 'tags': 'Zq-one, Zq-two'})
+    try:
+        dist = field_distribution('content', 'tags')
+        assert dist['Zq-one'] == 1 and dist['Zq-two'] == 1
+        assert count_records('content', filters={'tags': ['zq-two']}) == 1
+
+        update_field_value('content', rec_id, 'tags', 'Zq-three')
+        dist = field_distribution('content', 'tags')
+        assert 'Zq-one' not in dist and dist['Zq-three'] == 1
+        assert count_records('content', filters={'tags': ['Zq-two']}) == 0
+    finally:
+        delete_record('content', rec_id)
+    assert 'Zq-three' not in field_distribution('content', 'tags')
+
+
+def test_field_distribution_top_n_and_buckets():
+    with sqlite3.connect(DB_PATH) as conn:
+        # content.character is multi-valued: the distribution counts elements.
+        total = sum(
+            len([part for part in value.split(',') if part.strip()])
+            for (value,) in conn.execute(
+                "SELECT character FROM content WHERE character IS NOT NULL AND character <> ''"
+            )
+        )
+
+    full = field_distribution('content', 'character')
+    top = field_distribution('content', 'character', limit=3)
+    assert list(top)[:3] == list(full)[:3]
+    assert sum(top.values()) == sum(full.values()) == total
+    assert top['Other'] == total - sum(list(full.values())[:3])
+
+    text_id = create_record('content', {'content': 'zq text line', 'linenumber': 'n/a'})
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            lines, numeric = conn.execute(
+                "SELECT COUNT(*), SUM(typeof(linenumber) IN ('integer', 'real')) "
+                "FROM content WHERE linenumber IS NOT NULL AND linenumber <> ''"
+            ).fetchone()
+        hist = field_distribution('content', 'linenumber', bins=4)
+        assert sum(hist.values()) == lines
+        assert hist['Other'] == lines - numeric
+        assert len(hist) <= 5
+    finally:
+        delete_record('content', text_id)
+
+    rec_id = create_record('content', {'content': 'zq dated', 'date_created': '2021-03-04T10:00:00'})
+    try:
+        months = field_distribution('content', 'date_created', bucket='month')
+        assert months.get('2021-03', 0) >= 1
+        assert list(months) == sorted(months)
+    finally:
+        delete_record('content', rec_id)
+
+
+def test_date_distribution_counts_invalid_dates_separately():
+    from db.records import INVALID_DATE_LABEL
+
+    with sqlite3.connect(DB_PATH) as conn:
+        filled = conn.execute(
+            "SELECT COUNT(*) FROM content WHERE date_created IS NOT NULL AND date_created <> ''"
+        ).fetchone()[0]
+    bad_id = create_record('content', {'content': 'zq undated', 'date_created': 'not a date'})
+    try:
+        for bucket in ('day', 'month'):
+            dist = field_distribution('content', 'date_created', bucket=bucket)
+            assert 'None' not in dist
+            assert dist[INVALID_DATE_LABEL] == 1
+            assert sum(dist.values()) == filled + 1
+            dated = [k for k in dist if k != INVALID_DATE_LABEL]
+            assert dated == sorted(dated)
+        limited = field_distribution('content', 'date_created', limit=1, bucket='month')
+        assert limited[INVALID_DATE_LABEL] == 1
+        assert sum(limited.values()) == filled + 1
+    finally:
+        delete_record('content', bad_id)
+
+
+def test_value_index_follows_field_schema_changes(scratch_table):
+    from db.edit_fields import change_field_type
+
+    def indexed():
+        with sqlite3.connect(DB_PATH) as conn:
+            triggers = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?",
+                (f'fv__{scratch_table}__labels__%',),
+            ).fetchone()[0]
+            rows = conn.execute(
+                "SELECT COUNT(*) FROM field_values WHERE table_name = ? AND field_name = 'labels'",
+                (scratch_table,),
+            ).fetchone()[0]
+        return triggers, rows
+
+    add_column_to_table(scratch_table, 'labels', 'text')
+    add_field_to_schema(scratch_table, 'labels', 'text')
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(f"UPDATE {scratch_table} SET labels = 'x, y' WHERE id <= 2")
+    assert indexed() == (0, 0)
+
+    change_field_type(scratch_table, 'labels', 'multi_select')
+    assert indexed() == (3, 4)
+    assert field_distribution(scratch_table, 'labels') == {'x': 2, 'y': 2}
+
+    drop_column_from_table(scratch_table, 'labels')
+    remove_field_from_schema(scratch_table, 'labels')
+    assert indexed() == (0, 0)
@@ -16,3 +16,9 @@ def test_parse_csv_decodes_and_parses_rows():
     assert csv.field_size_limit() == original_limit
 
 
+
+
+def test_parse_csv_reads_fields_over_the_default_limit():
+    long_cell = "x" * 200000
+    headers, rows = parse_csv(io.BytesIO(f"notes\n{long_cell}\n".encode()))
+    assert rows == [{"notes": long_cell}]
@@ -1,5 +1,6 @@
 import os
 import sys
+import pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from main import app
 from imports import tasks as import_tasks
@@ -7,6 +8,8 @@ from imports import tasks as import_tasks
 app.testing = True
 client = app.test_client()
 
+pytestmark = pytest.mark.usefixtures('upload_dir')
+
 
 def test_import_start_and_status():
     import_tasks.huey.immediate = True
@@ -27,3 +30,331 @@ def test_import_start_and_status():
     status = status_resp.get_json()
     assert status['status'] == 'complete'
     assert status['importedRows'] == len(payload['rows'])
+
+
+def test_import_start_rejects_bad_table_and_mapping():
+    import sqlite3
+
+    def job_count():
+        with sqlite3.connect('data/crossbook.db') as conn:
+            return conn.execute("SELECT COUNT(*) FROM import_status").fetchone()[0]
+
+    before = job_count()
+    rows = [{'character': 'Never Imported'}]
+    resp = client.post('/import-start', json={'table': 'no_such_table', 'rows': rows})
+    assert resp.status_code == 400
+    for target in ('id', 'last_edited', 'no_such_field'):
+        resp = client.post('/import-start', json={
+            'table': 'character', 'rows': rows, 'mapping': {'character': target},
+        })
+        assert resp.status_code == 400
+        assert target in resp.get_json()['error']
+    assert job_count() == before
+
+
+def test_run_import_isolates_bad_rows():
+    from db.database import get_connection
+    from imports.engine import run_import
+
+    with get_connection() as conn:
+        conn.execute(
+            "CREATE TEMP TRIGGER reject_bad BEFORE INSERT ON main.character "
+            "WHEN new.character = 'Bad Row' BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+        )
+    progress = []
+    try:
+        rows = [{'character': f'Chunked {i}', 'race': 'Elf'} for i in range(7)]
+        rows[4] = {'character': 'Bad Row'}
+        result = run_import(
+            'character', rows, chunk_size=3,
+            progress=lambda done, errs: progress.append((done, len(errs))),
+        )
+    finally:
+        with get_connection() as conn:
+            conn.execute("DROP TRIGGER IF EXISTS temp.reject_bad")
+    assert result['processed'] == 7
+    assert result['imported'] == 6
+    assert result['errors'] == [{'row': 5, 'message': 'rejected'}]
+    assert progress == [(3, 0), (6, 1), (7, 0)]
+    with get_connection() as conn:
+        names = [r[0] for r in conn.execute(
+            "SELECT character FROM character WHERE character LIKE 'Chunked %'"
+        )]
+        conn.execute("DELETE FROM character WHERE character LIKE 'Chunked %'")
+        conn.commit()
+    assert len(names) == 6
+
+
+def test_import_streams_spooled_upload():
+    import io
+    import sqlite3
+    from imports.import_csv import get_upload_meta, upload_path
+
+    import_tasks.huey.immediate = True
+    csv_bytes = b"Name,Race\n" + b"".join(
+        f"Spooled {i},Elf\n".encode() for i in range(250)
+    )
+    resp = client.post(
+        '/import',
+        data={'table': 'character', 'file': (io.BytesIO(csv_bytes), 'people.csv')},
+        content_type='multipart/form-data',
+    )
+    assert resp.status_code == 200
+    html = resp.data.decode()
+    assert 'Total Records: 250' in html
+    upload_id = html.split('window.importUploadId = "')[1].split('"')[0]
+    assert get_upload_meta(upload_id)['total_rows'] == 250
+
+    report = client.post('/trigger-validation', json={
+        'matchedFields': {'Name': {'table': 'character', 'field': 'character'}},
+        'upload': upload_id,
+    }).get_json()['Name']
+    assert (report['valid'], report['checked_rows'], report['total_rows']) == (200, 200, 250)
+
+    resp = client.post('/import-start', json={
+        'table': 'character',
+        'upload': upload_id,
+        'mapping': {'Name': 'character', 'Race': 'race'},
+    })
+    assert resp.status_code == 200
+    import_id = resp.get_json()['importId']
+    status = client.get('/import-status', query_string={'importId': import_id}).get_json()
+    assert status['status'] == 'complete'
+    assert status['importedRows'] == 250
+    assert not os.path.exists(upload_path(upload_id))
+
+    with sqlite3.connect('data/crossbook.db') as conn:
+        count = conn.execute(
+            "SELECT COUNT(*) FROM character WHERE character LIKE 'Spooled %' AND race = 'Elf'"
+        ).fetchone()[0]
+        conn.execute("DELETE FROM character WHERE character LIKE 'Spooled %'")
+    assert count == 250
+    assert client.post('/import-start', json={'table': 'character', 'upload': '../x'}).status_code == 400
+
+
+def test_import_status_pages_error_log():
+    from db.database import get_connection
+
+    import_tasks.huey.immediate = True
+    with get_connection() as conn:
+        conn.execute(
+            "CREATE TEMP TRIGGER reject_logged BEFORE INSERT ON main.character "
+            "WHEN new.character LIKE 'Rejected %' BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+        )
+    try:
+        rows = [{'character': f'Logged {i}'} for i in range(5)]
+        rows += [{'character': f'Rejected {i}'} for i in range(3)]
+        import_id = client.post(
+            '/import-start', json={'table': 'character', 'rows': rows}
+        ).get_json()['importId']
+    finally:
+        with get_connection() as conn:
+            conn.execute("DROP TRIGGER IF EXISTS temp.reject_logged")
+            conn.execute("DELETE FROM character WHERE character LIKE 'Logged %'")
+            conn.commit()
+
+    status = client.get('/import-status', query_string={
+        'importId': import_id, 'errorOffset': 1, 'errorLimit': 1,
+    }).get_json()
+    assert status['status'] == 'complete'
+    assert status['importedRows'] == 8
+    assert status['errorCount'] == 3
+    assert status['errors'] == [{'row': 7, 'message': 'rejected'}]
+    with get_connection() as conn:
+        stored = conn.execute(
+            "SELECT errors FROM import_status WHERE id = ?", (import_id,)
+        ).fetchone()[0]
+    assert stored == '[]'
+
+
+def test_resume_import_continues_from_checkpoint():
+    import sqlite3
+    from db.database import get_connection
+    from imports.import_csv import spool_rows, upload_path
+
+    import_tasks.huey.immediate = True
+    rows = [{'character': f'Resumed {i}'} for i in range(10)]
+    upload = spool_rows(rows)
+    job_id = import_tasks.create_import_job(
+        upload['upload_id'], upload['total_rows'], table='character'
+    )
+    # Simulate a worker that committed the first 4 rows and then died.
+    import_tasks._update_import_status(job_id, status='in_progress', heartbeat_at=0)
+    with get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO character (character) VALUES (?)",
+            [(row['character'],) for row in rows[:4]],
+        )
+        conn.execute(
+            "UPDATE import_status SET checkpoint_row = 4, imported_rows = 4 WHERE id = ?",
+            (job_id,),
+        )
+        conn.commit()
+
+    status = client.get('/import-status', query_string={'importId': job_id}).get_json()
+    assert status['stale'] is True
+    assert status['checkpointRow'] == 4
+
+    resp = client.post('/import-resume', json={'importId': job_id})
+    assert resp.status_code == 200
+    status = client.get('/import-status', query_string={'importId': job_id}).get_json()
+    assert status['status'] == 'complete'
+    assert status['checkpointRow'] == 10
+    assert not os.path.exists(upload_path(upload['upload_id']))
+    assert client.post('/import-resume', json={'importId': job_id}).status_code == 409
+
+    with sqlite3.connect('data/crossbook.db') as conn:
+        names = [r[0] for r in conn.execute(
+            "SELECT character FROM character WHERE character LIKE 'Resumed %'"
+        )]
+        conn.execute("DELETE FROM character WHERE character LIKE 'Resumed %'")
+    assert sorted(names) == sorted(r['character'] for r in rows)
+
+
+def test_upsert_import_updates_changed_fields_only():
+    import sqlite3
+
+    import_tasks.huey.immediate = True
+    with sqlite3.connect('data/crossbook.db') as conn:
+        # Left behind by a worker that died mid-job.
+        conn.execute(
+            'CREATE INDEX "idx_import_key__character__character" ON character (character)'
+        )
+    first = [
+        {'character': 'Merge A', 'race': 'Elf'},
+        {'character': 'Merge B', 'race': 'Dwarf'},
+    ]
+    client.post('/import-start', json={'table': 'character', 'rows': first})
+    feed = [
+        {'character': 'Merge A', 'race': 'Human'},
+        {'character': 'Merge B', 'race': 'Dwarf'},
+        {'character': 'Merge C', 'race': 'Orc'},
+        {'character': 'Merge C', 'race': 'Gnome'},
+        {'character': '', 'race': 'Elf'},
+    ]
+    resp = client.post('/import-start', json={
+        'table': 'character', 'rows': feed, 'mode': 'upsert', 'keys': ['character'],
+    })
+    assert resp.status_code == 200
+    import_id = resp.get_json()['importId']
+    status = client.get('/import-status', query_string={'importId': import_id}).get_json()
+    assert status['status'] == 'complete'
+    assert status['insertedRows'] == 1
+    assert status['updatedRows'] == 2
+    assert status['errors'] == [{'row': 5, 'message': 'Missing key value'}]
+
+    with sqlite3.connect('data/crossbook.db') as conn:
+        races = dict(conn.execute(
+            "SELECT character, race FROM character WHERE character LIKE 'Merge %'"
+        ).fetchall())
+        history = conn.execute(
+            "SELECT field_name, old_value, new_value FROM edit_history "
+            "WHERE actor = ? ORDER BY id",
+            (f'import:{import_id}',),
+        ).fetchall()
+        indexes = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE 'idx_import_key__%'"
+        )]
+        conn.execute("DELETE FROM character WHERE character LIKE 'Merge %'")
+    assert races == {'Merge A': 'Human', 'Merge B': 'Dwarf', 'Merge C': 'Gnome'}
+    assert history == [('race', 'Elf', 'Human'), ('race', 'Orc', 'Gnome')]
+    assert indexes == []
+    bad = client.post('/import-start', json={
+        'table': 'character', 'rows': feed, 'mode': 'upsert', 'keys': ['nope'],
+    })
+    assert bad.status_code == 400
+
+
+def test_import_resolves_foreign_key_labels():
+    from db.database import get_connection
+    from imports.engine import run_import
+
+    rows = [
+        {'chapter': 'Linked 1', 'character': 'char1, Ajihad'},
+        {'chapter': 'Linked 2', 'character': 'Nobody, Char2'},
+        {'chapter': 'Linked 3', 'character': ''},
+    ]
+    result = run_import('content', rows, link_references=True)
+    with get_connection() as conn:
+        ids = dict(conn.execute(
+            "SELECT character, id FROM character WHERE character IN ('Char1', 'Ajihad')"
+        ).fetchall())
+        stored = conn.execute(
+            "SELECT id, character FROM content WHERE chapter = 'Linked 1'"
+        ).fetchone()
+        links = conn.execute(
+            "SELECT table_a, id_a FROM relationships WHERE table_b = 'content' AND id_b = ? "
+            "ORDER BY id_a",
+            (stored[0],),
+        ).fetchall()
+        conn.execute("DELETE FROM relationships WHERE table_b = 'content' AND id_b = ?", (stored[0],))
+        conn.execute("DELETE FROM content WHERE chapter LIKE 'Linked %'")
+        conn.commit()
+    assert result['imported'] == 2
+    assert result['errors'] == [{'row': 2, 'message': 'Unknown character labels: Nobody'}]
+    assert result['links_created'] == 2
+    assert stored[1] == 'char1, Ajihad'
+    assert links == sorted(('character', i) for i in ids.values())
+
+    report = client.post('/trigger-validation', json={
+        'matchedFields': {'Who': {'table': 'content', 'field': 'character'}},
+        'rows': [{'Who': 'Char3'}, {'Who': 'Char3, Ghost'}],
+    }).get_json()['Who']
+    assert (report['valid'], report['invalid']) == (1, 1)
+
+
+def test_import_run_stops_when_job_is_claimed_by_another_run():
+    import sqlite3
+    from db.database import get_connection
+    from imports.import_csv import spool_rows
+
+    rows = [{'character': f'Claimed {i}'} for i in range(5)]
+    upload = spool_rows(rows)
+    job_id = import_tasks.create_import_job(
+        upload['upload_id'], upload['total_rows'], table='character'
+    )
+
+    def rows_then_requeue():
+        for i, row in enumerate(import_tasks.iter_upload_rows(upload['upload_id'])):
+            if i == 2:
+                with get_connection() as conn:
+                    conn.execute(
+                        "UPDATE import_status SET run_token = 'other-run' WHERE id = ?",
+                        (job_id,),
+                    )
+                    conn.commit()
+            yield row
+
+    result = import_tasks._run_import(job_id, 'character', rows_then_requeue(), 5)
+    assert result is None
+    with sqlite3.connect('data/crossbook.db') as conn:
+        imported = conn.execute(
+            "SELECT COUNT(*) FROM character WHERE character LIKE 'Claimed %'"
+        ).fetchone()[0]
+        status = conn.execute(
+            "SELECT status, checkpoint_row FROM import_status WHERE id = ?", (job_id,)
+        ).fetchone()
+    assert imported == 0
+    assert status == ('in_progress', 0)
+    assert import_tasks._run_import(job_id, 'character', iter([]), 5) is None
+    import_tasks.remove_upload(upload['upload_id'])
+
+
+def test_cleanup_keeps_uploads_of_unfinished_jobs():
+    import time
+    from imports.import_csv import cleanup_stale_uploads, remove_upload, spool_rows, upload_path
+
+    upload = spool_rows([{'character': 'Kept'}])
+    path = upload_path(upload['upload_id'])
+    job_id = import_tasks.create_import_job(upload['upload_id'], 1, table='character')
+    old = time.time() - 2 * 24 * 60 * 60
+    try:
+        os.utime(path, (old, old))
+        cleanup_stale_uploads()
+        assert os.path.exists(path)
+
+        import_tasks._update_import_status(job_id, status='complete')
+        cleanup_stale_uploads()
+        assert not os.path.exists(path)
+    finally:
+        remove_upload(upload['upload_id'])
@@ -28,8 +28,22 @@ def test_build_filters_search_clause():
 
 def test_build_filters_multiple_values_any_mode():
     clauses, params = _build_filters('content', filters={'tags': ['magic', 'quest']})
-    assert clauses == ['(tags LIKE ? OR tags LIKE ?)']
-    assert params == ['%magic%', '%quest%']
+    assert clauses == [
+        '(id IN (SELECT record_id FROM field_values '
+        'WHERE table_name = ? AND field_name = ? AND value IN (?, ?)))'
+    ]
+    assert params == ['content', 'tags', 'magic', 'quest']
+
+
+def test_build_filters_multi_select_matches_whole_elements():
+    from db.records import count_records
+
+    # 'art' must not match the 'party' element of 'quest, party'.
+    assert count_records('content', filters={'tags': ['art']}) == count_records(
+        'content', filters={'tags': ['art']}, ops={'tags': 'starts_with'}
+    )
+    assert count_records('content', filters={'tags': ['quest', 'party']}, modes={'tags': 'all'}) == \
+        count_records('content', filters={'tags': ['quest, party']}, ops={'tags': 'starts_with'})
 
 
 def test_build_filters_multiple_values_all_equals():
@@ -75,3 +89,30 @@ def test_apply_date_ranges():
     assert clauses == ['date_created <= ?']
     assert params == ['2023-01-31']
 
+
+
+def test_build_filters_does_not_install_value_triggers():
+    import sqlite3
+    from db.field_values import sync_field_values
+
+    def fv_triggers():
+        with sqlite3.connect('data/crossbook.db') as conn:
+            return {
+                r[0]
+                for r in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                    "AND name LIKE 'fv\\_\\_content\\_\\_tags\\_\\_%' ESCAPE '\\'"
+                )
+            }
+
+    installed = fv_triggers()
+    assert len(installed) == 3
+    with sqlite3.connect('data/crossbook.db') as conn:
+        for name in installed:
+            conn.execute(f'DROP TRIGGER "{name}"')
+    try:
+        _build_filters('content', filters={'tags': ['magic']})
+        assert fv_triggers() == set()
+    finally:
+        sync_field_values('content')
+    assert fv_triggers() == installed
@@ -1,6 +1,6 @@
 import os
 import sys
-from unittest.mock import patch, call
+from unittest.mock import patch
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -42,24 +42,27 @@ def test_update_record_field_logs_and_errors():
 
 
 def test_bulk_update_records_logs_and_errors():
-    schema = {'tbl': {'foo': {'type': 'text'}}}
+    schema = {'tbl': {'foo': {'type': 'text'}, 'ro': {'type': 'text', 'readonly': True}}}
     ids = [1, 2, 3]
     with patch('utils.record_ops.get_field_schema', return_value=schema), \
-         patch('utils.record_ops.update_field_value', return_value=True) as upd, \
-         patch('utils.record_ops.append_edit_log') as log:
+         patch('utils.record_ops.bulk_update_field_values', return_value=len(ids)) as bulk:
         count = bulk_update_records('tbl', ids, 'foo', 'bar')
         assert count == len(ids)
-        assert upd.call_count == len(ids)
-        calls = [call('tbl', rid, 'foo', 'bar') for rid in ids]
-        upd.assert_has_calls(calls, any_order=False)
-        log_calls = [call('tbl', rid, 'foo', None, 'bar') for rid in ids]
-        log.assert_has_calls(log_calls, any_order=False)
+        bulk.assert_called_once_with('tbl', ids, 'foo', 'bar')
 
     with patch('utils.record_ops.get_field_schema', return_value=schema), \
-         patch('utils.record_ops.update_field_value', side_effect=RuntimeError('boom')):
+         patch('utils.record_ops.bulk_update_field_values', side_effect=RuntimeError('boom')):
         try:
             bulk_update_records('tbl', ids, 'foo', 'bar')
         except RuntimeError:
             pass
         else:
             assert False, 'Exception not propagated'
+
+    with patch('utils.record_ops.get_field_schema', return_value=schema):
+        try:
+            bulk_update_records('tbl', ids, 'ro', 'bar')
+        except ValueError:
+            pass
+        else:
+            assert False, 'ValueError not raised for read-only field'
@@ -118,3 +118,259 @@ def test_edit_history_for_relationship_changes():
         assert ("character", 1, "relation_location", "1", None) in rows
         assert ("location", 1, "relation_character", "1", None) in rows
 
+
+
+def test_related_records_limit_and_total():
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("DELETE FROM relationships WHERE table_a = 'character' AND id_a = 5")
+        conn.executemany(
+            "INSERT INTO relationships (table_a, id_a, table_b, id_b, two_way) VALUES ('character', 5, 'location', ?, 1)",
+            [(i,) for i in range(1, 31)],
+        )
+        conn.commit()
+    try:
+        related = get_related_records('character', 5, limit=10)
+        assert related['location']['total'] == 30
+        assert [i['id'] for i in related['location']['items']] == list(range(1, 11))
+        assert related['location']['items'][0]['name'] == 'Loc1'
+
+        resp = client.get('/character/5/related?limit=5')
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert len(data['location']['items']) == 5
+        assert data['location']['total'] == 30
+    finally:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("DELETE FROM relationships WHERE table_a = 'character' AND id_a = 5")
+            conn.commit()
+
+
+def test_related_records_keep_link_creation_order():
+    def cleanup():
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("DELETE FROM relationships WHERE table_a = 'character' AND id_a = 6")
+            conn.execute("DELETE FROM relationships WHERE table_a = 'character' AND table_b = 'character' AND id_b = 6")
+            conn.commit()
+
+    cleanup()
+    with sqlite3.connect(DB_PATH) as conn:
+        for other in (9, 3, 17, 1):
+            conn.execute(
+                "INSERT INTO relationships (table_a, id_a, table_b, id_b, two_way) VALUES ('character', 6, 'location', ?, 1)",
+                (other,),
+            )
+        # Same-table links with the record on either side.
+        conn.execute("INSERT INTO relationships VALUES ('character', 8, 'character', 6, 1)")
+        conn.execute("INSERT INTO relationships VALUES ('character', 6, 'character', 2, 1)")
+        conn.commit()
+    try:
+        related = get_related_records('character', 6)
+        assert [i['id'] for i in related['location']['items']] == [9, 3, 17, 1]
+        assert [i['id'] for i in related['character']['items']] == [8, 2]
+        limited = get_related_records('character', 6, limit=2)
+        assert [i['id'] for i in limited['location']['items']] == [9, 3]
+    finally:
+        cleanup()
+
+
+def test_traverse_relationships_multi_hop():
+    links = [
+        ('character', 1, 'location', 1, 1),
+        ('character', 2, 'location', 1, 1),
+        ('character', 2, 'content', 9, 0),
+    ]
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany("INSERT OR IGNORE INTO relationships VALUES (?, ?, ?, ?, ?)", links)
+        conn.commit()
+    try:
+        resp = client.get('/character/1/graph?depth=2')
+        assert resp.status_code == 200
+        graph = resp.get_json()
+        depths = {(n['table'], n['id']): n['depth'] for n in graph['nodes']}
+        assert depths[('location', 1)] == 1
+        assert depths[('character', 2)] == 2
+        assert ('content', 9) not in depths
+        assert any(e['id_a'] == 2 and e['id_b'] == 1 for e in graph['edges'])
+
+        graph = client.get('/character/1/graph?depth=3&two_way_only=1').get_json()
+        assert ('content', 9) not in {(n['table'], n['id']) for n in graph['nodes']}
+        graph = client.get('/character/1/graph?depth=3&tables=location').get_json()
+        assert {n['table'] for n in graph['nodes']} == {'character', 'location'}
+        assert len(graph['nodes']) == 2
+        assert client.get('/character/1/graph?tables=bogus').status_code == 400
+
+        graph = client.get('/character/1/graph?depth=6&max_nodes=2').get_json()
+        assert graph['truncated'] is True
+        assert [(n['table'], n['id'], n['depth']) for n in graph['nodes']] == [
+            ('character', 1, 0), ('location', 1, 1),
+        ]
+    finally:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.executemany(
+                "DELETE FROM relationships WHERE table_a=? AND id_a=? AND table_b=? AND id_b=? AND two_way=?",
+                links,
+            )
+            conn.commit()
+
+
+def test_graph_index_tracks_relationship_changes():
+    from db.graph_index import get_graph_index, reset_graph_index
+
+    reset_graph_index()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("DELETE FROM relationships WHERE (table_a = 'character' AND id_a IN (11, 12, 13)) OR (table_a = 'content' AND id_a = 11)")
+        conn.commit()
+    pair = {'table_a': 'character', 'id_a': 11, 'table_b': 'location', 'id_b': 11}
+    try:
+        assert client.get('/api/graph/degree/character/11').get_json() == {'degree': 0}
+        built = get_graph_index()
+
+        client.post('/relationship', json={**pair, 'action': 'add'})
+        client.post('/relationship', json={**pair, 'id_a': 12, 'action': 'add'})
+        assert get_graph_index() is built  # applied incrementally
+        assert client.get('/api/graph/degree/location/11').get_json() == {'degree': 2}
+        path = client.get('/api/graph/path?from=character:11&to=character:12').get_json()['path']
+        assert [(n['table'], n['id']) for n in path] == [
+            ('character', 11), ('location', 11), ('character', 12)
+        ]
+        comp = client.get('/api/graph/component/character/11').get_json()
+        assert comp['size'] == 3
+
+        # A query keeps iterating its snapshot while a change is published.
+        hub = built.node('location', 11)
+        walk = built.neighbors_of(hub)
+        first = next(walk)
+        client.post('/relationship', json={**pair, 'id_a': 13, 'action': 'add'})
+        assert len([first, *walk]) == 2
+        assert built.degree(hub) == 3
+        client.post('/relationship', json={**pair, 'id_a': 13, 'action': 'remove'})
+
+        client.post('/relationship', json={**pair, 'action': 'remove'})
+        assert client.get('/api/graph/degree/location/11').get_json() == {'degree': 1}
+
+        # Writes that bypass add_relationship trigger a rebuild.
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("INSERT INTO relationships VALUES ('content', 11, 'location', 11, 1)")
+            conn.execute("INSERT INTO relationships VALUES ('content', 11, 'location', 12, 1)")
+            conn.commit()
+        assert client.get('/api/graph/degree/location/11').get_json() == {'degree': 2}
+        assert client.get('/api/graph/path?from=bad&to=x').status_code == 400
+        assert client.get('/api/graph/path?from=bad&to=x&msg=1&args=2').status_code == 400
+    finally:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("DELETE FROM relationships WHERE (table_a = 'character' AND id_a IN (11, 12, 13)) OR (table_a = 'content' AND id_a = 11)")
+            conn.commit()
+        reset_graph_index()
+
+
+def test_bulk_relationships_single_transaction():
+    ids = list(range(20, 40))
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("DELETE FROM relationships WHERE table_a = 'character' AND table_b = 'content' AND id_b = 7")
+        conn.execute("UPDATE character SET last_edited = '2000-01-01' WHERE id BETWEEN 20 AND 39")
+        conn.commit()
+    changes = [
+        {'action': 'add', 'table_a': 'content', 'id_a': 7, 'table_b': 'character', 'id_b': i}
+        for i in ids
+    ]
+    try:
+        resp = client.post('/relationships/bulk', json={'changes': changes})
+        assert resp.status_code == 200
+        assert resp.get_json()['added'] == 20
+        related = get_related_records('content', 7)
+        assert {i['id'] for i in related['character']['items']} >= set(ids)
+        with sqlite3.connect(DB_PATH) as conn:
+            stale = conn.execute(
+                "SELECT COUNT(*) FROM character WHERE id BETWEEN 20 AND 39 AND last_edited = '2000-01-01'"
+            ).fetchone()[0]
+            logged = conn.execute(
+                "SELECT COUNT(*) FROM edit_history WHERE table_name = 'content' AND record_id = 7 AND field_name = 'relation_character'"
+            ).fetchone()[0]
+        assert stale == 0
+        assert logged >= 20
+
+        bad = changes[:2] + [{'action': 'add', 'table_a': 'nope', 'id_a': 1, 'table_b': 'character', 'id_b': 1}]
+        assert client.post('/relationships/bulk', json={'changes': bad}).status_code == 400
+
+        removes = [dict(c, action='remove') for c in changes]
+        resp = client.post('/relationships/bulk', json={'changes': removes})
+        assert resp.get_json()['removed'] == 20
+        assert 'character' not in get_related_records('content', 7)
+    finally:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("DELETE FROM relationships WHERE table_a = 'character' AND table_b = 'content' AND id_b = 7")
+            conn.commit()
+
+
+def test_bulk_relationships_apply_last_change_per_pair():
+    from db.graph_index import get_graph_index, reset_graph_index
+
+    reset_graph_index()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("DELETE FROM relationships WHERE table_a = 'character' AND id_a IN (41, 42) AND table_b = 'content' AND id_b = 8")
+        conn.commit()
+    pair = {'table_a': 'content', 'id_a': 8, 'table_b': 'character', 'id_b': 41}
+    try:
+        graph = get_graph_index()
+        changes = [
+            dict(pair, action='add'),
+            dict(pair, action='remove'),
+            dict(pair, id_b=42, action='remove'),
+            dict(pair, id_b=42, action='add'),
+            dict(pair, id_b=42, action='add'),
+        ]
+        resp = client.post('/relationships/bulk', json={'changes': changes})
+        assert (resp.get_json()['added'], resp.get_json()['removed']) == (1, 0)
+        with sqlite3.connect(DB_PATH) as conn:
+            linked = conn.execute(
+                "SELECT id_a FROM relationships WHERE table_a = 'character' AND id_a IN (41, 42) AND table_b = 'content' AND id_b = 8"
+            ).fetchall()
+        assert linked == [(42,)]
+        assert get_graph_index() is graph
+        assert client.get('/api/graph/degree/character/41').get_json() == {'degree': 0}
+        assert client.get('/api/graph/degree/character/42').get_json()['degree'] >= 1
+
+        resp = client.post('/relationships/bulk', json={'changes': [
+            dict(pair, action='remove'), dict(pair, id_b=42, action='remove'),
+        ]})
+        assert (resp.get_json()['added'], resp.get_json()['removed']) == (0, 1)
+    finally:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("DELETE FROM relationships WHERE table_a = 'character' AND id_a IN (41, 42) AND table_b = 'content' AND id_b = 8")
+            conn.commit()
+        reset_graph_index()
+
+
+def test_graph_index_ignores_no_op_and_rolled_back_links():
+    import pytest
+    from db.database import transaction
+    from db.graph_index import get_graph_index, reset_graph_index
+    from db.relationships import add_relationship, remove_relationship
+
+    def cleanup():
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("DELETE FROM relationships WHERE table_a = 'character' AND id_a IN (14, 15) AND table_b = 'location' AND id_b = 14")
+            conn.commit()
+
+    reset_graph_index()
+    cleanup()
+    try:
+        graph = get_graph_index()
+        assert add_relationship('character', 14, 'location', 14)
+        # Re-adding, toggling two_way and removing a missing link write no edge.
+        assert add_relationship('character', 14, 'location', 14)
+        assert add_relationship('character', 14, 'location', 14, two_way=False)
+        assert remove_relationship('character', 15, 'location', 14)
+        assert get_graph_index() is graph
+        hub = graph.node('location', 14)
+        assert graph.degree(hub) == 1
+
+        with pytest.raises(RuntimeError):
+            with transaction():
+                add_relationship('character', 15, 'location', 14)
+                raise RuntimeError('roll back')
+        assert get_graph_index() is graph
+        assert graph.degree(hub) == 1
+    finally:
+        cleanup()
+        reset_graph_index()
@@ -87,3 +87,50 @@ def test_create_base_table_success_and_invalid_names():
             conn.execute('DELETE FROM field_schema WHERE table_name=?', (name,))
             conn.commit()
 
+
+
+def test_field_schema_cached_until_generation_bump():
+    from db import schema as schema_mod
+
+    first = schema_mod.get_field_schema()
+    assert schema_mod.get_field_schema() is first
+
+    before = fetch_styling('character', 'character')
+    generation = schema_mod.get_schema_generation()
+    assert update_field_styling('character', 'character', {'color': 'green'})
+    assert schema_mod.get_schema_generation() > generation
+    refreshed = schema_mod.get_field_schema()
+    assert refreshed is not first
+    assert refreshed['character']['character']['styling'] == {'color': 'green'}
+
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            'UPDATE field_schema SET styling=? WHERE table_name=? AND field_name=?',
+            (before, 'character', 'character'),
+        )
+        conn.commit()
+    schema_mod.bump_schema_generation()
+
+
+def test_field_schema_sees_writes_from_other_connections():
+    from db import schema as schema_mod
+
+    schema_mod.get_field_schema()
+    before = fetch_styling('character', 'character')
+    try:
+        # Simulates another worker process: no in-process bump happens.
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute(
+                'UPDATE field_schema SET styling=? WHERE table_name=? AND field_name=?',
+                (json.dumps({'color': 'blue'}), 'character', 'character'),
+            )
+            conn.commit()
+        refreshed = schema_mod.get_field_schema()
+        assert refreshed['character']['character']['styling'] == {'color': 'blue'}
+    finally:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute(
+                'UPDATE field_schema SET styling=? WHERE table_name=? AND field_name=?',
+                (before, 'character', 'character'),
+            )
+            conn.commit()
@@ -1,11 +1,11 @@
 import os
 import sys
-import csv
 from functools import partial
 import pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from utils.validation import (
+    TEXTAREA_MAX_LENGTH,
     validate_text_column,
     validate_textarea_column,
     validate_number_column,
@@ -32,7 +32,7 @@ def test_validate_text_column_counts():
 
 
 def test_validate_textarea_column_edge_cases():
-    long_text = "x" * (csv.field_size_limit() + 1)
+    long_text = "x" * (TEXTAREA_MAX_LENGTH + 1)
     values = [
         "",  # blank
         "short text",  # valid
@@ -4,7 +4,9 @@ from typing import Any, Iterable
 from db.records import (
     get_record_by_id,
     update_field_value,
+    bulk_update_field_values,
 )
+from db.database import transaction
 from db.edit_history import append_edit_log
 from db.schema import get_field_schema
 from utils.field_registry import get_field_type
@@ -47,15 +49,17 @@ def update_record_field(table: str, record_id: int, field: str, value: Any) -> s
 
     new_value = _normalize_value(fmeta["type"], value)
 
-    prev_record = get_record_by_id(table, record_id)
-    prev_value = prev_record.get(field) if prev_record else None
+    # Read, update, timestamp and history row are written as one unit.
+    with transaction():
+        prev_record = get_record_by_id(table, record_id)
+        prev_value = prev_record.get(field) if prev_record else None
 
-    success = update_field_value(table, record_id, field, new_value)
-    if not success:
-        raise RuntimeError("Database update failed")
+        success = update_field_value(table, record_id, field, new_value)
+        if not success:
+            raise RuntimeError("Database update failed")
 
-    if prev_record is not None and str(prev_value) != str(new_value):
-        append_edit_log(table, record_id, field, str(prev_value), str(new_value))
+        if prev_record is not None and str(prev_value) != str(new_value):
+            append_edit_log(table, record_id, field, str(prev_value), str(new_value))
 
     logger.info(
         "Field updated for %s id=%s: %s -> %r",
@@ -80,12 +84,14 @@ def bulk_update_records(table: str, ids: list[int], field: str, value: Any) -> i
     if fmeta is None:
         raise ValueError("Unknown field")
 
+    if fmeta.get("readonly"):
+        raise ValueError("Field is read-only")
+
     new_value = _normalize_value(fmeta["type"], value)
-    updated = 0
-    for rid in ids:
-        if update_field_value(table, rid, field, new_value):
-            append_edit_log(table, rid, field, None, str(new_value))
-            updated += 1
+    try:
+        updated = bulk_update_field_values(table, ids, field, new_value)
+    except TypeError as exc:
+        raise ValueError("Invalid record ids") from exc
     logger.info(
         "Bulk updated %s records for %s.%s",
         updated,
@@ -1,12 +1,21 @@
+import base64
+import binascii
 from functools import wraps
+import json
 import logging
 from flask import request, abort
+from db.config import MAX_PAGE_SIZE, get_count_settings, get_list_page_size
 from db.validation import validate_table
 from db.schema import get_field_schema
-from db.records import get_all_records, count_records
+from db.records import get_all_records, count_records, estimate_count
+from db.search import fts_search_clause
 
 logger = logging.getLogger(__name__)
 
+# Textarea values on list pages are cut to this many characters unless the
+# request asks for ``full_text``; the rows only show a short plain-text preview.
+LIST_TEXTAREA_CHARS = 500
+
 
 def require_base_table(func):
     """Decorator to abort with 404 if the table does not exist."""
@@ -58,6 +67,12 @@ def parse_list_params(table):
     sort_field = request.args.get('sort')
     direction = request.args.get('dir', 'asc')
 
+    # ``columns`` (comma separated or repeated) lists the visible columns.
+    columns = None
+    requested = [c for v in request.args.getlist('columns') for c in v.split(',') if c]
+    if requested:
+        columns = [f for f in fields if f in set(requested)]
+
     return {
         'fields': fields,
         'search': search,
@@ -66,9 +81,61 @@ def parse_list_params(table):
         'modes': modes,
         'sort_field': sort_field,
         'direction': direction,
+        'columns': columns,
     }
 
 
+def encode_cursor(sort_field, direction, record) -> str:
+    """Return an opaque token pointing just past ``record`` in the sort order."""
+    value = record.get(sort_field) if sort_field else None
+    payload = json.dumps(
+        [sort_field or None, direction, value, record["id"]],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort_field, direction):
+    """Return ``(sort_value, id)`` from ``token``.
+
+    Raises ``ValueError`` if the token is malformed or was issued for a
+    different sort order.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        field, token_dir, value, last_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode())
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if field != (sort_field or None) or token_dir != direction:
+        raise ValueError("Cursor does not match the requested sort")
+    if not isinstance(last_id, int):
+        raise ValueError("Invalid cursor")
+    return value, last_id
+
+
+def format_count(count, approximate=False) -> str:
+    """Return ``count`` for display, abbreviating estimates (e.g. ``~1.2M``)."""
+    if count is None:
+        return ''
+    if not approximate:
+        return str(count)
+    if count >= 1_000_000:
+        return f"~{count / 1_000_000:.1f}M"
+    if count >= 1_000:
+        return f"~{count / 1_000:.1f}K"
+    return f"~{count}"
+
+
+def _page_size() -> int:
+    """Return the page size from ``per_page`` or the configured default."""
+    per_page = request.args.get('per_page', type=int)
+    if per_page is None:
+        return get_list_page_size()
+    return max(1, min(per_page, MAX_PAGE_SIZE))
+
+
 def build_list_context(table):
     """Return context dict used by list and API views."""
     params = parse_list_params(table)
@@ -79,8 +146,28 @@ def build_list_context(table):
     modes = params['modes']
     sort_field = params['sort_field']
     direction = params['direction']
-    page = int(request.args.get('page', 1))
-    per_page = 500
+    direction = 'desc' if str(direction).lower() == 'desc' else 'asc'
+    per_page = _page_size()
+
+    # ``cursor`` (even empty, for the first page) switches to keyset paging,
+    # which skips both OFFSET and the full count.
+    cursor_mode = 'cursor' in request.args
+    after = None
+    if cursor_mode:
+        token = request.args.get('cursor', '')
+        if token:
+            try:
+                after = decode_cursor(token, sort_field, direction)
+            except ValueError:
+                logger.warning(
+                    "Rejected list cursor for %s",
+                    table,
+                    extra={"table": table, "cursor": token},
+                )
+                abort(400)
+        page = 1
+    else:
+        page = max(int(request.args.get('page', 1)), 1)
     offset = (page - 1) * per_page
     records = get_all_records(
         table,
@@ -92,19 +179,48 @@ def build_list_context(table):
         direction=direction,
         limit=per_page,
         offset=offset,
+        keyset=cursor_mode,
+        after=after,
+        columns=params['columns'],
+        textarea_chars=None if request.args.get('full_text') else LIST_TEXTAREA_CHARS,
     )
-    total_count = count_records(table, search=search, filters=filters, ops=ops, modes=modes)
+
+    # Relevance-ranked pages have no (sort, id) order to resume from.
+    ranked = bool(search) and not sort_field and not cursor_mode and (
+        fts_search_clause(table, search) is not None
+    )
+    next_cursor = None
+    if records and len(records) == per_page and not ranked:
+        next_cursor = encode_cursor(sort_field, direction, records[-1])
+
     args_without_page = request.args.to_dict(flat=False)
     args_without_page.pop('page', None)
+    args_without_page.pop('cursor', None)
     from urllib.parse import urlencode
     base_qs = urlencode(args_without_page, doseq=True)
     args_no_sort = dict(args_without_page)
     args_no_sort.pop('sort', None)
     args_no_sort.pop('dir', None)
     base_qs_no_sort = urlencode(args_no_sort, doseq=True)
-    total_pages = (total_count + per_page - 1) // per_page
-    start = offset + 1 if total_count else 0
-    end = min(offset + len(records), total_count)
+
+    count_approximate = False
+    if cursor_mode:
+        total_count = None
+        total_pages = None
+        start = 1 if records else 0
+        end = len(records)
+    else:
+        approximate, threshold = get_count_settings()
+        if approximate:
+            total_count, count_approximate = estimate_count(
+                table, search=search, filters=filters, ops=ops, modes=modes,
+                threshold=threshold,
+            )
+        else:
+            total_count = count_records(table, search=search, filters=filters, ops=ops, modes=modes)
+        total_pages = max((total_count + per_page - 1) // per_page, page if records else 0)
+        start = offset + 1 if records else 0
+        end = offset + len(records)
 
     return {
         'table': table,
@@ -115,10 +231,15 @@ def build_list_context(table):
         'page': page,
         'total_pages': total_pages,
         'total_count': total_count,
+        'count_approximate': count_approximate,
+        'count_label': format_count(total_count, count_approximate),
         'start': start,
         'end': end,
         'per_page': per_page,
+        'cursor_mode': cursor_mode,
+        'next_cursor': next_cursor,
         'base_qs': base_qs,
         'base_qs_no_sort': base_qs_no_sort,
         'has_filters': bool(filters),
+        'visible_columns': params['columns'],
     }
@@ -1,11 +1,17 @@
 import re
-import csv
 import logging
+import sqlite3
+from db.database import get_connection
+from db.label_map import LabelMap, split_labels
 from db.schema import get_field_schema
 from utils.field_registry import register_type, get_field_type
 
 logger = logging.getLogger(__name__)
 
+# The csv module's default field size limit. Imports lift the module-wide
+# limit, so textarea validation keeps its own copy.
+TEXTAREA_MAX_LENGTH = 131072
+
 def get_options(table: str, field: str) -> list[str]:
     """Return options for the given field from the field schema."""
     schema = get_field_schema()
@@ -74,7 +80,7 @@ def validate_text_column(values):
         "details": details
     }
 def validate_textarea_column(values):
-    max_size = csv.field_size_limit()  # default ~131072 bytes
+    max_size = TEXTAREA_MAX_LENGTH
     details = {"blank": [],"invalid":[],"warning":[],"valid":[]}
     valid = invalid = blank = warning = 0
     for idx, v in enumerate(values, start=1):
@@ -157,6 +163,48 @@ def validate_select_column(values: list[str], options: list[str]) -> dict:
             invalid += 1
             details["invalid"].append({"row": idx, "reason": "does not match available options","value":v })
     return {"valid": valid, "invalid": invalid, "blank": blank, "details":details}
+def validate_reference_column(table: str, field: str, values: list[str]) -> dict:
+    """Validate foreign_key labels against the referenced table's label map.
+
+    Falls back to the stored options when the referenced table is too large
+    to map or cannot be read.
+    """
+    target = get_field_schema().get(table, {}).get(field, {}).get("foreign_key")
+    label_map = None
+    if target:
+        try:
+            with get_connection() as conn:
+                label_map = LabelMap(conn, target)
+        except (sqlite3.DatabaseError, ValueError):
+            logger.exception(
+                "Cannot load labels for %s",
+                target,
+                extra={"table": table, "field": field, "foreign_table": target},
+            )
+    if label_map is None or not label_map.complete:
+        return validate_select_column(values, get_options(table, field))
+
+    valid = invalid = blank = 0
+    details = {"valid": [], "invalid": [], "blank": [], "warning": []}
+    for idx, raw in enumerate(values, start=1):
+        if not split_labels(raw):
+            blank += 1
+            details["blank"].append(idx)
+            continue
+        missing = label_map.unresolved(raw)
+        if missing:
+            invalid += 1
+            details["invalid"].append({
+                "row": idx,
+                "value": raw,
+                "reason": f"unknown {target} labels: {missing}",
+            })
+        else:
+            valid += 1
+            details["valid"].append(idx)
+    return {"valid": valid, "invalid": invalid, "blank": blank, "warning": 0, "details": details}
+
+
 def validate_multi_select_column(values: list[str], options: list[str]) -> dict:
     valid = invalid = blank = warning = 0
     details = {"valid": [],"invalid": [],"blank": [],"warning": []}
@@ -268,7 +316,7 @@ register_type(
 register_type(
     'foreign_key',
     sql_type='TEXT',
-    validator=lambda t, f, v: validate_select_column(v, get_options(t, f)),
+    validator=validate_reference_column,
     default_width=5,
     default_height=10,
     macro='render_foreign_key',
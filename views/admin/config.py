@@ -14,7 +14,8 @@ from flask import (
 from werkzeug.utils import secure_filename
 from logging_setup import configure_logging
 from db.config import get_config_rows, update_config
-from db.database import check_db_status, init_db_path
+from db.database import check_db_status, init_db_path, get_pool_stats
+from db.dashboard import get_result_cache_stats
 from db.bootstrap import initialize_database, ensure_default_configs
 from db.schema import create_base_table
 from utils.field_registry import FIELD_TYPES
@@ -33,7 +34,13 @@ def database_page():
             db_path = item['value']
             db_status = check_db_status(db_path)
             break
-    return render_template('admin/database_admin.html', db_path=db_path, db_status=db_status)
+    return render_template(
+        'admin/database_admin.html',
+        db_path=db_path,
+        db_status=db_status,
+        pool_stats=get_pool_stats(),
+        cache_stats=get_result_cache_stats(),
+    )
 
 
 @admin_bp.route('/admin/config')
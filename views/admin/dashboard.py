@@ -1,6 +1,7 @@
 import json
 import logging
-from flask import render_template, request, jsonify
+import sqlite3
+from flask import current_app, render_template, request, jsonify
 from db.dashboard import (
     get_dashboard_widgets,
     create_widget,
@@ -8,8 +9,10 @@ from db.dashboard import (
     update_widget_styling,
     delete_widget,
     get_base_table_counts,
-    get_top_numeric_values,
+    cached_top_numeric_values,
     get_filtered_records,
+    get_widget_data,
+    sync_materialized_widgets,
 )
 
 
@@ -18,6 +21,20 @@ from . import admin_bp
 logger = logging.getLogger(__name__)
 
 
+def _sync_materialized() -> None:
+    """Install or drop aggregate triggers to match the materialized widgets."""
+    try:
+        changes = sync_materialized_widgets()
+    except sqlite3.DatabaseError as exc:
+        logger.exception(
+            "Failed to sync materialized widget fields",
+            extra={"error": str(exc)},
+        )
+        return
+    if changes["enabled"] or changes["disabled"]:
+        logger.info("Synced materialized widget fields", extra=changes)
+
+
 @admin_bp.route('/dashboard')
 def dashboard():
     widgets = get_dashboard_widgets()
@@ -100,6 +117,7 @@ def dashboard_create_widget():
 
     if not widget_id:
         return jsonify({'error': 'Failed to create widget'}), 500
+    _sync_materialized()
 
     logger.info(
         "Created dashboard widget %s type=%s",
@@ -148,6 +166,7 @@ def dashboard_delete_widget(widget_id):
     success = delete_widget(widget_id)
     if not success:
         return jsonify({'error': 'Failed to delete widget'}), 500
+    _sync_materialized()
     logger.info(
         "Deleted dashboard widget %s",
         widget_id,
@@ -156,6 +175,24 @@ def dashboard_delete_widget(widget_id):
     return jsonify({'success': True})
 
 
+@admin_bp.route('/dashboard/materialized/sync', methods=['POST'])
+def dashboard_sync_materialized():
+    """Re-sync aggregate triggers with the materialized widgets.
+
+    Also repairs triggers lost when a table was recreated.
+    """
+    try:
+        changes = sync_materialized_widgets()
+    except sqlite3.DatabaseError as exc:
+        logger.exception(
+            "Failed to sync materialized widget fields",
+            extra={"error": str(exc)},
+        )
+        return jsonify({'error': 'Failed to sync materialized fields'}), 500
+    logger.info("Synced materialized widget fields", extra=changes)
+    return jsonify({'success': True, **changes})
+
+
 @admin_bp.route('/dashboard/base-count')
 def dashboard_base_count():
     """Return counts for all base tables."""
@@ -176,7 +213,7 @@ def dashboard_top_numeric():
         limit = 10
     direction = request.args.get('direction', 'desc')
     try:
-        data = get_top_numeric_values(
+        data = cached_top_numeric_values(
             table,
             field,
             limit=limit,
@@ -237,3 +274,36 @@ def dashboard_filtered_records():
         },
     )
     return jsonify(data)
+
+
+@admin_bp.route('/dashboard/data')
+def dashboard_data():
+    """Return data for many value/chart widgets in one response.
+
+    Accepts ``ids`` (comma separated widget ids) or ``group`` (a dashboard
+    group name) and answers ``{"widgets": {id: data}}``.
+    """
+    group = request.args.get('group')
+    if group:
+        widget_ids = [
+            w['id']
+            for w in get_dashboard_widgets()
+            if (w.get('group') or 'Dashboard') == group
+        ]
+    else:
+        try:
+            widget_ids = [
+                int(i) for i in request.args.get('ids', '').split(',') if i.strip()
+            ]
+        except ValueError:
+            logger.warning("Invalid widget ids for dashboard data", exc_info=True)
+            return jsonify({'error': 'Invalid widget ids'}), 400
+    data = get_widget_data(widget_ids)
+    logger.debug(
+        "Returning dashboard data for %d widgets",
+        len(data),
+        extra={"route": "dashboard_data", "widgets": len(data)},
+    )
+    return current_app.response_class(
+        json.dumps({'widgets': data}), mimetype='application/json'
+    )
@@ -2,9 +2,12 @@ import logging
 import sqlite3
 from flask import render_template, current_app, request, jsonify
 
-from db.schema import get_field_schema, set_title_field
+from db.schema import get_field_schema, set_title_field, bump_schema_generation
 from db.records import count_nonnull
+from db.search import create_fts_index, drop_fts_index
+from db.edit_fields import change_field_type
 from . import admin_bp
+from db.catalog import get_table_meta
 from db.database import get_connection
 from db.validation import validate_table, validate_field
 from utils.validation import validation_sorter
@@ -33,6 +36,7 @@ def admin_fields():
         readonly_map = {}
     base_tables = current_app.config.get('BASE_TABLES', [])
     table_data: dict[str, list[dict]] = {}
+    search_index: dict[str, bool] = {}
     for table in base_tables:
         fields = []
         tbl_schema = schema.get(table, {})
@@ -57,7 +61,11 @@ def admin_fields():
                 'readonly': bool(readonly_map.get((table, field), 0)),
             })
         table_data[table] = fields
-    return render_template('admin/fields_admin.html', tables=table_data)
+        meta = get_table_meta(table)
+        search_index[table] = bool(meta is not None and meta.fts_columns)
+    return render_template(
+        'admin/fields_admin.html', tables=table_data, search_index=search_index
+    )
 
 
 @admin_bp.route('/admin/fields/<table>/title', methods=['POST'])
@@ -124,6 +132,7 @@ def admin_set_readonly(table):
                 (ro, table, field),
             )
             conn.commit()
+            bump_schema_generation()
         except sqlite3.DatabaseError as exc:
             logger.exception(
                 'Failed to update readonly flag',
@@ -205,27 +214,38 @@ def admin_convert_field_type():
         if int(report.get('invalid', 0)) > 0:
             return jsonify({'error': 'invalid_values', 'report': report}), 400
 
-        # Update field_schema; null out options if the new type does not allow them
-        allows_opts = bool(getattr(FIELD_TYPES.get(new_type), 'allows_options', False))
-        try:
-            if allows_opts:
-                cur.execute(
-                    'UPDATE field_schema SET field_type = ? WHERE table_name = ? AND field_name = ?',
-                    (new_type, table, field),
-                )
-            else:
-                cur.execute(
-                    'UPDATE field_schema SET field_type = ?, field_options = NULL WHERE table_name = ? AND field_name = ?',
-                    (new_type, table, field),
-                )
-            conn.commit()
-        except sqlite3.DatabaseError as exc:
-            logger.exception('Failed to convert field type', extra={'table': table, 'field': field, 'new_type': new_type})
-            return jsonify({'error': str(exc)}), 500
+    try:
+        change_field_type(table, field, new_type)
+    except sqlite3.DatabaseError as exc:
+        logger.exception('Failed to convert field type', extra={'table': table, 'field': field, 'new_type': new_type})
+        return jsonify({'error': str(exc)}), 500
 
     return jsonify({'success': True})
 
 
+@admin_bp.route('/admin/fields/<table>/search-index', methods=['POST'])
+def admin_set_search_index(table):
+    """Enable, rebuild or remove the full-text search index for a table.
+
+    Expects JSON or form with 'enabled' (1/0 or true/false). Enabling an
+    existing index rebuilds it. Returns JSON {success, enabled}.
+    """
+    if request.is_json:
+        enabled_val = (request.get_json(silent=True) or {}).get('enabled', True)
+    else:
+        enabled_val = request.form.get('enabled', '1')
+    try:
+        validate_table(table)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    enabled = str(enabled_val).lower() in {"1", "true", "on", "yes"}
+    ok = create_fts_index(table) if enabled else drop_fts_index(table)
+    if not ok:
+        return jsonify({'success': False, 'error': 'failed to update search index'}), 500
+    return jsonify({'success': True, 'enabled': enabled})
+
+
 @admin_bp.route('/admin/fields/<table>/clear', methods=['POST'])
 def admin_clear_field_values(table):
     """Set all non-null values in a field to NULL for the given table.
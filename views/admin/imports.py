@@ -1,14 +1,32 @@
 import json
 import logging
 from flask import render_template, request, jsonify
+from db.catalog import get_table_meta
 from db.schema import get_field_schema
-from imports.import_csv import parse_csv
+from db.validation import validate_table
+from imports.import_csv import (
+    get_upload_meta,
+    read_upload_preview,
+    spool_rows,
+    spool_upload,
+)
 from utils.validation import validation_sorter
 from db.database import get_connection
-from imports.tasks import process_import, init_import_table
+from imports.tasks import (
+    create_import_job,
+    get_import_errors,
+    is_stale,
+    process_import,
+    resume_import,
+)
 from . import admin_bp
 
 logger = logging.getLogger(__name__)
+
+# Row errors returned per /import-status poll by default, and at most.
+ERROR_PAGE_SIZE = 100
+MAX_ERROR_PAGE = 1000
+
 @admin_bp.route('/import', methods=['GET', 'POST'])
 def import_records():
     schema = get_field_schema()
@@ -19,14 +37,20 @@ def import_records():
     field_status = {}
     validation_results = {}
     file_name = None
+    upload_id = None
+    key_field = None
 
     if request.method == 'POST':
         if 'file' in request.files:
             file = request.files['file']
             if file and file.filename.endswith('.csv'):
-                parsed_headers, rows = parse_csv(file)
-                num_records = len(rows)
+                # Stream to disk; only a preview is sent to the page.
+                upload = spool_upload(file.stream, file.filename)
+                parsed_headers = upload['headers']
+                rows = upload['preview']
+                num_records = upload['total_rows']
                 file_name = file.filename
+                upload_id = upload['upload_id']
 
     if selected_table:
         table_schema = schema[selected_table]
@@ -38,6 +62,8 @@ def import_records():
             for field, meta in table_schema.items()
             if meta['type'] != 'hidden'
         }
+        table_meta = get_table_meta(selected_table)
+        key_field = table_meta.label_field if table_meta is not None else None
 
     return render_template(
         'import_view.html',
@@ -48,7 +74,9 @@ def import_records():
         field_status=field_status,
         validation_report=validation_results,
         rows=rows,
-        file_name=file_name
+        file_name=file_name,
+        upload_id=upload_id,
+        key_field=key_field,
     )
 
 
@@ -57,9 +85,18 @@ def trigger_validation():
     data = request.get_json(silent=True) or {}
     matched = data.get('matchedFields')
     rows = data.get('rows')
-    if not isinstance(matched, dict) or not isinstance(rows, list):
+    upload_id = data.get('upload')
+    meta = get_upload_meta(upload_id) if upload_id else None
+    if upload_id and meta is None:
+        return jsonify({'error': 'Unknown upload'}), 400
+    if not isinstance(matched, dict) or not (upload_id or isinstance(rows, list)):
         return jsonify({'error': 'Missing required data'}), 400
 
+    if upload_id:
+        # Check the preview rows in one bounded read; the import worker checks
+        # every row and reports failures through /import-status.
+        rows = read_upload_preview(upload_id)
+
     schema = get_field_schema()
     report = {}
 
@@ -70,55 +107,152 @@ def trigger_validation():
             continue
         field_type = schema[table][field]['type']
         values = [row.get(header, '') for row in rows]
-        report[header] = validation_sorter(table, field, header, field_type, values)
+        result = validation_sorter(table, field, header, field_type, values)
+        if result and meta is not None:
+            result['checked_rows'] = len(rows)
+            result['total_rows'] = meta['total_rows']
+        report[header] = result
 
     return jsonify(report)
 
 
+def _resolve_key_fields(table, keys, mapping):
+    """Return the upsert key fields for ``table`` or None if they are invalid.
+
+    Defaults to the table's label (title) field. Keys must be importable fields and,
+    when a header mapping is given, mapped from the upload.
+    """
+    if not keys:
+        table_meta = get_table_meta(table)
+        keys = [table_meta.label_field] if table_meta is not None else []
+    if not isinstance(keys, list) or not keys:
+        return None
+    fields = get_field_schema().get(table, {})
+    for key in keys:
+        if (
+            not isinstance(key, str)
+            or key == 'id'
+            or key not in fields
+            or fields[key]['type'] == 'hidden'
+            or (mapping and key not in mapping.values())
+        ):
+            return None
+    return keys
+
+
+def _invalid_mapping_targets(table, mapping):
+    """Return the mapping targets that are not importable fields of ``table``."""
+    fields = get_field_schema().get(table, {})
+    return sorted(
+        str(field)
+        for field in mapping.values()
+        if not isinstance(field, str)
+        or field == 'id'
+        or field not in fields
+        or fields[field]['type'] == 'hidden'
+    )
+
+
 @admin_bp.route('/import-start', methods=['POST'])
 def import_start_route():
-    """Start a background import job and return its ID."""
+    """Start a background import job and return its ID.
+
+    Accepts JSON ``{"table", "upload", "mapping"}`` referencing a spooled
+    upload (``mapping`` is ``{csv_header: field}``), JSON ``{"table",
+    "rows"}``, or a multipart form with ``table`` and ``file``. ``mode`` is
+    ``insert`` (default) or ``upsert``; upserts match on the ``keys`` fields,
+    defaulting to the label (title) field. ``link`` also creates
+    relationships for the records named in foreign_key fields.
+    """
+    mapping = None
+    meta = None
+    upload_id = None
+    rows = None
+    file = None
+    mode = 'insert'
+    keys = None
+    link = False
     if request.is_json:
         data = request.get_json(silent=True) or {}
         table = data.get('table')
-        rows = data.get('rows') or []
+        upload_id = data.get('upload')
+        mapping = data.get('mapping')
+        rows = data.get('rows')
+        mode = data.get('mode') or 'insert'
+        keys = data.get('keys')
+        link = bool(data.get('link'))
     else:
         table = request.form.get('table')
-        rows = []
+        mode = request.form.get('mode') or 'insert'
+        keys = request.form.getlist('keys') or None
+        link = request.form.get('link') in ('1', 'true', 'on')
         file = request.files.get('file')
-        if file and file.filename.endswith('.csv'):
-            _, rows = parse_csv(file)
 
-    if not table or not isinstance(rows, list) or not rows:
+    # Reject bad targets before anything is spooled or a job row exists.
+    if not table or (mapping is not None and not isinstance(mapping, dict)):
         return jsonify({'error': 'Invalid import data'}), 400
+    try:
+        validate_table(table)
+    except ValueError:
+        return jsonify({'error': 'Invalid table'}), 400
+    if mapping:
+        invalid = _invalid_mapping_targets(table, mapping)
+        if invalid:
+            return jsonify({'error': f"Invalid mapping fields: {', '.join(invalid)}"}), 400
 
-    init_import_table()
-    with get_connection() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            'INSERT INTO import_status (status, total_rows, imported_rows, errors) VALUES (?, ?, ?, ?)',
-            ('queued', len(rows), 0, '[]')
-        )
-        import_id = cur.lastrowid
-        conn.commit()
+    key_fields = None
+    if mode == 'upsert':
+        key_fields = _resolve_key_fields(table, keys, mapping)
+        if key_fields is None:
+            return jsonify({'error': 'Invalid key fields'}), 400
+    elif mode != 'insert':
+        return jsonify({'error': 'Invalid import mode'}), 400
 
-    process_import(import_id, table, rows)
-    return jsonify({'importId': import_id, 'totalRows': len(rows)})
+    try:
+        if upload_id:
+            meta = get_upload_meta(upload_id)
+        elif isinstance(rows, list) and rows:
+            upload = spool_rows(rows)
+            upload_id, meta = upload['upload_id'], upload
+        elif file and file.filename.endswith('.csv'):
+            upload = spool_upload(file.stream, file.filename)
+            upload_id, meta = upload['upload_id'], upload
+    except ValueError:
+        logger.warning("Invalid upload reference", exc_info=True)
+        meta = None
+    if meta is None or not meta['total_rows']:
+        return jsonify({'error': 'Invalid import data'}), 400
+
+    import_id = create_import_job(
+        upload_id, meta['total_rows'], mapping, table, key_fields, link
+    )
+    process_import(import_id, table)
+    return jsonify({'importId': import_id, 'totalRows': meta['total_rows']})
 
 
 @admin_bp.route('/import-status')
 def import_status_route():
-    """Return progress for a given import job."""
+    """Return progress and one page of row errors for a given import job.
+
+    ``errorOffset``/``errorLimit`` select the error window; ``errorCount``
+    is always the job total.
+    """
     try:
         import_id = int(request.args.get('importId', 0))
+        error_offset = max(0, int(request.args.get('errorOffset', 0)))
+        error_limit = min(
+            MAX_ERROR_PAGE, max(0, int(request.args.get('errorLimit', ERROR_PAGE_SIZE)))
+        )
     except (TypeError, ValueError):
-        logger.warning("Invalid importId provided", exc_info=True)
+        logger.warning("Invalid import status arguments", exc_info=True)
         return jsonify({'error': 'Invalid importId'}), 400
 
     with get_connection() as conn:
         cur = conn.cursor()
         cur.execute(
-            'SELECT status, total_rows, imported_rows, errors FROM import_status WHERE id = ?',
+            'SELECT status, total_rows, imported_rows, error_count, errors, '
+            'checkpoint_row, heartbeat_at, inserted_rows, updated_rows '
+            'FROM import_status WHERE id = ?',
             (import_id,),
         )
         row = cur.fetchone()
@@ -126,12 +260,47 @@ def import_status_route():
     if not row:
         return jsonify({'error': 'Import not found'}), 404
 
-    status, total_rows, imported_rows, errors_json = row
-    errors = json.loads(errors_json or '[]')
+    (
+        status,
+        total_rows,
+        imported_rows,
+        error_count,
+        errors_json,
+        checkpoint_row,
+        heartbeat_at,
+        inserted_rows,
+        updated_rows,
+    ) = row
+    if error_count is None:
+        # Jobs recorded before import_errors kept their errors inline.
+        legacy = json.loads(errors_json or '[]')
+        error_count = len(legacy)
+        errors = legacy[error_offset:error_offset + error_limit]
+    else:
+        errors = get_import_errors(import_id, error_offset, error_limit)
     return jsonify({
         'status': status,
         'totalRows': total_rows,
         'importedRows': imported_rows,
-        'errorCount': len(errors),
+        'errorCount': error_count,
+        'errorOffset': error_offset,
         'errors': errors,
+        'insertedRows': inserted_rows,
+        'updatedRows': updated_rows,
+        'checkpointRow': checkpoint_row,
+        'stale': is_stale(status, heartbeat_at),
     })
+
+
+@admin_bp.route('/import-resume', methods=['POST'])
+def import_resume_route():
+    """Continue a failed or stale import job from its last checkpoint."""
+    data = request.get_json(silent=True) or {}
+    try:
+        import_id = int(data.get('importId', 0))
+    except (TypeError, ValueError):
+        logger.warning("Invalid importId provided", exc_info=True)
+        return jsonify({'error': 'Invalid importId'}), 400
+    if not resume_import(import_id):
+        return jsonify({'error': 'Import cannot be resumed'}), 409
+    return jsonify({'importId': import_id, 'resumed': True})
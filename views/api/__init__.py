@@ -1,7 +1,9 @@
 import logging
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from db.database import get_connection
+from db.graph_index import get_graph_index
 from db.schema import load_card_info
+from db.validation import validate_table
 
 api_bp = Blueprint('api', __name__)
 
@@ -19,3 +21,83 @@ def api_base_tables():
     )
     return jsonify(data)
 
+
+
+def _parse_node(spec: str | None) -> tuple[str, int]:
+    """Parse a ``table:id`` node reference."""
+    table, _, record_id = (spec or '').partition(':')
+    validate_table(table)
+    return table, int(record_id)
+
+
+def _node_json(graph, node: int) -> dict:
+    table, record_id = graph.record(node)
+    return {"table": table, "id": record_id}
+
+
+@api_bp.route('/api/graph/stats')
+def api_graph_stats():
+    """Return size information for the in-memory relationship graph."""
+    return jsonify(get_graph_index().stats())
+
+
+@api_bp.route('/api/graph/degree/<table>/<int:record_id>')
+def api_graph_degree(table, record_id):
+    """Return the number of records linked to a record."""
+    try:
+        validate_table(table)
+    except ValueError:
+        return jsonify({'error': 'Invalid table'}), 400
+    graph = get_graph_index()
+    node = graph.node(table, record_id)
+    return jsonify({'degree': graph.degree(node) if node is not None else 0})
+
+
+@api_bp.route('/api/graph/component/<table>/<int:record_id>')
+def api_graph_component(table, record_id):
+    """Return the connected component containing a record.
+
+    ``limit`` caps the members returned (default 1000).
+    """
+    try:
+        validate_table(table)
+    except ValueError:
+        return jsonify({'error': 'Invalid table'}), 400
+    limit = request.args.get('limit', 1000, type=int)
+    graph = get_graph_index()
+    node = graph.node(table, record_id)
+    if node is None:
+        return jsonify({'size': 1, 'members': [{"table": table, "id": record_id}], 'truncated': False})
+    members, truncated = graph.component(node, limit=max(1, limit))
+    return jsonify({
+        'size': len(members),
+        'members': [_node_json(graph, m) for m in members],
+        'truncated': truncated,
+    })
+
+
+@api_bp.route('/api/graph/path')
+def api_graph_path():
+    """Return a shortest link path between ``from`` and ``to`` (``table:id``)."""
+    try:
+        start = _parse_node(request.args.get('from'))
+        goal = _parse_node(request.args.get('to'))
+    except ValueError:
+        logger.warning(
+            "Invalid graph path arguments",
+            exc_info=True,
+            extra={"from": request.args.get('from'), "to": request.args.get('to')},
+        )
+        return jsonify({'error': 'Expected from/to as table:id'}), 400
+    max_depth = request.args.get('max_depth', type=int)
+    graph = get_graph_index()
+    a = graph.node(*start)
+    b = graph.node(*goal)
+    path = None
+    if start == goal:
+        path = [{"table": start[0], "id": start[1]}]
+    elif a is not None and b is not None:
+        nodes = graph.shortest_path(a, b, max_depth=max_depth)
+        if nodes is not None:
+            path = [_node_json(graph, n) for n in nodes]
+    return jsonify({'path': path})
@@ -1,11 +1,13 @@
 import csv
 import io
+import json
 import logging
-from flask import render_template, request, jsonify, Response
+import zlib
+from flask import render_template, request, jsonify, Response, stream_with_context
 
 from db.database import get_connection
-from db.schema import get_title_field
-from db.records import get_all_records
+from db.catalog import get_table_meta
+from db.records import iter_records
 
 from .record_views import records_bp
 from utils.records_helpers import parse_list_params, build_list_context, require_base_table
@@ -52,22 +54,13 @@ def api_list(table):
         extra={"table": table, "search": search, "limit": limit},
     )
 
+    meta = get_table_meta(table)
+    if meta is None:
+        return jsonify([])
+    label_field = meta.label_field
+
     with get_connection() as conn:
         cur = conn.cursor()
-        cur.execute(f"PRAGMA table_info({table})")
-        cols = [r[1] for r in cur.fetchall()]
-        if not cols:
-            return jsonify([])
-        title_field = get_title_field(table)
-        if title_field:
-            label_field = title_field
-        elif table in cols:
-            label_field = table
-        elif len(cols) > 1:
-            label_field = cols[1]
-        else:
-            label_field = cols[0]
-
         sql = f"SELECT id, {label_field} FROM {table}"
         params = []
         if search is not None:
@@ -105,17 +98,33 @@ def api_records(table):
     return jsonify(ctx)
 
 
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
 @records_bp.route('/<table>/export')
 @require_base_table
 def export_csv(table):
-    """Stream CSV of records using current filters and search."""
+    """Stream records as CSV or NDJSON using current filters and search.
+
+    ``format`` selects ``csv`` (default) or ``ndjson``; ``gzip=1`` compresses
+    the stream on the fly. Rows are fetched in batches so memory stays flat.
+    """
     params = parse_list_params(table)
     fields = [f for f in params['fields'] if not f.startswith('_')]
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+    use_gzip = request.args.get('gzip', '').lower() in {'1', 'true', 'on', 'yes'}
     logger.info(
-        "Exporting CSV for %s fields=%s",
+        "Exporting %s for %s fields=%s gzip=%s",
+        fmt,
         table,
         fields,
-        extra={"table": table, "fields": fields},
+        use_gzip,
+        extra={"table": table, "fields": fields, "format": fmt},
     )
     ids_param = request.args.getlist('ids') or request.args.get('ids', '')
     if isinstance(ids_param, str):
@@ -124,14 +133,14 @@ def export_csv(table):
         ids = ids_param
     ids = [int(i) for i in ids if str(i).isdigit()]
     if ids:
-        records = get_all_records(
+        batches = iter_records(
             table,
             filters={'id': ids},
             ops={'id': 'equals'},
             modes={'id': 'any'},
         )
     else:
-        records = get_all_records(
+        batches = iter_records(
             table,
             search=params['search'],
             filters=params['filters'],
@@ -141,22 +150,42 @@ def export_csv(table):
             direction=params['direction'],
         )
 
-    def generate():
+    def generate_csv():
         buf = io.StringIO()
         writer = csv.writer(buf)
         writer.writerow(fields)
         yield buf.getvalue()
-        buf.seek(0)
-        buf.truncate(0)
-        for row in records:
-            writer.writerow([row.get(f, '') for f in fields])
-            yield buf.getvalue()
+        for batch in batches:
             buf.seek(0)
             buf.truncate(0)
+            for row in batch:
+                writer.writerow([row.get(f, '') for f in fields])
+            yield buf.getvalue()
 
-    filename = f"{table}.csv"
+    def generate_ndjson():
+        for batch in batches:
+            yield ''.join(
+                json.dumps({f: row.get(f) for f in fields}, default=str) + '\n'
+                for row in batch
+            )
+
+    def gzipped(chunks):
+        compressor = zlib.compressobj(wbits=31)  # gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
+
+    mimetype, ext = EXPORT_FORMATS[fmt]
+    body = generate_csv() if fmt == 'csv' else generate_ndjson()
+    filename = f"{table}.{ext}"
+    if use_gzip:
+        body = gzipped(body)
+        mimetype = 'application/gzip'
+        filename += '.gz'
     return Response(
-        generate(),
-        mimetype='text/csv',
+        stream_with_context(body),
+        mimetype=mimetype,
         headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
@@ -7,15 +7,19 @@ from db.records import (
     get_record_by_id,
     create_record,
     delete_record,
-    count_nonnull as db_count_nonnull,
-    field_distribution,
 )
 from db.edit_history import (
     get_edit_history,
     get_edit_entry,
     revert_edit,
 )
-from db.relationships import get_related_records, add_relationship, remove_relationship
+from db.relationships import (
+    get_related_records,
+    add_relationship,
+    remove_relationship,
+    traverse_relationships,
+    bulk_update_relationships,
+)
 from werkzeug.exceptions import HTTPException
 from db.edit_fields import add_column_to_table, add_field_to_schema, drop_column_from_table, remove_field_from_schema
 from db.schema import (
@@ -23,7 +27,11 @@ from db.schema import (
     update_layout as db_update_layout,
     update_field_styling as db_update_field_styling,
 )
-from db.dashboard import sum_field as db_sum_field
+from db.dashboard import (
+    cached_count_nonnull,
+    cached_field_distribution,
+    cached_sum_field,
+)
 from db.config import get_layout_defaults
 from db.config import get_relationship_visibility, update_relationship_visibility
 from utils.field_registry import get_field_type, get_type_size_map
@@ -34,6 +42,12 @@ from utils.record_ops import update_record_field, bulk_update_records
 
 logger = logging.getLogger(__name__)
 
+# Default number of values returned to chart widgets; the rest become "Other".
+DISTRIBUTION_LIMIT = 25
+
+# Related records shown per table on the detail page.
+RELATED_LIMIT = 100
+
 
 @records_bp.route('/<table>/<int:record_id>')
 @require_base_table
@@ -41,7 +55,7 @@ def detail_view(table, record_id):
     record = get_record_by_id(table, record_id)
     if not record:
         abort(404)
-    existing_related = get_related_records(table, record_id)
+    existing_related = get_related_records(table, record_id, limit=RELATED_LIMIT)
     base_tables = current_app.config['BASE_TABLES']
     card_info = current_app.config.get('CARD_INFO', [])
     label_map = {c['table_name']: c['display_name'] for c in card_info}
@@ -52,7 +66,7 @@ def detail_view(table, record_id):
             continue
         group = existing_related.get(
             tbl,
-            {"label": label_map.get(tbl, tbl.capitalize()), "items": []},
+            {"label": label_map.get(tbl, tbl.capitalize()), "items": [], "total": 0},
         )
         vis = visibility_all.get(tbl, {})
         related.append((tbl, group, vis))
@@ -95,6 +109,49 @@ def detail_view(table, record_id):
     )
 
 
+@records_bp.route('/<table>/<int:record_id>/related')
+@require_base_table
+def related_records(table, record_id):
+    """Return related records grouped by table.
+
+    ``limit`` caps the items per table; each group's ``total`` counts all.
+    """
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit <= 0:
+        limit = None
+    return jsonify(get_related_records(table, record_id, limit=limit))
+
+
+@records_bp.route('/<table>/<int:record_id>/graph')
+@require_base_table
+def relationship_graph(table, record_id):
+    """Return records within ``depth`` hops as ``{"nodes", "edges"}``.
+
+    Query args: ``depth`` (default 2), ``fanout`` (links followed per
+    record), ``tables`` (comma separated tables the walk may enter),
+    ``two_way_only`` and ``max_nodes``.
+    """
+    tables = [t for t in (request.args.get('tables') or '').split(',') if t]
+    try:
+        graph = traverse_relationships(
+            table,
+            record_id,
+            depth=request.args.get('depth', 2, type=int),
+            fanout=request.args.get('fanout', 100, type=int),
+            tables=tables or None,
+            two_way_only=request.args.get('two_way_only') in ('1', 'true'),
+            max_nodes=request.args.get('max_nodes', 1000, type=int),
+        )
+    except ValueError:
+        logger.warning(
+            'relationship_graph invalid arguments',
+            exc_info=True,
+            extra={"table": table, "record_id": record_id, "tables": tables},
+        )
+        return jsonify({'error': 'Invalid arguments'}), 400
+    return jsonify(graph)
+
+
 @records_bp.route('/<table>/<int:record_id>/add-field', methods=['POST'])
 @require_base_table
 def add_field_route(table, record_id):
@@ -171,7 +228,7 @@ def add_field_route(table, record_id):
 def count_nonnull(table):
     field = request.args.get('field')
     try:
-        count = db_count_nonnull(table, field)
+        count = cached_count_nonnull(table, field)
     except ValueError:
         logger.warning(
             'count_nonnull invalid field',
@@ -187,7 +244,7 @@ def count_nonnull(table):
 def sum_field_route(table):
     field = request.args.get('field')
     try:
-        result = db_sum_field(table, field)
+        result = cached_sum_field(table, field)
     except ValueError:
         logger.warning(
             'sum_field invalid field',
@@ -201,9 +258,20 @@ def sum_field_route(table):
 @records_bp.route('/<table>/field-distribution')
 @require_base_table
 def field_distribution_route(table):
+    """Return value counts for charts.
+
+    Query args: ``field``; ``limit`` (top values, default 25, 0 for all);
+    ``bucket`` (``day``/``week``/``month`` for date fields); ``bins``
+    (histogram bins for number fields, default 10, 0 for exact values).
+    """
     field = request.args.get('field')
+    limit = request.args.get('limit', DISTRIBUTION_LIMIT, type=int)
+    bucket = request.args.get('bucket') or None
+    bins = request.args.get('bins', 10, type=int)
     try:
-        counts = field_distribution(table, field)
+        counts = cached_field_distribution(
+            table, field, limit=limit, bucket=bucket, bins=bins
+        )
     except ValueError:
         logger.warning(
             'field_distribution invalid field',
@@ -211,7 +279,9 @@ def field_distribution_route(table):
             extra={"table": table, "field": field},
         )
         return jsonify({}), 400
-    return jsonify(counts)
+    # Serialize directly so the SQL ordering (by count, bucket or date)
+    # survives; jsonify would sort the keys.
+    return current_app.response_class(json.dumps(counts), mimetype='application/json')
 
 
 @records_bp.route('/<table>/<int:record_id>/remove-field', methods=['POST'])
@@ -386,6 +456,35 @@ def manage_relationship():
     return {'success': True}
 
 
+@records_bp.route('/relationships/bulk', methods=['POST'])
+def bulk_relationships():
+    """Apply many relationship changes in one transaction.
+
+    Body: ``{"changes": [{"action", "table_a", "id_a", "table_b", "id_b",
+    "two_way"}, ...]}``.
+    """
+    data = request.get_json(silent=True) or {}
+    changes = data.get('changes')
+    if not isinstance(changes, list) or not all(isinstance(c, dict) for c in changes):
+        return jsonify({'error': 'Expected a list of changes'}), 400
+    try:
+        result = bulk_update_relationships(changes)
+    except ValueError as e:
+        logger.warning(
+            'bulk_relationships validation failed',
+            exc_info=True,
+            extra={"count": len(changes), "error": str(e)},
+        )
+        return jsonify({'error': str(e)}), 400
+    except sqlite3.DatabaseError:
+        logger.exception(
+            'bulk_relationships failed',
+            extra={"count": len(changes)},
+        )
+        return jsonify({'error': 'Failed to modify relationships'}), 500
+    return jsonify({'success': True, **result})
+
+
 @records_bp.route('/<table>/new', methods=['GET', 'POST'])
 @require_base_table
 def create_record_route(table):
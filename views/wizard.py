@@ -16,8 +16,9 @@ import sqlite3
 import db.database as db_database
 from db.bootstrap import initialize_database, ensure_default_configs
 from db.config import update_config, get_config_rows
-from db.schema import create_base_table
+from db.schema import create_base_table, bump_schema_generation
 from db.edit_fields import add_column_to_table, add_field_to_schema
+from db.field_values import sync_field_values
 from db.database import get_connection
 from imports.import_csv import parse_csv
 from db.records import create_record
@@ -233,6 +234,8 @@ def table_step():
                                     (ftype, opts_json, fk, table_name, name),
                                 )
                                 conn.commit()
+                            bump_schema_generation()
+                            sync_field_values(table_name)
                             continue
                         # Normal non-title fields
                         add_column_to_table(table_name, name, ftype)